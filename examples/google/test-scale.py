@@ -186,7 +186,7 @@ def main():
             seconds = round(end - start, 3)
             cli.times[f"scale_{tag}_{old_size}_to_{node_count}"] = seconds
             print(
-                f"📦️ Scaling from {old_size} to {node_count} took {seconds} seconds, and the cluster now has {res.initial_node_count} nodes!"
+                f"📦️ Scaling from {old_size} to {node_count} took {seconds} seconds, and the cluster now has {res.ready} nodes Ready!"
             )
 
             # Save the times as we go
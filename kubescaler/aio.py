@@ -0,0 +1,331 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import kubescaler.deadline as deadlines
+import kubescaler.defaults as defaults
+from kubescaler.decorators import timed
+from kubescaler.logger import logger
+from kubescaler.scaling import (
+    ScaleEvent,
+    ScaleResult,
+    get_scale_deadline,
+    get_stopped_status,
+)
+
+# Runs long blocking operations, see get_lifecycle_executor
+_lifecycle_executor = None
+_lifecycle_lock = threading.Lock()
+
+
+def get_lifecycle_executor():
+    """
+    Get the shared executor for long blocking operations (e.g., EKS create).
+
+    These hold a thread for many minutes, so they get their own (sized)
+    pool instead of the default one that the short calls use.
+    """
+    global _lifecycle_executor
+    with _lifecycle_lock:
+        if _lifecycle_executor is None:
+            _lifecycle_executor = ThreadPoolExecutor(
+                defaults.lifecycle_workers, thread_name_prefix="kubescaler-lifecycle"
+            )
+        return _lifecycle_executor
+
+
+async def gather(*awaitables):
+    """
+    Run awaitables concurrently, cancelling the rest if one of them fails.
+    """
+    tasks = [asyncio.ensure_future(x) for x in awaitables]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+async def stream_events(waits):
+    """
+    Run waits as tasks and yield the events they emit, as they happen.
+
+    This is the asyncio version of scaling.stream_events: each wait is a
+    coroutine function called with an emit function, repeated counts are
+    yielded once, and the first error cancels the other waits and is raised.
+    """
+    events = asyncio.Queue()
+    done = object()
+
+    async def run(wait):
+        try:
+            await wait(events.put_nowait)
+        except Exception as e:
+            events.put_nowait(e)
+        finally:
+            events.put_nowait(done)
+
+    tasks = [asyncio.ensure_future(run(wait)) for wait in waits]
+    errors = []
+    last = {}
+    running = len(tasks)
+    try:
+        while running:
+            event = await events.get()
+            if event is done:
+                running -= 1
+            elif isinstance(event, Exception):
+                if not errors:
+                    for task in tasks:
+                        task.cancel()
+                errors.append(event)
+            elif last.get(event.kind) != (event.count, event.total):
+                last[event.kind] = (event.count, event.total)
+                yield event
+    finally:
+        for task in tasks:
+            task.cancel()
+    if errors:
+        raise errors[0]
+
+
+async def run_scale(events, count, deadline=None, min_ready=None):
+    """
+    Consume async scale progress events, returning a ScaleResult.
+
+    See scaling.run_scale: this stops at the deadline (seconds or Deadline)
+    or when min_ready nodes are Ready, and returns the partial result.
+    """
+    result = ScaleResult(count)
+    deadline = get_scale_deadline(deadline)
+    try:
+        with deadline:
+            async for event in events:
+                result.add(event)
+                if min_ready is not None and (result.ready or 0) >= min_ready:
+                    return result.finish(
+                        "complete" if not result.pending else "min_ready"
+                    )
+    except (deadlines.Cancelled, deadlines.DeadlineExceeded):
+        status = get_stopped_status(deadline)
+        if status is None:
+            raise
+        return result.finish(status)
+    finally:
+        await events.aclose()
+    return result.finish("complete")
+
+
+async def hold_until_updated(events, semaphore):
+    """
+    Hold the semaphore from before a scale starts until its update is done.
+
+    This is the asyncio version of scaling.hold_until_updated. The semaphore
+    is the (threading) one of the cluster, so sync and async scales share
+    it, and we poll for it instead of blocking the event loop.
+    """
+    while not semaphore.acquire(blocking=False):
+        await deadlines.sleep_async(0.5)
+    held = True
+    try:
+        async for event in events:
+            if event.kind == "updated" and held:
+                semaphore.release()
+                held = False
+            yield event
+    finally:
+        if held:
+            semaphore.release()
+        await events.aclose()
+
+
+class AsyncCluster:
+    """
+    A base asyncio interface to a cluster.
+
+    This wraps a (sync) cluster of cluster_class, which is still used for
+    state, configuration and anything not provided here (attributes are
+    looked up on it). Blocking calls are run in the executor (the default
+    thread pool if not provided), and waits sleep without blocking the loop,
+    so many clusters can be created or scaled from one event loop. Blocking
+    operations that take minutes (see run_lifecycle) run in the
+    lifecycle_executor instead, so they can't starve the short calls.
+    """
+
+    cluster_class = None
+
+    def __init__(self, *args, executor=None, lifecycle_executor=None, **kwargs):
+        self.cluster = self.cluster_class(*args, **kwargs)
+        self.executor = executor
+        self.lifecycle_executor = lifecycle_executor
+
+    def __getattr__(self, name):
+        return getattr(self.cluster, name)
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Run a blocking function in the executor, with the current deadline.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, deadlines.propagate(functools.partial(func, *args, **kwargs))
+        )
+
+    async def run_lifecycle(self, func, *args, **kwargs):
+        """
+        Run a long blocking function (e.g., a create) in the lifecycle executor.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.lifecycle_executor or get_lifecycle_executor(),
+            deadlines.propagate(functools.partial(func, *args, **kwargs)),
+        )
+
+    def serialize_updates(self, events):
+        """
+        Hold async scale progress to max_pool_updates at once, until updated.
+        """
+        if self.cluster._pool_updates is None:
+            return events
+        return hold_until_updated(events, self.cluster._pool_updates)
+
+    def request_scale(self, count, pool=None, deadline=None):
+        """
+        Request a pool to be scaled (coalesced), returning an awaitable.
+        """
+        return asyncio.wrap_future(
+            self.cluster.request_scale(count, pool, deadline=deadline)
+        )
+
+    async def scale_pool(
+        self,
+        count,
+        pool=None,
+        deadline=None,
+        min_ready=None,
+        min_count=None,
+        max_count=None,
+    ):
+        """
+        Scale a node pool (the default if not provided) to count nodes.
+
+        This returns a ScaleResult, see Cluster.scale_pool.
+        """
+        pool = pool or self.default_pool_name
+        await self.run(self.cluster.preflight_scale, count, pool)
+        events = self.scale_progress(
+            count, pool_name=pool, min_count=min_count, max_count=max_count
+        )
+        events = self.serialize_updates(events)
+        result = await run_scale(events, count, deadline, min_ready)
+        self.cluster.record_scale(result, pool)
+        return result
+
+    async def scale_pools(self, counts, deadline=None, min_ready=None, bounds=None):
+        """
+        Scale several pools at once (see Cluster.scale_pools).
+
+        Each pool is scaled in its own task, returning {pool: ScaleResult}.
+        """
+        min_ready = min_ready or {}
+        bounds = bounds or {}
+        deadline = get_scale_deadline(deadline)
+        results = {pool: ScaleResult(count) for pool, count in counts.items()}
+
+        async def scale(pool, count):
+            min_count, max_count = bounds.get(pool, (None, None))
+            try:
+                results[pool] = await self.scale_pool(
+                    count,
+                    pool,
+                    deadline=deadline,
+                    min_ready=min_ready.get(pool),
+                    min_count=min_count,
+                    max_count=max_count,
+                )
+            except Exception as e:
+                logger.error(f"Scaling pool {pool} to {count} failed: {e}")
+                results[pool].error = str(e)
+                results[pool].finish("failed")
+
+        await asyncio.gather(*[scale(pool, count) for pool, count in counts.items()])
+        return results
+
+    async def hibernate(self, deadline=None):
+        """
+        Scale every pool to zero nodes, see Cluster.hibernate.
+        """
+        pools = await self.run(self.cluster.start_hibernate)
+        return await self.scale_pools(
+            {pool: 0 for pool in pools},
+            deadline,
+            bounds={pool: (0, size["max"]) for pool, size in pools.items()},
+        )
+
+    async def resume(self, deadline=None, min_ready=None):
+        """
+        Restore every pool to its size from before hibernate, see Cluster.resume.
+        """
+        pools = self.cluster.start_resume()
+        results = await self.scale_pools(
+            {pool: size["count"] for pool, size in pools.items()},
+            deadline,
+            min_ready,
+            bounds={pool: (size["min"], size["max"]) for pool, size in pools.items()},
+        )
+        self.cluster.finish_resume(results)
+        return results
+
+    async def sleep(self, sleep):
+        """
+        Sleep (without blocking) and return the next sleep time.
+        """
+        await deadlines.sleep_async(sleep)
+        return sleep * self.sleep_multiplier
+
+    @timed
+    async def wait_for_nodes(self, count=None, label_selector=None):
+        """
+        Wait for a number of nodes (node_count by default) to be Ready.
+        """
+        count = self.node_count if count is None else count
+        sleep = self.sleep_time
+        while True:
+            ready = await self.run(self.cluster.get_ready_nodes, label_selector)
+            if len(ready) >= count:
+                return len(ready)
+            print(f"⏱️  Waiting for {count} nodes to be Ready, found {len(ready)}...")
+            sleep = await self.sleep(sleep)
+
+    async def watch_nodes(self, count, label_selector=None, emit=None):
+        """
+        Poll nodes until count are Ready, emitting progress as ScaleEvents.
+        """
+        sleep = self.sleep_time
+        while True:
+            nodes = await self.run(self.cluster.get_nodes, label_selector)
+            ready = sum(nodes.values())
+            if emit is not None:
+                emit(ScaleEvent("instances", len(nodes), count))
+                emit(ScaleEvent("nodes", ready, count))
+            # Scaling to zero is done when the nodes are gone, not NotReady
+            if ready == count and (count or not nodes):
+                return ready
+            sleep = await self.sleep(sleep)
+
+    async def close(self):
+        await self.run(self.cluster.close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
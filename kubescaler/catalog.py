@@ -0,0 +1,122 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+import json
+import os
+import threading
+import time
+
+import kubescaler.defaults as defaults
+from kubescaler.utils import mkdir_p
+
+# Columns for each machine type. On disk we store a list of values per type
+# (in this order) to keep the file small, and in memory a dict per type.
+fields = ["vcpu", "memory_mb", "network", "spot", "gpus"]
+
+
+class MachineCatalog:
+    """
+    A local catalog of machine (instance) types for a region or zone.
+
+    The catalog is fetched once from the provider API (with the fetch
+    function, which returns {machine_type: {field: value}}), and then
+    cached on disk until it is older than the ttl. Lookups after that are
+    dictionary reads.
+    """
+
+    version = 1
+
+    def __init__(self, provider, location, fetch, ttl=None, cache_dir=None):
+        self.provider = provider
+        self.location = location
+        self.fetch = fetch
+        self.ttl = defaults.catalog_ttl_seconds if ttl is None else ttl
+        self.cache_dir = cache_dir or os.path.join(defaults.userhome, "catalog")
+        self.filename = os.path.join(self.cache_dir, f"{provider}-{location}.json")
+        self._types = None
+        self._lock = threading.Lock()
+
+    @property
+    def types(self):
+        """
+        All machine types, loaded from disk or fetched (and saved) if stale.
+        """
+        if self._types is None:
+            with self._lock:
+                if self._types is None:
+                    self._types = self._read()
+                    if self._types is None:
+                        self._types = self.fetch()
+                        self._write(self._types)
+        return self._types
+
+    def refresh(self):
+        """
+        Fetch the catalog again from the provider.
+        """
+        with self._lock:
+            self._types = self.fetch()
+            self._write(self._types)
+        return self._types
+
+    def get(self, machine_type):
+        """
+        Get the capacity for a machine type, or None if it is not offered.
+        """
+        return self.types.get(machine_type)
+
+    def __contains__(self, machine_type):
+        return machine_type in self.types
+
+    def find(self, min_vcpu=0, min_memory_mb=0, spot=None):
+        """
+        Find machine types with at least some vCPU and memory, smallest first.
+        """
+        found = []
+        for name, machine in self.types.items():
+            if machine["vcpu"] < min_vcpu or machine["memory_mb"] < min_memory_mb:
+                continue
+            if spot is not None and machine["spot"] != spot:
+                continue
+            found.append(name)
+        return sorted(
+            found, key=lambda x: (self.types[x]["vcpu"], self.types[x]["memory_mb"])
+        )
+
+    def _read(self):
+        """
+        Read the catalog from disk, returning None if missing or stale.
+        """
+        try:
+            with open(self.filename, "r") as fd:
+                data = json.loads(fd.read())
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != self.version or data.get("fields") != fields:
+            return None
+        if time.time() - data.get("updated", 0) > self.ttl:
+            return None
+        return {
+            name: dict(zip(fields, values)) for name, values in data["types"].items()
+        }
+
+    def _write(self, types):
+        """
+        Write the catalog to disk, compactly.
+        """
+        data = {
+            "version": self.version,
+            "updated": time.time(),
+            "fields": fields,
+            "types": {
+                name: [machine.get(field) for field in fields]
+                for name, machine in types.items()
+            },
+        }
+        mkdir_p(self.cache_dir)
+        tmpfile = f"{self.filename}.{os.getpid()}.{threading.get_ident()}"
+        with open(tmpfile, "w") as fd:
+            fd.write(json.dumps(data, separators=(",", ":")))
+        os.replace(tmpfile, self.filename)
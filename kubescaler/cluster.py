@@ -3,10 +3,49 @@
 #
 # SPDX-License-Identifier: (MIT)
 
+import base64
+import hashlib
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
+from kubernetes import client as k8s
+
+import kubescaler.deadline as deadlines
 import kubescaler.defaults as defaults
-from kubescaler.utils import write_json
+import kubescaler.schemas as schemas
+from kubescaler.logger import logger
+from kubescaler.preflight import PreflightError, validate_spec
+from kubescaler.scaling import (
+    ScaleEvent,
+    ScaleQueue,
+    ScaleResult,
+    get_scale_deadline,
+    hold_until_updated,
+    reached_statuses,
+    run_scale,
+)
+from kubescaler.state import ClusterState
+from kubescaler.utils import mkdir_p, write_json
+
+
+def prune_ca_cert_files(ttl=None):
+    """
+    Remove cached CA certificates that were not used for ttl seconds.
+    """
+    ttl = defaults.ca_cert_ttl_seconds if ttl is None else ttl
+    ca_dir = os.path.join(defaults.userhome, "ca")
+    if not os.path.isdir(ca_dir):
+        return
+    now = time.time()
+    for name in os.listdir(ca_dir):
+        filename = os.path.join(ca_dir, name)
+        try:
+            if now - os.path.getmtime(filename) > ttl:
+                os.remove(filename)
+        except FileNotFoundError:
+            pass
 
 
 class Cluster:
@@ -14,6 +53,19 @@ class Cluster:
     A base cluster controller for scaling.
     """
 
+    # Used to name the local state file
+    provider = None
+
+    # How many pools the provider can update at once (None is no limit)
+    max_pool_updates = None
+
+    # Validates the cluster settings, see preflight
+    spec_schema = schemas.cluster_schema
+
+    # Local files and cloud names that clusters share by default {attr: default}
+    # (clusters created at once, e.g., in a Fleet, need their own)
+    shared_defaults = {}
+
     def __init__(
         self,
         name=None,
@@ -53,12 +105,286 @@ class Cluster:
         # Easy way to save times
         self.times = {}
 
+        # Shared kubernetes api client, see get_api_client
+        self.configuration = None
+        self._api_client = None
+        self._api_client_lock = threading.Lock()
+        self.ca_cert_file = None
+        self._state = None
+
+        # Coalesces scale requests, see request_scale
+        self.scale_queue = ScaleQueue(self.scale_pool)
+        self._pool_updates = None
+        if self.max_pool_updates:
+            self._pool_updates = threading.BoundedSemaphore(self.max_pool_updates)
+
     def delete_cluster(self):
         """
         Delete the cluster
         """
         raise NotImplementedError
 
+    def get_spec(self):
+        """
+        Get the cluster settings to validate (against spec_schema).
+        """
+        return {
+            "name": self.name,
+            "region": self.region,
+            "machine_type": self.machine_type,
+            "kubernetes_version": self.kubernetes_version,
+            "node_count": self.node_count,
+            "min_nodes": self.min_nodes,
+            "max_nodes": self.max_nodes,
+            "sleep_seconds": self.sleep_seconds,
+            "sleep_multiplier": self.sleep_multiplier,
+        }
+
+    @property
+    def machine_catalog(self):
+        """
+        The catalog of machine types the provider offers (None if unknown)
+        """
+        return None
+
+    def get_vcpu_quota(self, machine_type):
+        """
+        Get the (limit, usage) of vCPUs for a machine type, or None if unknown.
+
+        The usage is None if the provider only tells us the limit.
+        """
+        return None
+
+    def get_vcpu_quota_name(self, machine_type):
+        """
+        Get the name of the vCPU quota a machine type counts toward.
+        """
+        return machine_type
+
+    @property
+    def nodes_per_count(self):
+        """
+        How many nodes a pool has for each node it is scaled to (e.g., per zone)
+        """
+        return 1
+
+    def preflight(self, count=None, machine_types=None, current=0):
+        """
+        Check the spec, machine types and vCPU quota before changing anything.
+
+        The quota is checked for count nodes (max_nodes by default), of which
+        current already exist. Machine types and quotas are cached, so this is
+        fast after the first call. A check we can't do (e.g., no permission
+        to read quotas) is skipped with a warning. All problems are raised
+        together in a PreflightError.
+        """
+        spec = self.get_spec()
+        errors = validate_spec(spec, self.spec_schema)
+        if (
+            not errors
+            and not spec["min_nodes"] <= spec["node_count"] <= spec["max_nodes"]
+        ):
+            errors.append("node_count must be between min_nodes and max_nodes")
+
+        count = self.max_nodes if count is None else count
+        machine_types = machine_types or [self.machine_type]
+        try:
+            errors += self.check_capacity(count, machine_types, current)
+        except Exception as e:
+            logger.warning(f"Skipping machine type and quota checks: {e}")
+        if errors:
+            raise PreflightError(self.name, errors)
+
+    def preflight_scale(self, count, pool=None):
+        """
+        Check the quota before scaling the default pool up to count nodes.
+        """
+        pool = pool or self.default_pool_name
+        if pool == self.default_pool_name and count > self.node_count:
+            self.preflight(count, current=self.node_count)
+
+    def check_capacity(self, count, machine_types, current=0):
+        """
+        Check machine types are offered, and the vCPU quota fits count nodes.
+
+        Nodes of a pool with several machine types are spread across them,
+        so each quota is checked once, with the largest machine type that
+        counts toward it.
+        """
+        catalog = self.machine_catalog
+        if catalog is None:
+            return []
+        errors = []
+        largest = {}
+        for machine_type in machine_types:
+            machine = catalog.get(machine_type)
+            if machine is None:
+                errors.append(
+                    f"Machine type {machine_type} is not offered in {catalog.location}"
+                )
+                continue
+            name = self.get_vcpu_quota_name(machine_type)
+            if name not in largest or machine["vcpu"] > largest[name][1]:
+                largest[name] = (machine_type, machine["vcpu"])
+
+        count, current = count * self.nodes_per_count, current * self.nodes_per_count
+        for machine_type, vcpu in largest.values():
+            quota = self.get_vcpu_quota(machine_type)
+            if quota is None:
+                continue
+            limit, usage = quota
+            needed = count * vcpu
+            if usage is not None:
+                needed = max(0, count - current) * vcpu
+                limit = limit - usage
+            if needed > limit:
+                errors.append(
+                    f"{count} nodes of {machine_type} need {needed} vCPUs, "
+                    f"but the quota allows {int(limit)}"
+                )
+        return errors
+
+    def is_active(self):
+        """
+        Determine if the cluster (control plane) is up and usable.
+        """
+        raise NotImplementedError
+
+    @property
+    def state(self):
+        """
+        The local state file with discovered cluster infrastructure.
+        """
+        if self._state is None:
+            self._state = ClusterState(f"{self.provider}-{self.state_name}")
+        return self._state
+
+    @property
+    def state_name(self):
+        return f"{self.region}-{self.name}"
+
+    def get_k8s_client(self):
+        """
+        Get a CoreV1Api to interact with the cluster.
+
+        This is a thin wrapper, all instances share the one api client.
+        """
+        return k8s.CoreV1Api(self.get_api_client())
+
+    def get_nodes(self, label_selector=None):
+        """
+        Get nodes (names) and if they are Ready, optionally with a label selector.
+        """
+        kwargs = {"label_selector": label_selector} if label_selector else {}
+        nodes = {}
+        for node in self.get_k8s_client().list_node(**kwargs).items:
+            nodes[node.metadata.name] = any(
+                condition.type == "Ready" and condition.status == "True"
+                for condition in node.status.conditions or []
+            )
+        return nodes
+
+    def get_ready_nodes(self, label_selector=None):
+        """
+        Get the names of nodes that are Ready, optionally with a label selector.
+        """
+        return [name for name, ready in self.get_nodes(label_selector).items() if ready]
+
+    def watch_nodes(self, count, label_selector=None, emit=None):
+        """
+        Poll nodes until count are Ready, emitting progress as ScaleEvents.
+
+        Registered nodes are reported as instances, and Ready nodes as nodes.
+        For zero, we wait until the selector lists no nodes at all.
+        """
+        sleep = self.sleep_time
+        while True:
+            nodes = self.get_nodes(label_selector)
+            ready = sum(nodes.values())
+            if emit is not None:
+                emit(ScaleEvent("instances", len(nodes), count))
+                emit(ScaleEvent("nodes", ready, count))
+            # Scaling to zero is done when the nodes are gone, not NotReady
+            if ready == count and (count or not nodes):
+                return ready
+            deadlines.sleep(sleep)
+            sleep = sleep * self.sleep_multiplier
+
+    def get_api_client(self):
+        """
+        Get the kubernetes api client for the cluster, created once.
+
+        The client (and its connection pool) is reused across calls and
+        threads, and credentials are refreshed in place by the configuration.
+        Call close() when you are done with the cluster.
+        """
+        with self._api_client_lock:
+            if self._api_client is None:
+                if self.configuration is None:
+                    self._generate_configuration()
+                self._api_client = k8s.ApiClient(self.configuration)
+            return self._api_client
+
+    def new_configuration(self, host, ssl_ca_cert):
+        """
+        Get a kubernetes configuration with a sized connection pool.
+        """
+        configuration = k8s.Configuration()
+        configuration.host = host
+        configuration.ssl_ca_cert = ssl_ca_cert
+        configuration.connection_pool_maxsize = defaults.kubernetes_pool_size
+        configuration.api_key_prefix["authorization"] = "Bearer"
+        return configuration
+
+    def get_ca_cert_file(self, certificate):
+        """
+        Get a file with the (base64 encoded) cluster CA certificate.
+
+        Certificates are stored once in the user cache, named by the hash of
+        their content, so building a new configuration (e.g., on a token
+        refresh) reuses the same file instead of writing a new temporary one.
+        Using a file marks it as used (see prune_ca_cert_files).
+        """
+        digest = hashlib.sha256(certificate.encode("utf-8")).hexdigest()
+        ca_dir = os.path.join(defaults.userhome, "ca")
+        filename = os.path.join(ca_dir, f"{digest}.crt")
+        try:
+            os.utime(filename)
+        except FileNotFoundError:
+            mkdir_p(ca_dir)
+            tmpfile = f"{filename}.{os.getpid()}.{threading.get_ident()}"
+            with open(tmpfile, "wb") as fd:
+                fd.write(base64.b64decode(certificate))
+            os.replace(tmpfile, filename)
+        self.ca_cert_file = filename
+        return filename
+
+    def delete_ca_cert_file(self):
+        """
+        Stop using the cached CA certificate (e.g., when the cluster is deleted)
+
+        Other clusters (a second handle, a reconciler) for the same cluster
+        share the file, so we leave it and prune files that are not used.
+        """
+        self.ca_cert_file = None
+        prune_ca_cert_files()
+
+    def _generate_configuration(self):
+        """
+        Generate the kubernetes configuration (self.configuration)
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Close the kubernetes api client, releasing its threads and sockets.
+        """
+        with self._api_client_lock:
+            if self._api_client is not None:
+                self._api_client.close()
+            self._api_client = None
+            self.configuration = None
+
     def save(self, results_file):
         """
         Save results to file.
@@ -78,6 +404,185 @@ class Cluster:
         """
         raise NotImplementedError
 
+    def scale_progress(self, count, pool_name=None, min_count=None, max_count=None):
+        """
+        Scale a pool, yielding progress (ScaleEvent) as it happens.
+
+        The min_count and max_count bounds of the pool are optional.
+        """
+        raise NotImplementedError
+
+    def scale_pool(
+        self,
+        count,
+        pool=None,
+        deadline=None,
+        min_ready=None,
+        min_count=None,
+        max_count=None,
+    ):
+        """
+        Scale a node pool (the default if not provided) to count nodes.
+
+        This returns a ScaleResult, and pool updates wait their turn if the
+        provider only allows max_pool_updates at once.
+        """
+        pool = pool or self.default_pool_name
+        self.preflight_scale(count, pool)
+        events = self.scale_progress(
+            count, pool_name=pool, min_count=min_count, max_count=max_count
+        )
+        events = self.serialize_updates(events)
+        result = run_scale(events, count, deadline, min_ready)
+        self.record_scale(result, pool)
+        return result
+
+    def record_scale(self, result, pool=None):
+        """
+        Record the size of a pool after a scale (sync or async).
+
+        The queue skips requests for the size we know a pool is at, so we
+        forget it if the scale did not get there.
+        """
+        pool = pool or self.default_pool_name
+        if result.accepted and pool == self.default_pool_name:
+            self.node_count = result.count
+        if result.status in reached_statuses:
+            self.scale_queue.sizes[pool] = result.count
+        else:
+            self.scale_queue.sizes.pop(pool, None)
+
+    def scale_pools(self, counts, deadline=None, min_ready=None, bounds=None):
+        """
+        Scale several pools at once, from {pool: count}.
+
+        Each pool is updated and its nodes (found by label) waited for in its
+        own thread, and min_ready and (min, max) bounds can be given per pool
+        ({pool: count} and {pool: (min, max)}). The deadline is shared. This
+        returns {pool: ScaleResult}, and a pool that fails has status
+        "failed" (and the error) without stopping the others.
+        """
+        min_ready = min_ready or {}
+        bounds = bounds or {}
+        deadline = get_scale_deadline(deadline)
+        results = {pool: ScaleResult(count) for pool, count in counts.items()}
+
+        def scale(pool, count):
+            min_count, max_count = bounds.get(pool, (None, None))
+            try:
+                results[pool] = self.scale_pool(
+                    count,
+                    pool,
+                    deadline=deadline,
+                    min_ready=min_ready.get(pool),
+                    min_count=min_count,
+                    max_count=max_count,
+                )
+            except Exception as e:
+                logger.error(f"Scaling pool {pool} to {count} failed: {e}")
+                results[pool].error = str(e)
+                results[pool].finish("failed")
+
+        with ThreadPoolExecutor(max(1, len(counts))) as executor:
+            for pool, count in counts.items():
+                executor.submit(deadlines.propagate(scale), pool, count)
+        return results
+
+    def get_pool_sizes(self):
+        """
+        Get the size and bounds of every pool, {pool: {count, min, max}}
+        """
+        raise NotImplementedError
+
+    def hibernate(self, deadline=None):
+        """
+        Scale every pool to zero nodes, keeping the control plane.
+
+        The sizes and bounds of the pools are saved in the local state for
+        resume (hibernating again keeps them). Returns {pool: ScaleResult}.
+        """
+        pools = self.start_hibernate()
+        return self.scale_pools(
+            {pool: 0 for pool in pools},
+            deadline,
+            bounds={pool: (0, size["max"]) for pool, size in pools.items()},
+        )
+
+    def start_hibernate(self):
+        """
+        Save the pools to resume (sync or async), returning them.
+        """
+        pools = self.state.get("hibernated") or self.get_pool_sizes()
+        self.state.save(hibernated=pools)
+        print(f"💤️ Hibernating {self.name}, scaling {', '.join(pools)} to zero")
+        return pools
+
+    def resume(self, deadline=None, min_ready=None):
+        """
+        Restore every pool to its size (and bounds) from before hibernate.
+
+        The pools are scaled at once, see scale_pools.
+        """
+        pools = self.start_resume()
+        results = self.scale_pools(
+            {pool: size["count"] for pool, size in pools.items()},
+            deadline,
+            min_ready,
+            bounds={pool: (size["min"], size["max"]) for pool, size in pools.items()},
+        )
+        self.finish_resume(results)
+        return results
+
+    def start_resume(self):
+        """
+        Get the pools saved by hibernate (sync or async).
+        """
+        pools = self.state.get("hibernated")
+        if not pools:
+            raise ValueError(f"Cluster {self.name} is not hibernated.")
+        print(f"⏰️ Resuming {self.name}, scaling {', '.join(pools)}")
+        return pools
+
+    def finish_resume(self, results):
+        """
+        Forget the hibernated pools once every one of them accepted its size.
+        """
+        if all(result.accepted for result in results.values()):
+            self.state.save(hibernated=None)
+
+    def serialize_updates(self, events):
+        """
+        Hold scale progress events to max_pool_updates at once, until updated.
+        """
+        if self._pool_updates is None:
+            return events
+        return hold_until_updated(events, self._pool_updates)
+
+    def get_pool_selector(self, pool_name=None):
+        """
+        Get the label selector for nodes in a pool (None for all nodes).
+        """
+        return None
+
+    def request_scale(self, count, pool=None, deadline=None):
+        """
+        Request a pool to be scaled, coalescing with other requests.
+
+        This returns a future that resolves (to the ScaleRequest) when the
+        size is reached or a newer request for the pool supersedes it. The
+        deadline (in seconds) bounds the scale once it starts.
+        """
+        return self.scale_queue.submit(
+            count, pool or self.default_pool_name, deadline=deadline
+        )
+
+    @property
+    def default_pool_name(self):
+        """
+        The name of the pool that scale() changes.
+        """
+        return None
+
     def resize_cluster(self, *args, **kwargs):
         """
         Do the resize of the cluster
@@ -0,0 +1,161 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+# A kubectl exec credential plugin for EKS (kubescaler-eks-token).
+# This intentionally lives outside of kubescaler.scaler.aws so a cached
+# token can be served without importing boto3 or the kubernetes client,
+# and a new one only needs botocore (kubescaler.scaler.aws is lazy).
+
+import argparse
+import calendar
+import fcntl
+import hashlib
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+import kubescaler.defaults as defaults
+
+# Default ExecCredential version, if kubectl does not tell us
+default_api_version = "client.authentication.k8s.io/v1beta1"
+
+# Don't hand out a token that expires in less than this many seconds
+expiration_cushion = 60
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        description="Kubescaler EKS token (kubectl exec credential plugin)",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument("--cluster-name", help="EKS cluster name", required=True)
+    parser.add_argument("--region", help="AWS region of the cluster", default=None)
+    parser.add_argument("--role-arn", help="role to assume for the token")
+    parser.add_argument(
+        "--expire-minutes",
+        help="minutes until the token expires",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="directory for cached tokens",
+        default=os.path.join(defaults.userhome, "tokens"),
+    )
+    return parser
+
+
+def get_cache_file(cache_dir, cluster_name, region=None, role_arn=None):
+    """
+    Get the cache file for a cluster, region and role.
+    """
+    key = f"{cluster_name}:{region}:{role_arn}".encode("utf-8")
+    digest = hashlib.sha256(key).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{cluster_name}-{digest}.json")
+
+
+@contextmanager
+def locked(filename):
+    """
+    Hold an exclusive lock on a sidecar lock file.
+    """
+    with open(f"{filename}.lock", "a") as fd:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def read_cached_token(filename):
+    """
+    Read a cached token, returning None if missing, invalid, or expiring.
+    """
+    try:
+        with open(filename, "r") as fd:
+            token = json.loads(fd.read())
+        expires = time.strptime(
+            token["status"]["expirationTimestamp"], "%Y-%m-%dT%H:%M:%SZ"
+        )
+    except (OSError, ValueError, KeyError):
+        return None
+    if calendar.timegm(expires) - expiration_cushion < time.time():
+        return None
+    return token
+
+
+def write_cached_token(token, filename):
+    """
+    Atomically write a token readable only by the user.
+    """
+    tmpfile = f"{filename}.{os.getpid()}.tmp"
+    fd = os.open(tmpfile, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as fh:
+        fh.write(json.dumps(token))
+    os.replace(tmpfile, filename)
+
+
+def get_token(
+    cluster_name, region=None, role_arn=None, expire_minutes=None, cache_dir=None
+):
+    """
+    Get a token from the cache, generating (and saving) one if needed.
+
+    The token is generated at most once across concurrent kubectl processes:
+    the first takes the file lock and the others find its token after waiting.
+    """
+    cache_dir = cache_dir or os.path.join(defaults.userhome, "tokens")
+    filename = get_cache_file(cache_dir, cluster_name, region, role_arn)
+    token = read_cached_token(filename)
+    if token is not None:
+        return token
+
+    os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+    with locked(filename):
+        token = read_cached_token(filename)
+        if token is None:
+            from kubescaler.scaler.aws.token import get_bearer_token
+
+            token = get_bearer_token(cluster_name, expire_minutes, role_arn, region)
+            write_cached_token(token, filename)
+    return token
+
+
+def get_api_version():
+    """
+    The api version requested by kubectl (in KUBERNETES_EXEC_INFO)
+    """
+    exec_info = os.environ.get("KUBERNETES_EXEC_INFO")
+    if not exec_info:
+        return default_api_version
+    try:
+        return json.loads(exec_info).get("apiVersion") or default_api_version
+    except ValueError:
+        return default_api_version
+
+
+def main():
+    parser = get_parser()
+    args = parser.parse_args()
+    token = get_token(
+        args.cluster_name,
+        region=args.region,
+        role_arn=args.role_arn,
+        expire_minutes=args.expire_minutes,
+        cache_dir=args.cache_dir,
+    )
+    credential = {
+        "kind": "ExecCredential",
+        "apiVersion": get_api_version(),
+        "spec": {},
+        "status": token["status"],
+    }
+    sys.stdout.write(json.dumps(credential) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import kubescaler.deadline as deadlines
+from kubescaler.logger import logger
+
+
+class Step:
+    """
+    A step in a resource graph: a function and the steps it requires.
+    """
+
+    def __init__(self, name, func, requires=None):
+        self.name = name
+        self.func = func
+        self.requires = set(requires or [])
+
+
+class ResourceGraph:
+    """
+    Run resource creation steps as a dependency graph.
+
+    Steps start as soon as everything they require is done, so independent
+    steps (e.g., IAM roles, the keypair and the VPC stack) run concurrently.
+    Each step is expected to be a get-or-create, so running the graph again
+    after a failure (or crash) resumes: finished resources are only described.
+    Step timings are kept in times.
+    """
+
+    def __init__(self, max_workers=4):
+        self.steps = {}
+        self.max_workers = max_workers
+        self.times = {}
+
+    def add(self, name, func, requires=None):
+        """
+        Add a step. Requirements that are not in the graph are ignored,
+        so optional steps can be left out without changing their dependents.
+        """
+        self.steps[name] = Step(name, func, requires)
+        return self
+
+    def run(self):
+        """
+        Run all steps, raising the first error after running steps finish.
+        """
+        requires = {
+            name: step.requires.intersection(self.steps)
+            for name, step in self.steps.items()
+        }
+        pending = set(self.steps)
+        done = set()
+        running = {}
+        error = None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                # Schedule everything that is ready (unless we failed)
+                if error is None:
+                    for name in sorted(pending):
+                        if requires[name].issubset(done):
+                            pending.remove(name)
+                            func = deadlines.propagate(self._run_step)
+                            running[executor.submit(func, name)] = name
+
+                if not running:
+                    if error is None and pending:
+                        raise ValueError(
+                            f"Steps {', '.join(sorted(pending))} have unmet or circular requirements."
+                        )
+                    break
+
+                finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        future.result()
+                        done.add(name)
+                    except Exception as e:
+                        logger.error(f"Step {name} failed: {e}")
+                        error = error or e
+
+        if error is not None:
+            raise error
+        return self.times
+
+    def _run_step(self, name):
+        """
+        Run and time one step.
+        """
+        start = time.time()
+        try:
+            return self.steps[name].func()
+        finally:
+            self.times[name] = round(time.time() - start, 3)
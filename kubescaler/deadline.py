@@ -0,0 +1,205 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+import asyncio
+import contextvars
+import threading
+import time
+import weakref
+
+# The innermost deadline for the running thread or task
+_current = contextvars.ContextVar("kubescaler_deadline", default=None)
+
+
+class Cancelled(Exception):
+    pass
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Deadline:
+    """
+    A deadline (on the monotonic clock) that can also be cancelled.
+
+    Deadlines nest: a deadline created inside another one (with) is its
+    child, so it expires no later than its parent and is cancelled with it.
+    Wait loops call sleep() or check() (the module functions use the current
+    deadline), which raise DeadlineExceeded or Cancelled. This works in any
+    thread or coroutine, but a new thread only has the deadline if started
+    with propagate() (or given the deadline to enter). A detached deadline
+    ignores the current one, e.g., to clean up after it expired.
+
+        with Deadline(3600, name="experiment"):
+            with Deadline(600, name="scale"):
+                cluster.scale(4)
+    """
+
+    def __init__(self, seconds=None, name=None, parent=None, detach=False):
+        self.parent = None if detach else parent or current()
+        self.seconds = seconds
+        self.name = name or "deadline"
+        self.expires = None if seconds is None else time.monotonic() + seconds
+        self.reason = None
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._children = weakref.WeakSet()
+        self._tokens = {}
+        if self.parent is not None:
+            self.parent._add_child(self)
+
+    def _add_child(self, child):
+        with self._lock:
+            self._children.add(child)
+        if self.cancelled:
+            child.cancel(self.reason)
+
+    @property
+    def when(self):
+        """
+        The monotonic time we expire (the earliest of us and our parents)
+        """
+        when = self.expires
+        if self.parent is not None:
+            parent = self.parent.when
+            if parent is not None and (when is None or parent < when):
+                when = parent
+        return when
+
+    def remaining(self):
+        """
+        Seconds remaining, or None if there is no deadline.
+        """
+        when = self.when
+        return None if when is None else max(0, when - time.monotonic())
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    @property
+    def expired(self):
+        return self.remaining() == 0
+
+    def cancel(self, reason=None):
+        """
+        Cancel the deadline (and every deadline inside it).
+        """
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason or "cancelled"
+            self._event.set()
+            children = list(self._children)
+        for child in children:
+            child.cancel(self.reason)
+
+    def check(self):
+        """
+        Raise if we are cancelled or past the deadline.
+        """
+        if self.cancelled:
+            raise Cancelled(f"{self.name} was cancelled: {self.reason}")
+        if self.expired:
+            # Report the (innermost) deadline that expired
+            deadline = self
+            while deadline.expires is None or deadline.expires > time.monotonic():
+                deadline = deadline.parent
+            raise DeadlineExceeded(
+                f"{deadline.name} deadline of {deadline.seconds} seconds exceeded"
+            )
+
+    def sleep(self, seconds):
+        """
+        Sleep, waking up early (and raising) if cancelled or at the deadline.
+        """
+        self.check()
+        remaining = self.remaining()
+        if remaining is not None:
+            seconds = min(seconds, remaining)
+        self._event.wait(seconds)
+        self.check()
+
+    async def sleep_async(self, seconds):
+        """
+        Sleep in the event loop, checking at least every second.
+        """
+        end = time.monotonic() + seconds
+        while True:
+            self.check()
+            left = end - time.monotonic()
+            if left <= 0:
+                return
+            remaining = self.remaining()
+            await asyncio.sleep(min(left, 1, remaining or left))
+
+    def __enter__(self):
+        with self._lock:
+            self._tokens[get_context_key()] = _current.set(self)
+        return self
+
+    def __exit__(self, *args):
+        with self._lock:
+            token = self._tokens.pop(get_context_key())
+        _current.reset(token)
+
+
+def get_context_key():
+    """
+    Identify the thread (and asyncio task) a deadline is entered in.
+    """
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return (threading.get_ident(), id(task))
+
+
+def current():
+    """
+    Get the current (innermost) deadline, or None.
+    """
+    return _current.get()
+
+
+def remaining():
+    deadline = current()
+    return None if deadline is None else deadline.remaining()
+
+
+def check():
+    deadline = current()
+    if deadline is not None:
+        deadline.check()
+
+
+def sleep(seconds):
+    """
+    Sleep, honouring the current deadline (if there is one).
+    """
+    deadline = current()
+    if deadline is None:
+        return time.sleep(seconds)
+    deadline.sleep(seconds)
+
+
+async def sleep_async(seconds):
+    deadline = current()
+    if deadline is None:
+        return await asyncio.sleep(seconds)
+    await deadline.sleep_async(seconds)
+
+
+def propagate(func):
+    """
+    Wrap a function to run (e.g., in another thread) with the current deadline.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.run(func, *args, **kwargs)
+
+    return run
@@ -3,10 +3,28 @@
 #
 # SPDX-License-Identifier: (MIT)
 
-import signal
+import inspect
 import time
 from functools import partial, update_wrapper
 
+import kubescaler.deadline as deadlines
+from kubescaler.deadline import Deadline, DeadlineExceeded
+from kubescaler.retry import default_policy
+
+
+def get_timed_name(name, cls):
+    """
+    Get the name for a function in the timing data (times)
+    """
+    if name not in [
+        "create_cluster",
+        "delete_cluster",
+        "create_cluster_nodes",
+        "delete_nodegroup",
+    ]:
+        name = f"{name}-size-{cls.node_count}"
+    return name
+
 
 class timed:
     """
@@ -21,21 +39,25 @@ class timed:
         return partial(self.__call__, obj)
 
     def __call__(self, cls, *args, **kwargs):
-        name = self.func.__name__
-
-        if name not in [
-            "create_cluster",
-            "delete_cluster",
-            "create_cluster_nodes",
-            "delete_nodegroup",
-        ]:
-            name = f"{name}-size-{cls.node_count}"
+        if inspect.iscoroutinefunction(self.func):
+            return self.async_call(cls, *args, **kwargs)
+        name = get_timed_name(self.func.__name__, cls)
         start = time.time()
         res = self.func(cls, *args, **kwargs)
         end = time.time()
         cls.times[name] = round(end - start, 3)
         return res
 
+    async def async_call(self, cls, *args, **kwargs):
+        """
+        Time a coroutine (the time awaited, including waits on other tasks)
+        """
+        name = get_timed_name(self.func.__name__, cls)
+        start = time.time()
+        res = await self.func(cls, *args, **kwargs)
+        cls.times[name] = round(time.time() - start, 3)
+        return res
+
 
 def timed_function(func):
     """
@@ -52,55 +74,109 @@ def timed_function(func):
     return wrapper
 
 
-# https://stackoverflow.com/questions/2281850/timeout-function-if-it-takes-too-long-to-finish
-class TimeoutException(Exception):
-    pass
+# Kept for code that catches the exception of the old (SIGALRM) timeout
+TimeoutException = DeadlineExceeded
 
 
 class timeout:
     """
-    Usage: with timeout:
+    Usage: with timeout(seconds):
+
+    This is a Deadline for the block, so it works in any thread and nests.
+    Wait loops in the block raise TimeoutException (DeadlineExceeded).
     """
 
     def __init__(self, seconds=60, error_message="Timeout"):
         self.seconds = seconds
         self.error_message = error_message
-
-    def handle_timeout(self, signum, frame):
-        raise TimeoutException(self.error_message)
+        self.deadline = None
 
     def __enter__(self):
-        signal.signal(signal.SIGALRM, self.handle_timeout)
-        signal.alarm(self.seconds)
+        self.deadline = Deadline(self.seconds, name=self.error_message)
+        return self.deadline.__enter__()
 
     def __exit__(self, type, value, traceback):
-        signal.alarm(0)
+        self.deadline.__exit__(type, value, traceback)
 
 
 class retry:
     """
-    Retry a function that is part of a class
+    Retry a function that is part of a class, following a RetryPolicy.
+
+    The policy is the class retry_policy (with the provider error classifiers)
+    unless one is given, and settings (e.g., attempts or deadline) can be
+    changed for one function:
+
+        @retry
+        @retry(attempts=3, deadline=300)
+
+    The number of retries is saved in times, as <name>-retries.
     """
 
-    def __init__(self, func, attempts=5, timeout=2):
-        update_wrapper(self, func)
+    def __init__(self, func=None, policy=None, **settings):
         self.func = func
-        self.attempts = attempts
-        self.timeout = timeout
+        self.policy = policy
+        self.settings = settings
+        if func is not None:
+            update_wrapper(self, func)
 
     def __get__(self, obj, objtype):
         return partial(self.__call__, obj)
 
     def __call__(self, cls, *args, **kwargs):
+        # Used with arguments, we are given the function to decorate
+        if self.func is None:
+            return retry(cls, self.policy, **self.settings)
+        if inspect.iscoroutinefunction(self.func):
+            return self.async_call(cls, *args, **kwargs)
+        policy = self.get_policy(cls)
+        start = time.monotonic()
+        attempt = 0
+        try:
+            while True:
+                try:
+                    return self.func(cls, *args, **kwargs)
+                except Exception as e:
+                    sleep = policy.get_sleep(e, attempt, start)
+                    if sleep is None:
+                        raise
+                    print(f"Retrying in {round(sleep, 2)} seconds - error: {e}")
+                    deadlines.sleep(sleep)
+                    attempt += 1
+        finally:
+            self.record(cls, attempt)
+
+    async def async_call(self, cls, *args, **kwargs):
+        """
+        Retry a coroutine, sleeping without blocking the event loop.
+        """
+        policy = self.get_policy(cls)
+        start = time.monotonic()
         attempt = 0
-        attempts = self.attempts
-        timeout = self.timeout
-        while attempt < attempts:
-            try:
-                return self.func(cls, *args, **kwargs)
-            except Exception as e:
-                sleep = timeout + 3**attempt
-                print(f"Retrying in {sleep} seconds - error: {e}")
-                time.sleep(sleep)
-                attempt += 1
-        return self.func(cls, *args, **kwargs)
+        try:
+            while True:
+                try:
+                    return await self.func(cls, *args, **kwargs)
+                except Exception as e:
+                    sleep = policy.get_sleep(e, attempt, start)
+                    if sleep is None:
+                        raise
+                    print(f"Retrying in {round(sleep, 2)} seconds - error: {e}")
+                    await deadlines.sleep_async(sleep)
+                    attempt += 1
+        finally:
+            self.record(cls, attempt)
+
+    def get_policy(self, cls):
+        policy = self.policy or getattr(cls, "retry_policy", None) or default_policy
+        if self.settings:
+            policy = policy.replace(**self.settings)
+        return policy
+
+    def record(self, cls, attempt):
+        """
+        Save the number of retries with the timing data.
+        """
+        times = getattr(cls, "times", None)
+        if times is not None:
+            times[f"{get_timed_name(self.func.__name__, cls)}-retries"] = attempt
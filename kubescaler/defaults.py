@@ -13,6 +13,21 @@ reps = {"$install_dir": install_dir, "$root_dir": os.path.dirname(install_dir)}
 # User home
 userhome = os.path.expanduser("~/.kubescaler")
 
+# Refresh the local cluster state file after this many seconds
+state_ttl_seconds = 24 * 60 * 60
+
+# Refresh the machine type catalog after this many seconds
+catalog_ttl_seconds = 7 * 24 * 60 * 60
+
+# Remove cached CA certificates not used for this many seconds
+ca_cert_ttl_seconds = 7 * 24 * 60 * 60
+
+# Connections kept per kubernetes api client (shared by watcher threads)
+kubernetes_pool_size = 16
+
+# Threads for long blocking operations of async clusters (e.g., EKS create)
+lifecycle_workers = 16
+
 # Default Kubernetes version (aws doesn't have 1.27)
 kubernetes_version = 1.27
 
@@ -0,0 +1,201 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import kubescaler.deadline as deadlines
+from kubescaler.deadline import Deadline
+from kubescaler.logger import logger
+from kubescaler.utils import write_json
+
+
+class FleetMember:
+    """
+    A cluster in a fleet, with the node counts to scale it to (in order).
+    """
+
+    def __init__(self, cluster, schedule=None, name=None):
+        self.cluster = cluster
+        self.schedule = list(schedule or [])
+        self.name = name or cluster.name
+        self.status = "pending"
+        self.step = None
+        self.error = None
+        self.traceback = None
+
+    @property
+    def data(self):
+        data = {
+            "status": self.status,
+            "schedule": self.schedule,
+            "times": self.cluster.times,
+        }
+        try:
+            data["cluster"] = self.cluster.data
+        except Exception as e:
+            data["cluster"] = {"error": str(e)}
+        if self.error is not None:
+            data["failed_step"] = self.step
+            data["error"] = self.error
+            data["traceback"] = self.traceback
+        return data
+
+
+class Fleet:
+    """
+    Create, scale and delete many clusters concurrently.
+
+    Each cluster (member) runs its own create -> scale schedule -> delete
+    sequence in one worker of a bounded pool, so at most max_workers
+    clusters are in flight at once. A failure only stops its own cluster
+    (which is still deleted, if requested), and the results of all clusters
+    are merged into one report.
+
+    The fleet can have an overall deadline, and each step (create, scale, or
+    delete) a deadline inside it, both in seconds. Clusters are deleted
+    (with a step deadline) even after the fleet deadline, or cancel().
+    """
+
+    def __init__(self, max_workers=4, deadline=None, step_deadline=None):
+        self.max_workers = max_workers
+        self.deadline = deadline
+        self.step_deadline = step_deadline
+        self.members = {}
+        self.times = {}
+        self._lock = threading.Lock()
+        self._deadline = None
+
+    def add(self, cluster, schedule=None, name=None):
+        """
+        Add a cluster (not yet created) with a schedule of node counts.
+
+        Clusters are created at the same time, so files and names they would
+        share by default (e.g., the kube config and keypair of EKS) are
+        prefixed with the member name.
+        """
+        member = FleetMember(cluster, schedule, name)
+        if member.name in self.members:
+            raise ValueError(f"Cluster {member.name} is already in the fleet.")
+        for attr, default in cluster.shared_defaults.items():
+            if getattr(cluster, attr) == default:
+                setattr(cluster, attr, f"{member.name}-{default}")
+        self.members[member.name] = member
+        return member
+
+    def run(self, create=True, delete=True):
+        """
+        Run all clusters, and return the merged report.
+        """
+        start = time.time()
+        self._deadline = Deadline(self.deadline, name="fleet")
+        with self._deadline, ThreadPoolExecutor(self.max_workers) as executor:
+            futures = [
+                executor.submit(
+                    deadlines.propagate(self.run_member), member, create, delete
+                )
+                for member in self.members.values()
+            ]
+            for future in futures:
+                future.result()
+        self.times["fleet"] = round(time.time() - start, 3)
+        failed = self.failed
+        if failed:
+            print(f"😭️ {len(failed)} of {len(self.members)} clusters failed.")
+        else:
+            print(f"⭐️ All {len(self.members)} clusters finished.")
+        return self.report
+
+    def cancel(self, reason=None):
+        """
+        Cancel a running fleet: running steps stop at their next wait.
+        """
+        if self._deadline is not None:
+            self._deadline.cancel(reason)
+
+    def run_member(self, member, create=True, delete=True):
+        """
+        Run one cluster, recording (not raising) its errors.
+        """
+        member.status = "running"
+        try:
+            if create:
+                self.run_step(member, "create", member.cluster.create_cluster)
+            for count in member.schedule:
+                self.scale(member, count)
+            member.status = "done"
+        except Exception:
+            member.status = "failed"
+        finally:
+            if delete:
+                try:
+                    self.run_step(
+                        member, "delete", member.cluster.delete_cluster, detach=True
+                    )
+                except Exception:
+                    member.status = "failed"
+
+    def run_step(self, member, step, func, *args, detach=False):
+        """
+        Run a step for a member, recording the step and error if it fails.
+        """
+        with self._lock:
+            print(f"⚖️  {member.name}: {step}")
+        name = f"{member.name} {step}"
+        try:
+            with Deadline(self.step_deadline, name=name, detach=detach):
+                return func(*args)
+        except Exception as e:
+            logger.error(f"Cluster {member.name} failed to {step}: {e}")
+            if member.error is None:
+                member.step = step
+                member.error = str(e)
+                member.traceback = traceback.format_exc()
+            raise
+
+    def scale(self, member, count):
+        """
+        Scale a member to count nodes, timing the step.
+
+        Clusters that take autoscaling bounds (GKE) are scaled with
+        scale_up and scale_down, and otherwise with scale(count).
+        """
+        cluster = member.cluster
+        previous = cluster.node_count
+        tag = "down" if count < previous else "up"
+        if hasattr(cluster, "scale_up"):
+            func = cluster.scale_down if tag == "down" else cluster.scale_up
+        else:
+            func = cluster.scale
+
+        start = time.time()
+        self.run_step(member, f"scale_{tag}_{previous}_to_{count}", func, count)
+        cluster.times[f"scale_{tag}_{previous}_to_{count}"] = round(
+            time.time() - start, 3
+        )
+        cluster.node_count = count
+
+    @property
+    def failed(self):
+        return [name for name, m in self.members.items() if m.status == "failed"]
+
+    @property
+    def report(self):
+        """
+        Merge the results of all clusters into one report.
+        """
+        return {
+            "times": self.times,
+            "failed": self.failed,
+            "clusters": {name: m.data for name, m in self.members.items()},
+        }
+
+    def save(self, results_file):
+        """
+        Save the report to file.
+        """
+        write_json(self.report, results_file)
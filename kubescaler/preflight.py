@@ -0,0 +1,82 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+import threading
+import time
+
+import jsonschema
+
+# Validators are compiled once per schema
+validators = {}
+validators_lock = threading.Lock()
+
+
+class PreflightError(ValueError):
+    """
+    A cluster spec or request that would fail, with every problem found.
+    """
+
+    def __init__(self, name, errors):
+        self.errors = errors
+        problems = "\n".join(f"  - {error}" for error in errors)
+        super().__init__(f"Preflight checks for {name} failed:\n{problems}")
+
+
+def get_validator(schema):
+    """
+    Get the (compiled) validator for a schema.
+    """
+    key = id(schema)
+    with validators_lock:
+        if key not in validators:
+            cls = jsonschema.validators.validator_for(schema)
+            cls.check_schema(schema)
+            validators[key] = cls(schema)
+        return validators[key]
+
+
+def validate_spec(spec, schema):
+    """
+    Validate a spec, returning a list of errors (empty if valid).
+    """
+    errors = []
+    for error in sorted(get_validator(schema).iter_errors(spec), key=str):
+        field = ".".join(str(x) for x in error.absolute_path)
+        errors.append(f"{field}: {error.message}" if field else error.message)
+    return errors
+
+
+class QuotaCache:
+    """
+    Quotas from the provider, cached for ttl seconds.
+
+    Quotas change rarely, so after the first lookup a preflight check is a
+    dictionary read instead of an API call.
+    """
+
+    def __init__(self, ttl=600):
+        self.ttl = ttl
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, fetch):
+        """
+        Get a cached quota, or fetch (and cache) it.
+        """
+        with self._lock:
+            cached = self._values.get(key)
+        if cached is not None and time.time() - cached[0] < self.ttl:
+            return cached[1]
+        value = fetch()
+        with self._lock:
+            self._values[key] = (time.time(), value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+quotas = QuotaCache()
@@ -0,0 +1,168 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+import asyncio
+import threading
+import time
+
+# Starting calls per second for each service (and the burst size).
+# These are below the documented provider limits, and adapt (see TokenBucket)
+default_rates = {
+    "cloudformation": 4,
+    "ec2": 20,
+    "eks": 10,
+    "iam": 5,
+    "sts": 10,
+    "service-quotas": 5,
+    "container": 10,
+    "compute": 20,
+}
+default_rate = 10
+
+
+class TokenBucket:
+    """
+    A token bucket that paces calls to one service in one region.
+
+    Callers reserve a token and sleep for the returned delay, so waiting
+    callers are served in order without holding the lock. The rate adapts
+    with AIMD: it is cut by decrease on a throttling error (at most once per
+    cooldown seconds, since one burst is usually throttled together), and
+    grows by about increase calls per second for each second without one.
+    """
+
+    def __init__(
+        self,
+        rate,
+        burst=None,
+        min_rate=0.2,
+        max_rate=None,
+        increase=0.5,
+        decrease=0.5,
+        cooldown=1,
+    ):
+        self.rate = float(rate)
+        self.burst = burst or max(1, rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate or rate * 2
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.last_throttle = 0
+
+        # Metrics
+        self.calls = 0
+        self.throttles = 0
+        self.delayed = 0
+        self.total_delay = 0
+        self.max_delay = 0
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Take a token, and return the seconds to wait before using it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= 1
+            delay = max(0, -self.tokens / self.rate)
+            self.calls += 1
+            if delay:
+                self.delayed += 1
+                self.total_delay += delay
+                self.max_delay = max(self.max_delay, delay)
+        return delay
+
+    def acquire(self):
+        """
+        Wait (blocking) for a token.
+        """
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self):
+        """
+        Wait (in the event loop) for a token.
+        """
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+        return delay
+
+    def throttled(self):
+        """
+        The provider throttled a call: decrease the rate.
+        """
+        with self._lock:
+            self.throttles += 1
+            now = time.monotonic()
+            if now - self.last_throttle < self.cooldown:
+                return
+            self.last_throttle = now
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+
+    def succeeded(self):
+        """
+        A call was not throttled: increase the rate.
+        """
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    @property
+    def stats(self):
+        return {
+            "rate": round(self.rate, 3),
+            "calls": self.calls,
+            "throttles": self.throttles,
+            "delayed": self.delayed,
+            "total_delay": round(self.total_delay, 3),
+            "max_delay": round(self.max_delay, 3),
+        }
+
+
+class RateLimiter:
+    """
+    Process-wide token buckets, one per service and region.
+    """
+
+    def __init__(self, rates=None):
+        self.rates = dict(default_rates)
+        self.rates.update(rates or {})
+        self.buckets = {}
+        self._lock = threading.Lock()
+
+    def get(self, service, region=None):
+        """
+        Get the bucket for a service and region, created on first use.
+        """
+        key = (service, region)
+        with self._lock:
+            if key not in self.buckets:
+                rate = self.rates.get(service, default_rate)
+                self.buckets[key] = TokenBucket(rate)
+            return self.buckets[key]
+
+    def acquire(self, service, region=None):
+        return self.get(service, region).acquire()
+
+    @property
+    def stats(self):
+        with self._lock:
+            buckets = dict(self.buckets)
+        return {
+            f"{service}/{region}": bucket.stats
+            for (service, region), bucket in buckets.items()
+        }
+
+
+limiter = RateLimiter()
@@ -0,0 +1,726 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+import argparse
+import math
+import sys
+import threading
+import time
+from collections import deque
+
+from kubernetes import watch
+from kubernetes.utils.quantity import parse_quantity
+
+from kubescaler.logger import logger
+from kubescaler.utils import write_json
+
+# Pods a node can run, if the node (or catalog) doesn't say (the kubelet default)
+default_max_pods = 110
+
+# Pods that are done don't use their node
+active_pods_selector = "status.phase!=Succeeded,status.phase!=Failed"
+
+
+def parse_selector(selector):
+    """
+    Parse a label selector (key=value, !key, comma separated) to [(key, value)].
+
+    The value is None for a label that must not be set.
+    """
+    terms = []
+    for term in (selector or "").split(","):
+        term = term.strip()
+        if term.startswith("!"):
+            terms.append((term[1:], None))
+        elif "==" in term:
+            terms.append(tuple(term.split("==", 1)))
+        elif "=" in term:
+            terms.append(tuple(term.split("=", 1)))
+    return terms
+
+
+def matches_selector(terms, labels):
+    """
+    Determine if labels match a parsed selector.
+    """
+    labels = labels or {}
+    for key, value in terms:
+        if value is None and key in labels:
+            return False
+        if value is not None and labels.get(key) != value:
+            return False
+    return True
+
+
+def is_unschedulable(pod):
+    """
+    Determine if the scheduler could not place a pod on any node.
+    """
+    if pod.status.phase != "Pending" or pod.spec.node_name:
+        return False
+    return any(
+        c.type == "PodScheduled" and c.status == "False" and c.reason == "Unschedulable"
+        for c in pod.status.conditions or []
+    )
+
+
+def get_pod_requests(pod):
+    """
+    Get the (cpu, memory) a pod requests, as the scheduler checks if it fits.
+
+    Containers without requests count as zero (the scheduler only uses
+    non-zero defaults to score nodes), so such pods are limited by the
+    number of pods a node can run.
+    """
+    cpu = memory = 0
+    for container in pod.spec.containers:
+        requests = (container.resources and container.resources.requests) or {}
+        cpu += float(parse_quantity(requests.get("cpu", 0)))
+        memory += float(parse_quantity(requests.get("memory", 0)))
+
+    # Init containers run one at a time, before the others
+    for container in pod.spec.init_containers or []:
+        requests = (container.resources and container.resources.requests) or {}
+        cpu = max(cpu, float(parse_quantity(requests.get("cpu", 0))))
+        memory = max(memory, float(parse_quantity(requests.get("memory", 0))))
+    return cpu, memory
+
+
+def is_daemonset_pod(pod):
+    return any(ref.kind == "DaemonSet" for ref in pod.metadata.owner_references or [])
+
+
+class PoolPolicy:
+    """
+    How the reconciler sizes one pool.
+
+    We scale up as soon as pods are unschedulable (after scale_up_cooldown
+    seconds from the last scale finishing), and down only when the requests
+    on the pool stay under scale_down_utilization for scale_down_delay
+    seconds (and scale_down_cooldown since the last scale), to a size that
+    puts them at target_utilization. Keeping scale_down_utilization under
+    target_utilization is the hysteresis that stops a pool from flapping.
+    A scale changes at most max_step nodes (None is no limit), and stops
+    after scale_deadline seconds so a stuck scale doesn't hold the pool.
+
+    Scaling down only lowers the size of the pool, and the provider (the
+    autoscaling group or managed instance group) chooses which nodes to
+    remove. Nothing is cordoned or drained first, so pods on those nodes
+    are evicted (and rescheduled on the nodes left, which have room at
+    target_utilization). Set scale_down to False for pools with pods that
+    must not be interrupted.
+
+    The capacity of a node (node_cpu in cores, node_memory in bytes, and
+    max_pods) is taken from the pool nodes (allocatable) or the machine
+    catalog if not given. Running pods count against max_pods, so a pool
+    never scales below the nodes its pods (with or without requests) fit on.
+    """
+
+    def __init__(
+        self,
+        min_nodes=0,
+        max_nodes=3,
+        scale_up_cooldown=10,
+        scale_down_cooldown=300,
+        scale_down_delay=600,
+        scale_down_utilization=0.5,
+        target_utilization=0.7,
+        max_step=None,
+        scale_deadline=900,
+        scale_down=True,
+        node_cpu=None,
+        node_memory=None,
+        max_pods=None,
+    ):
+        if min_nodes > max_nodes:
+            raise ValueError(
+                f"min_nodes {min_nodes} is more than max_nodes {max_nodes}"
+            )
+        if scale_down_utilization >= target_utilization:
+            raise ValueError("scale_down_utilization must be under target_utilization")
+        self.min_nodes = min_nodes
+        self.max_nodes = max_nodes
+        self.scale_up_cooldown = scale_up_cooldown
+        self.scale_down_cooldown = scale_down_cooldown
+        self.scale_down_delay = scale_down_delay
+        self.scale_down_utilization = scale_down_utilization
+        self.target_utilization = target_utilization
+        self.max_step = max_step
+        self.scale_deadline = scale_deadline
+        self.scale_down = scale_down
+        self.node_cpu = node_cpu
+        self.node_memory = node_memory
+        self.max_pods = max_pods
+
+    def clamp(self, count, current):
+        """
+        Keep a desired count within the bounds, and max_step of current.
+        """
+        if self.max_step is not None:
+            count = min(max(count, current - self.max_step), current + self.max_step)
+        return min(max(count, self.min_nodes), self.max_nodes)
+
+    @property
+    def data(self):
+        return dict(self.__dict__)
+
+
+class PoolStatus:
+    """
+    What the reconciler observed for a pool in one step.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.nodes = 0
+        self.ready = 0
+        self.pending = []
+        self.oldest_pending = None
+        self.requested = [0, 0, 0]
+        self.allocatable = [0, 0, 0]
+        self.node_capacity = None
+
+    @property
+    def utilization(self):
+        """
+        The largest share of allocatable (cpu, memory or pods) used by pods.
+        """
+        shares = [r / a for r, a in zip(self.requested, self.allocatable) if a]
+        return max(shares) if shares else None
+
+    @property
+    def data(self):
+        utilization = self.utilization
+        return {
+            "nodes": self.nodes,
+            "ready": self.ready,
+            "pending": len(self.pending),
+            "utilization": None if utilization is None else round(utilization, 3),
+        }
+
+
+class Reconciler:
+    """
+    Size node pools from unschedulable pods and node utilization.
+
+    Each step lists the nodes and pods of the cluster, and for every pool
+    in pools ({pool: PoolPolicy}) computes a desired node count:
+
+    - Unschedulable pods are packed (first fit, largest first) onto new
+      nodes of the pool, and we scale up by the nodes they need beyond the
+      ones already coming.
+    - When the pool has no pending pods and low utilization, we scale down
+      (see PoolPolicy for the hysteresis and cooldowns). The provider picks
+      the nodes to remove, and their pods are evicted.
+
+    Pods go to the pool their nodeSelector chooses, or the default pool.
+    Desired counts are sent to cluster.request_scale, so scale requests
+    for a pool are coalesced and run one at a time. Steps run every
+    interval seconds, and (with watch) as soon as a pod is unschedulable,
+    batch seconds later to collect a burst. Turn off the provider cluster
+    autoscaler for the pools, or the two will fight.
+
+        reconciler = Reconciler(cluster, {"default-pool": PoolPolicy(1, 10)})
+        reconciler.run()
+
+    Decisions and scales (with how long they took) are kept in data.
+    """
+
+    def __init__(
+        self,
+        cluster,
+        pools=None,
+        interval=10,
+        batch=1,
+        watch=True,
+        dry_run=False,
+        history=1000,
+    ):
+        self.cluster = cluster
+        self.default_pool = cluster.default_pool_name
+        self.pools = pools or {
+            self.default_pool: PoolPolicy(cluster.min_nodes, cluster.max_nodes)
+        }
+        self.interval = interval
+        self.batch = batch
+        self.watch = watch
+        self.dry_run = dry_run
+        self.selectors = {
+            pool: parse_selector(cluster.get_pool_selector(pool)) for pool in self.pools
+        }
+
+        # The count each pool is scaling to, and when the last scale finished
+        self.targets = {}
+        self.inflight = {}
+        self.last_scaled = {}
+        self.low_since = {}
+
+        self.decisions = deque(maxlen=history)
+        self.scales = deque(maxlen=history)
+        self.status = {}
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._watch = None
+
+    def run(self):
+        """
+        Reconcile until stopped.
+        """
+        self._stopped.clear()
+        if self.watch:
+            threading.Thread(target=self.watch_pods, daemon=True).start()
+        print(f"🔁️ Reconciling {', '.join(self.pools)} of {self.cluster.name}")
+        while not self._stopped.is_set():
+            try:
+                self.step()
+            except Exception as e:
+                logger.error(f"Reconciling {self.cluster.name} failed: {e}")
+            if self._wakeup.wait(self.interval) and not self._stopped.is_set():
+                self._stopped.wait(self.batch)
+            self._wakeup.clear()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._watch is not None:
+            self._watch.stop()
+
+    def watch_pods(self):
+        """
+        Wake up the reconciler when the scheduler can't place a pod.
+        """
+        core = self.cluster.get_k8s_client()
+        while not self._stopped.is_set():
+            self._watch = watch.Watch()
+            try:
+                for event in self._watch.stream(
+                    core.list_pod_for_all_namespaces,
+                    field_selector="status.phase=Pending",
+                    timeout_seconds=60,
+                ):
+                    if event["type"] != "DELETED" and is_unschedulable(event["object"]):
+                        self._wakeup.set()
+            except Exception as e:
+                logger.warning(f"Watching pods failed, will retry: {e}")
+                self._stopped.wait(self.interval)
+
+    def step(self):
+        """
+        Observe the cluster and request a new size for pools that need one.
+
+        Returns {pool: desired count} for the pools we asked to scale.
+        """
+        self.status = self.observe()
+        now = time.time()
+        requested = {}
+        for pool, status in self.status.items():
+            decision = self.decide(pool, status, now)
+            if decision is None:
+                continue
+            count, reason = decision
+            self.decisions.append(
+                {
+                    "time": now,
+                    "pool": pool,
+                    "from": self.get_target(pool, status),
+                    "to": count,
+                    "reason": reason,
+                    **status.data,
+                }
+            )
+            if not self.dry_run:
+                self.request(pool, count, reason, status, now)
+            requested[pool] = count
+        return requested
+
+    def observe(self):
+        """
+        Get the nodes, pending pods and requests of each pool.
+        """
+        core = self.cluster.get_k8s_client()
+        status = {pool: PoolStatus(pool) for pool in self.pools}
+
+        node_pools = {}
+        for node in core.list_node().items:
+            pool = self.get_node_pool(node.metadata.labels)
+            if pool is None:
+                continue
+            node_pools[node.metadata.name] = pool
+            ready = any(
+                c.type == "Ready" and c.status == "True"
+                for c in node.status.conditions or []
+            )
+            status[pool].nodes += 1
+            if not ready or node.spec.unschedulable:
+                continue
+            allocatable = node.status.allocatable or {}
+            capacity = (
+                float(parse_quantity(allocatable.get("cpu", 0))),
+                float(parse_quantity(allocatable.get("memory", 0))),
+                int(allocatable.get("pods", default_max_pods)),
+            )
+            status[pool].ready += 1
+            for i, value in enumerate(capacity):
+                status[pool].allocatable[i] += value
+            status[pool].node_capacity = max(
+                status[pool].node_capacity or capacity, capacity
+            )
+
+        pods = core.list_pod_for_all_namespaces(field_selector=active_pods_selector)
+        for pod in pods.items:
+            if pod.spec.node_name in node_pools:
+                if not is_daemonset_pod(pod):
+                    cpu, memory = get_pod_requests(pod)
+                    pool = node_pools[pod.spec.node_name]
+                    status[pool].requested[0] += cpu
+                    status[pool].requested[1] += memory
+                    status[pool].requested[2] += 1
+                continue
+            if not is_unschedulable(pod):
+                continue
+            pool = self.get_pod_pool(pod.spec.node_selector)
+            if pool is None:
+                continue
+            status[pool].pending.append(get_pod_requests(pod))
+            since = self.get_pending_since(pod)
+            if (
+                status[pool].oldest_pending is None
+                or since < status[pool].oldest_pending
+            ):
+                status[pool].oldest_pending = since
+        return status
+
+    def get_node_pool(self, labels):
+        for pool, terms in self.selectors.items():
+            if matches_selector(terms, labels):
+                return pool
+
+    def get_pod_pool(self, node_selector):
+        """
+        Get the pool a pod would run in, or None if we don't manage it.
+        """
+        node_selector = node_selector or {}
+        for pool, terms in self.selectors.items():
+            if any(value is not None for _, value in terms) and matches_selector(
+                terms, node_selector
+            ):
+                return pool
+
+        # Pinned to a pool we don't manage
+        for terms in self.selectors.values():
+            if any(key in node_selector for key, _ in terms):
+                return None
+        return self.default_pool if self.default_pool in self.pools else None
+
+    def get_pending_since(self, pod):
+        for c in pod.status.conditions or []:
+            if c.type == "PodScheduled" and c.last_transition_time is not None:
+                return c.last_transition_time.timestamp()
+        return pod.metadata.creation_timestamp.timestamp()
+
+    def get_target(self, pool, status):
+        """
+        Get the count a pool is at, or scaling to.
+        """
+        future = self.inflight.get(pool)
+        if future is not None and not future.done():
+            return self.targets[pool]
+        return status.nodes
+
+    def get_node_capacity(self, pool, status):
+        """
+        Get the (cpu, memory, pods) of a node in the pool, or None if unknown.
+        """
+        policy = self.pools[pool]
+        cpu, memory, pods = status.node_capacity or (None, None, None)
+        if (cpu is None or memory is None) and pool == self.default_pool:
+            try:
+                machine = self.cluster.machine_catalog.get(self.cluster.machine_type)
+            except Exception as e:
+                logger.warning(
+                    f"Cannot get machine type {self.cluster.machine_type}: {e}"
+                )
+                machine = None
+            if machine:
+                cpu, memory = machine["vcpu"], machine["memory_mb"] * 1024 * 1024
+        cpu = policy.node_cpu or cpu
+        memory = policy.node_memory or memory
+        if not cpu or not memory:
+            return None
+        return cpu, memory, policy.max_pods or pods or default_max_pods
+
+    def count_nodes_needed(self, pending, capacity):
+        """
+        Pack pending (cpu, memory) requests onto new nodes, first fit decreasing.
+
+        The capacity is (cpu, memory, pods) of a node. Pods that don't fit on
+        an empty node can't be helped by scaling, and without a known
+        capacity every pod gets its own node.
+        """
+        if capacity is None:
+            return len(pending)
+        nodes = []
+        for cpu, memory in sorted(pending, reverse=True):
+            if cpu > capacity[0] or memory > capacity[1]:
+                continue
+            for node in nodes:
+                if node[0] >= cpu and node[1] >= memory and node[2] >= 1:
+                    node[0] -= cpu
+                    node[1] -= memory
+                    node[2] -= 1
+                    break
+            else:
+                nodes.append([capacity[0] - cpu, capacity[1] - memory, capacity[2] - 1])
+        return len(nodes)
+
+    def decide(self, pool, status, now):
+        """
+        Get the (count, reason) to scale a pool to, or None to leave it.
+        """
+        policy = self.pools[pool]
+        target = self.get_target(pool, status)
+        last_scaled = self.last_scaled.get(pool, 0)
+        inflight = target != status.nodes or (
+            pool in self.inflight and not self.inflight[pool].done()
+        )
+
+        if target < policy.min_nodes or target > policy.max_nodes:
+            self.low_since.pop(pool, None)
+            return policy.clamp(target, target), "bounds"
+
+        if status.pending:
+            self.low_since.pop(pool, None)
+            if now - last_scaled < policy.scale_up_cooldown:
+                return None
+            capacity = self.get_node_capacity(pool, status)
+            needed = self.count_nodes_needed(status.pending, capacity)
+            count = policy.clamp(status.ready + needed, target)
+            if count > target:
+                return count, f"{len(status.pending)} unschedulable pods"
+            return None
+
+        utilization = status.utilization
+        if (
+            not policy.scale_down
+            or inflight
+            or utilization is None
+            or utilization >= policy.scale_down_utilization
+        ):
+            self.low_since.pop(pool, None)
+            return None
+        low_since = self.low_since.setdefault(pool, now)
+        if (
+            now - low_since < policy.scale_down_delay
+            or now - last_scaled < policy.scale_down_cooldown
+        ):
+            return None
+
+        # Pods without requests still need a node, up to max pods per node
+        capacity = self.get_node_capacity(pool, status) or [
+            allocatable / status.ready for allocatable in status.allocatable
+        ]
+        needed = max(
+            requested / (per_node * policy.target_utilization)
+            for requested, per_node in zip(status.requested, capacity)
+            if per_node
+        )
+        count = policy.clamp(math.ceil(needed), target)
+        if count < target:
+            return count, f"utilization {round(utilization, 3)}"
+
+    def request(self, pool, count, reason, status, now):
+        """
+        Ask the cluster to scale a pool, and record how it goes.
+        """
+        print(f"🔁️ Scaling {pool} to {count} ({reason})")
+        record = {
+            "pool": pool,
+            "from": self.get_target(pool, status),
+            "to": count,
+            "reason": reason,
+            "requested": now,
+            "status": "pending",
+        }
+        if status.oldest_pending is not None:
+            record["pending_seconds"] = round(now - status.oldest_pending, 3)
+        self.scales.append(record)
+        self.low_since.pop(pool, None)
+        self.targets[pool] = count
+        future = self.cluster.request_scale(
+            count, pool, deadline=self.pools[pool].scale_deadline
+        )
+        self.inflight[pool] = future
+
+        def done(future):
+            finished = time.time()
+            error = future.exception()
+            if error is not None:
+                record["status"] = "failed"
+                record["error"] = str(error)
+            else:
+                record["status"] = future.result().status
+            record["finished"] = finished
+            record["seconds"] = round(finished - record["requested"], 3)
+            if record["status"] != "superseded":
+                self.last_scaled[pool] = finished
+            self._wakeup.set()
+
+        future.add_done_callback(done)
+        return future
+
+    @property
+    def data(self):
+        return {
+            "cluster": self.cluster.name,
+            "pools": {pool: policy.data for pool, policy in self.pools.items()},
+            "status": {pool: status.data for pool, status in self.status.items()},
+            "decisions": list(self.decisions),
+            "scales": list(self.scales),
+        }
+
+    def save(self, results_file):
+        """
+        Save the decisions and scales to file.
+        """
+        write_json(self.data, results_file)
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        description="Kubescaler reconciler (scale node pools for pending pods)",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument("provider", help="cloud provider", choices=["eks", "gke"])
+    parser.add_argument("--name", help="cluster name", required=True)
+    parser.add_argument("--region", help="region of the cluster", default=None)
+    parser.add_argument("--project", help="Google Cloud project (gke)")
+    parser.add_argument("--zone", help="zone of the cluster (gke)", default=None)
+    parser.add_argument(
+        "--eks-nodegroup",
+        help="the cluster uses a managed nodegroup (eks)",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--pool",
+        help="pool to manage, with optional bounds (name or name=min:max)\n"
+        "defaults to the default pool, with the bounds of the cluster",
+        action="append",
+        dest="pools",
+    )
+    parser.add_argument(
+        "--interval", help="seconds between steps", type=float, default=10
+    )
+    parser.add_argument(
+        "--batch", help="seconds to collect pending pods", type=float, default=1
+    )
+    parser.add_argument("--scale-up-cooldown", type=float, default=10)
+    parser.add_argument("--scale-down-cooldown", type=float, default=300)
+    parser.add_argument("--scale-down-delay", type=float, default=600)
+    parser.add_argument("--scale-down-utilization", type=float, default=0.5)
+    parser.add_argument("--target-utilization", type=float, default=0.7)
+    parser.add_argument("--max-step", help="most nodes to change at once", type=int)
+    parser.add_argument(
+        "--scale-deadline", help="seconds a scale can take", type=float, default=900
+    )
+    parser.add_argument(
+        "--no-scale-down",
+        help="only scale up (scaling down evicts the pods of removed nodes)",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--no-watch",
+        help="only reconcile every interval (don't watch pods)",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--dry-run",
+        help="decide, but don't scale",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument("--results", help="save decisions and scales to this file")
+    return parser
+
+
+def get_cluster(args):
+    """
+    Get (and load) the cluster to reconcile.
+    """
+    if args.provider == "eks":
+        from kubescaler.scaler.aws import EKSCluster
+
+        cluster = EKSCluster(
+            args.name, region=args.region, eks_nodegroup=args.eks_nodegroup
+        )
+    else:
+        from kubescaler.scaler.google import GKECluster
+
+        if not args.project:
+            sys.exit("A --project is required for gke.")
+        # A region without a zone is a regional cluster
+        kwargs = {"zone": args.zone} if args.zone or args.region else {}
+        cluster = GKECluster(args.project, name=args.name, region=args.region, **kwargs)
+    if cluster.load_cluster_info() is None:
+        sys.exit(f"Cluster {args.name} does not exist.")
+    return cluster
+
+
+def get_pools(args, cluster):
+    """
+    Get {pool: PoolPolicy} from --pool, with bounds from the cluster if not given.
+    """
+    sizes = cluster.get_pool_sizes()
+    pools = {}
+    for pool in args.pools or [cluster.default_pool_name]:
+        name, _, bounds = pool.partition("=")
+        if bounds:
+            min_nodes, max_nodes = [int(x) for x in bounds.split(":")]
+        elif name in sizes:
+            min_nodes, max_nodes = sizes[name]["min"], sizes[name]["max"]
+        else:
+            sys.exit(
+                f"Pool {name} was not found, give its bounds with --pool {name}=min:max"
+            )
+        pools[name] = PoolPolicy(
+            min_nodes,
+            max_nodes,
+            scale_up_cooldown=args.scale_up_cooldown,
+            scale_down_cooldown=args.scale_down_cooldown,
+            scale_down_delay=args.scale_down_delay,
+            scale_down_utilization=args.scale_down_utilization,
+            target_utilization=args.target_utilization,
+            max_step=args.max_step,
+            scale_deadline=args.scale_deadline,
+            scale_down=not args.no_scale_down,
+        )
+    return pools
+
+
+def main():
+    parser = get_parser()
+    args = parser.parse_args()
+    cluster = get_cluster(args)
+    reconciler = Reconciler(
+        cluster,
+        get_pools(args, cluster),
+        interval=args.interval,
+        batch=args.batch,
+        watch=not args.no_watch,
+        dry_run=args.dry_run,
+    )
+    try:
+        reconciler.run()
+    except KeyboardInterrupt:
+        reconciler.stop()
+    finally:
+        if args.results:
+            reconciler.save(args.results)
+
+
+if __name__ == "__main__":
+    main()
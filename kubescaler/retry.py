@@ -0,0 +1,103 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+import random
+import socket
+import time
+
+import kubescaler.deadline as deadlines
+
+# Kinds of errors. Only permanent errors are raised without a retry.
+THROTTLING = "throttling"
+CONFLICT = "conflict"
+TRANSIENT = "transient"
+PERMANENT = "permanent"
+
+
+def classify_error(error):
+    """
+    Classify errors that are not provider specific (network errors).
+    """
+    if isinstance(error, (ConnectionError, TimeoutError, socket.timeout)):
+        return TRANSIENT
+
+
+class RetryPolicy:
+    """
+    Decide if (and after how long) a failed call should be retried.
+
+    Errors are classified by the classifiers (functions that return a kind,
+    or None if they don't know the error) in order, and unknown errors are
+    permanent. Retries use full jitter: a random sleep between zero and an
+    exponential backoff (from the base for the kind, up to cap seconds).
+    An operation gets at most attempts retries, and is not retried if the
+    sleep would pass the deadline (in seconds from its first call) or the
+    current Deadline (see deadline.py).
+    """
+
+    # Conflicts (another update in progress) usually take a while to clear
+    default_bases = {THROTTLING: 1, CONFLICT: 5, TRANSIENT: 1}
+
+    def __init__(
+        self,
+        classifiers=None,
+        attempts=5,
+        bases=None,
+        cap=60,
+        deadline=None,
+    ):
+        self.classifiers = list(classifiers or []) + [classify_error]
+        self.attempts = attempts
+        self.bases = dict(self.default_bases)
+        self.bases.update(bases or {})
+        self.cap = cap
+        self.deadline = deadline
+
+    def replace(self, **kwargs):
+        """
+        Get a copy of the policy with some settings changed.
+        """
+        settings = {
+            "classifiers": self.classifiers[:-1],
+            "attempts": self.attempts,
+            "bases": self.bases,
+            "cap": self.cap,
+            "deadline": self.deadline,
+        }
+        settings.update(kwargs)
+        return RetryPolicy(**settings)
+
+    def classify(self, error):
+        if isinstance(error, (deadlines.Cancelled, deadlines.DeadlineExceeded)):
+            return PERMANENT
+        for classifier in self.classifiers:
+            kind = classifier(error)
+            if kind is not None:
+                return kind
+        return PERMANENT
+
+    def get_sleep(self, error, attempt, start):
+        """
+        Get the seconds to sleep before retry number attempt (from 0), or None
+        if the error should be raised.
+        """
+        kind = self.classify(error)
+        if kind == PERMANENT or attempt >= self.attempts:
+            return None
+        sleep = random.uniform(0, min(self.cap, self.bases[kind] * 2**attempt))
+        if (
+            self.deadline is not None
+            and time.monotonic() - start + sleep > self.deadline
+        ):
+            return None
+
+        # Don't sleep past the deadline we are running in
+        remaining = deadlines.remaining()
+        if remaining is not None and sleep >= remaining:
+            return None
+        return sleep
+
+
+default_policy = RetryPolicy()
@@ -1 +1,21 @@
-from .cluster import EKSCluster
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+# The clusters are imported on first use, so the token plugin can import
+# kubescaler.scaler.aws.token without boto3 or the kubernetes client.
+
+__all__ = ["AsyncEKSCluster", "EKSCluster"]
+
+
+def __getattr__(name):
+    if name == "EKSCluster":
+        from .cluster import EKSCluster
+
+        return EKSCluster
+    if name == "AsyncEKSCluster":
+        from .aio import AsyncEKSCluster
+
+        return AsyncEKSCluster
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
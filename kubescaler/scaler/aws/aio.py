@@ -0,0 +1,153 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+from functools import partial
+
+from kubescaler.aio import AsyncCluster, stream_events
+from kubescaler.decorators import timed
+from kubescaler.scaling import ScaleEvent
+
+from .cluster import EKSCluster
+from .events import StackEvents
+
+
+class AsyncEKSCluster(AsyncCluster):
+    """
+    An asyncio interface to an Amazon EKS cluster.
+
+    boto3 has no asyncio support, so each AWS call runs in the executor
+    (clients are shared, see clients.py) and the waits between polls
+    happen in the event loop. Creating and deleting the cluster (a graph
+    of CloudFormation stacks) runs in the lifecycle executor.
+    """
+
+    cluster_class = EKSCluster
+
+    async def create_cluster(self, machine_types=None, create_nodes=True):
+        """
+        Create the cluster (the resource graph runs in the lifecycle executor)
+        """
+        return await self.run_lifecycle(
+            self.cluster.create_cluster,
+            machine_types=machine_types,
+            create_nodes=create_nodes,
+        )
+
+    async def delete_cluster(self, delete_keypair=False):
+        return await self.run_lifecycle(
+            self.cluster.delete_cluster, delete_keypair=delete_keypair
+        )
+
+    @timed
+    async def scale(self, count, deadline=None, min_ready=None):
+        """
+        Scale the workers stack or nodegroup to count nodes.
+
+        This returns a ScaleResult, see EKSCluster.scale.
+        """
+        return await self.scale_pool(count, deadline=deadline, min_ready=min_ready)
+
+    async def scale_progress(
+        self, count, pool_name=None, min_count=None, max_count=None
+    ):
+        """
+        Scale a pool, yielding progress (ScaleEvent) as it happens.
+
+        The provider update, EC2 instances and kubernetes nodes are waited
+        for concurrently, and if the update fails the other waits are cancelled.
+        """
+        pool_name = pool_name or self.default_pool_name
+        node_group_name = None
+        if self.cluster.uses_workers_stack(pool_name):
+            # Only new events, or we see the status of the last update
+            events = StackEvents(self.cluster.cf, self.workers_name)
+            events = await self.run(events.skip_existing)
+            response = await self.run(
+                self.cluster.update_workers_stack, count, min_count, max_count
+            )
+            wait_for_update = partial(self.wait_for_stack_updates, events)
+        else:
+            node_group_name = pool_name
+            response = await self.run(
+                self.cluster.update_nodegroup_size,
+                count,
+                node_group_name,
+                min_count,
+                max_count,
+            )
+
+            async def wait_for_update():
+                await self.wait_for_nodegroup_update(
+                    response["update"]["id"], node_group_name
+                )
+
+        yield ScaleEvent("accepted", data=response)
+
+        # There is no update to wait for if the pool was already at the size
+        async def update(emit):
+            if response is not None:
+                await wait_for_update()
+            emit(ScaleEvent("updated"))
+
+        async def instances(emit):
+            await self.wait_for_instances(
+                count,
+                lambda n: emit(ScaleEvent("instances", n, count)),
+                node_group_name,
+            )
+
+        # Instances are counted in EC2, so we only want Ready nodes here
+        async def nodes(emit):
+            selector = self.cluster.get_pool_selector(pool_name)
+            await self.watch_nodes(
+                count, selector, emit=lambda e: e.kind == "nodes" and emit(e)
+            )
+
+        async for event in stream_events([update, instances, nodes]):
+            yield event
+
+    @timed
+    async def wait_for_stack_updates(self, events):
+        """
+        Wait for the workers stack update, from its events (StackEvents).
+        """
+        sleep = self.sleep_time
+        while True:
+            status = await self.run(events.check, ["UPDATE_COMPLETE"])
+            if status is not None:
+                return status
+            sleep = await self.sleep(sleep)
+
+    @timed
+    async def wait_for_nodegroup_update(self, update_id, node_group_name=None):
+        node_group_name = node_group_name or self.node_group_name
+        sleep = self.sleep_time
+        while True:
+            status = await self.run(
+                self.cluster.get_nodegroup_update_status, update_id, node_group_name
+            )
+            if status in ["Failed", "Cancelled"]:
+                raise ValueError(f"Nodegroup {node_group_name} update {status}")
+            if status != "InProgress":
+                print(f"The {node_group_name} is {status}")
+                return status
+            sleep = await self.sleep(sleep)
+
+    @timed
+    async def wait_for_instances(self, count, progress=None, node_group_name=None):
+        """
+        Wait for count EC2 instances (of the machine type or group) to be running.
+        """
+        sleep = self.sleep_time
+        while True:
+            instance_count = await self.run(
+                self.cluster.count_running_instances, node_group_name
+            )
+            if progress is not None:
+                progress(instance_count)
+            if instance_count == count:
+                return instance_count
+            print(f"⏱️ Waiting for {count} EC2 Instances to be Ready in AWS...")
+            sleep = await self.sleep(sleep)
@@ -3,9 +3,10 @@
 #
 # SPDX-License-Identifier: (MIT)
 
-import boto3
 from dateutil import parser
 
+from .clients import get_client
+
 # aws ssm get-parameter --name /aws/service/eks/optimized-ami/1.26/amazon-linux-2/recommended/image_id --region us-east-1 --query "Parameter.Value" --output text
 
 
@@ -13,7 +14,7 @@ def get_latest_ami(region, kubernetes_version=1.26):
     """
     Get the latest AMI for a specific region.
     """
-    client = boto3.client("ec2", region_name=region)
+    client = get_client("ec2", region)
     filters = [({"Name": "name", "Values": [f"*-eks-node-{kubernetes_version}*"]})]
     image_listing = client.describe_images(Filters=filters)
     latest = filter_images(image_listing["Images"])
@@ -0,0 +1,118 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+import json
+import threading
+import time
+from collections import Counter
+
+# Read-only calls we cache, and for how many seconds
+default_ttls = {
+    "describe_stacks": 3,
+    "describe_cluster": 5,
+    "describe_nodegroup": 3,
+}
+
+# Calls with these prefixes change a resource, and invalidate its entries
+mutating_prefixes = ("create_", "update_", "delete_")
+
+
+def get_resource(kwargs):
+    """
+    Get the name of the resource (stack or cluster) a call acts on.
+    """
+    return kwargs.get("StackName") or kwargs.get("clusterName") or kwargs.get("name")
+
+
+class DescribeCache:
+    """
+    A short lived (TTL) cache for describe calls against one cluster.
+
+    Any mutating call made through a wrapped client invalidates the cached
+    responses for the same stack or cluster. Responses are shared between
+    callers, so they must be treated as read only. Errors are never cached.
+    """
+
+    def __init__(self, ttls=None):
+        self.ttls = dict(default_ttls)
+        self.ttls.update(ttls or {})
+        self.hits = Counter()
+        self.misses = Counter()
+        self.invalidations = Counter()
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def wrap(self, client):
+        """
+        Wrap a boto3 client so its describe calls go through the cache.
+        """
+        return CachedClient(client, self)
+
+    def call(self, operation, func, **kwargs):
+        """
+        Return a cached response, or make the call and cache it.
+        """
+        key = (operation, json.dumps(kwargs, sort_keys=True, default=str))
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self.hits[operation] += 1
+                return entry[2]
+            self.misses[operation] += 1
+
+        response = func(**kwargs)
+        with self._lock:
+            self._entries[key] = (
+                get_resource(kwargs),
+                time.time() + self.ttls[operation],
+                response,
+            )
+        return response
+
+    def mutate(self, operation, func, **kwargs):
+        """
+        Make a mutating call, invalidating entries for the same resource.
+        """
+        try:
+            return func(**kwargs)
+        finally:
+            self.invalidate(get_resource(kwargs))
+            self.invalidations[operation] += 1
+
+    def invalidate(self, resource=None):
+        """
+        Invalidate entries for a resource, or everything if not provided.
+        """
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if resource is None or entry[0] == resource:
+                    del self._entries[key]
+
+    @property
+    def stats(self):
+        return {
+            "hits": dict(self.hits),
+            "misses": dict(self.misses),
+            "invalidations": dict(self.invalidations),
+        }
+
+
+class CachedClient:
+    """
+    A thin proxy for a boto3 client that routes calls through a DescribeCache.
+    """
+
+    def __init__(self, client, cache):
+        self._client = client
+        self._cache = cache
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name in self._cache.ttls:
+            return lambda **kwargs: self._cache.call(name, attr, **kwargs)
+        if name.startswith(mutating_prefixes):
+            return lambda **kwargs: self._cache.mutate(name, attr, **kwargs)
+        return attr
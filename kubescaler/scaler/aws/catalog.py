@@ -0,0 +1,46 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+import threading
+
+from kubescaler.catalog import MachineCatalog
+
+from .clients import get_client
+
+# One catalog per region, shared by clusters in the process
+catalogs = {}
+catalogs_lock = threading.Lock()
+
+
+def fetch_instance_types(region):
+    """
+    Get vCPU, memory, network and spot support for all instance types in a region.
+    """
+    ec2 = get_client("ec2", region)
+    paginator = ec2.get_paginator("describe_instance_types")
+    types = {}
+    for page in paginator.paginate():
+        for instance in page["InstanceTypes"]:
+            gpus = instance.get("GpuInfo", {}).get("Gpus", [])
+            types[instance["InstanceType"]] = {
+                "vcpu": instance["VCpuInfo"]["DefaultVCpus"],
+                "memory_mb": instance["MemoryInfo"]["SizeInMiB"],
+                "network": instance["NetworkInfo"]["NetworkPerformance"],
+                "spot": "spot" in instance.get("SupportedUsageClasses", []),
+                "gpus": sum(gpu.get("Count", 0) for gpu in gpus),
+            }
+    return types
+
+
+def get_machine_catalog(region):
+    """
+    Get the (cached) EC2 instance type catalog for a region.
+    """
+    with catalogs_lock:
+        if region not in catalogs:
+            catalogs[region] = MachineCatalog(
+                "ec2", region, lambda: fetch_instance_types(region)
+            )
+        return catalogs[region]
@@ -0,0 +1,191 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+import threading
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError, ConnectionError, HTTPClientError
+
+import kubescaler.retry as retry
+from kubescaler.ratelimit import limiter
+
+# Error codes that mean the call was throttled (as in botocore retries)
+throttling_codes = [
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "RequestThrottledException",
+    "TooManyRequestsException",
+    "ProvisionedThroughputExceededException",
+    "TransactionInProgressException",
+    "RequestLimitExceeded",
+    "BandwidthLimitExceeded",
+    "LimitExceededException",
+    "RequestThrottled",
+    "SlowDown",
+    "PriorRequestNotComplete",
+    "EC2ThrottledException",
+]
+
+
+# Another update is in progress, and we can try again when it is done
+conflict_codes = [
+    "ResourceInUseException",
+    "ConcurrentModificationException",
+    "IncorrectState",
+    "IncorrectInstanceState",
+]
+
+
+# The update would not change anything (the pool is already at the size)
+no_update_messages = [
+    "No updates are to be performed",
+    "No changes needed",
+]
+
+
+def is_no_update(error):
+    """
+    Determine if an AWS error says there was nothing to update.
+    """
+    if not isinstance(error, ClientError):
+        return False
+    message = error.response.get("Error", {}).get("Message") or ""
+    return any(x in message for x in no_update_messages)
+
+
+def classify_error(error):
+    """
+    Classify an AWS error for the retry policy.
+    """
+    if isinstance(error, (ConnectionError, HTTPClientError)):
+        return retry.TRANSIENT
+    if not isinstance(error, ClientError):
+        return
+    code = error.response.get("Error", {}).get("Code")
+    message = error.response.get("Error", {}).get("Message") or ""
+    if code in throttling_codes:
+        return retry.THROTTLING
+    if code in conflict_codes:
+        return retry.CONFLICT
+
+    # CloudFormation uses ValidationError for a stack that is being updated
+    if code == "ValidationError" and "state and can not be updated" in message:
+        return retry.CONFLICT
+    status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode") or 0
+    if status >= 500:
+        return retry.TRANSIENT
+    return retry.PERMANENT
+
+
+def add_rate_limiter(client, service, region=None):
+    """
+    Pace every request of a client with the shared token bucket.
+
+    Tokens are taken before each HTTP attempt (including botocore retries),
+    and every response updates the bucket rate.
+    """
+    bucket = limiter.get(service, region)
+
+    def before_send(**kwargs):
+        bucket.acquire()
+
+    def after_attempt(response=None, **kwargs):
+        if response is None:
+            return
+        code = response[1].get("Error", {}).get("Code")
+        if code in throttling_codes:
+            bucket.throttled()
+        else:
+            bucket.succeeded()
+
+    client.meta.events.register("before-send", before_send)
+    client.meta.events.register("needs-retry", after_attempt)
+    return client
+
+
+class ClientRegistry:
+    """
+    A process-wide registry of boto3 sessions and clients.
+
+    boto3 sessions are not thread-safe, so each thread gets its own session
+    per region and profile, but clients are, and one client per service,
+    region and profile (with its connection pool) is shared by every
+    cluster and thread. Threads started for a scale (e.g., to watch
+    instances) reuse it instead of opening new connections.
+
+    Requests are paced by our token bucket (see add_rate_limiter), so
+    botocore uses standard retries and not its own adaptive rate limiter.
+    """
+
+    def __init__(self, max_pool_connections=25, max_attempts=5, retry_mode="standard"):
+        self.config = Config(
+            max_pool_connections=max_pool_connections,
+            retries={"max_attempts": max_attempts, "mode": retry_mode},
+        )
+        self.clients = {}
+
+        # Sessions of a (region, profile) made before it was cleared are dropped
+        self._generations = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def sessions(self):
+        if not hasattr(self._local, "sessions"):
+            self._local.sessions = {}
+        return self._local.sessions
+
+    def get_session(self, region=None, profile=None):
+        """
+        Get the boto3 session for this thread, region, and profile.
+        """
+        key = (region, profile)
+        generation = self._generations.get(key, 0)
+        entry = self.sessions.get(key)
+        if entry is None or entry[0] != generation:
+            entry = (
+                generation,
+                boto3.Session(region_name=region, profile_name=profile),
+            )
+            self.sessions[key] = entry
+        return entry[1]
+
+    def get_client(self, service, region=None, profile=None):
+        """
+        Get the (shared) client for a service, region, and profile.
+        """
+        key = (service, region, profile)
+        client = self.clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            if key not in self.clients:
+                session = self.get_session(region, profile)
+                client = session.client(service, config=self.config)
+                self.clients[key] = add_rate_limiter(client, service, region)
+            return self.clients[key]
+
+    def clear(self, region=None, profile=None):
+        """
+        Drop the sessions and clients of a region and profile (e.g., for new
+        credentials). Clients already in use keep working until released.
+        """
+        key = (region, profile)
+        with self._lock:
+            self.clients = {k: v for k, v in self.clients.items() if k[1:] != key}
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+
+registry = ClientRegistry()
+
+
+def get_session(region=None, profile=None):
+    return registry.get_session(region, profile)
+
+
+def get_client(service, region=None, profile=None):
+    return registry.get_client(service, region, profile)
@@ -3,32 +3,41 @@
 #
 # SPDX-License-Identifier: (MIT)
 
-import base64
 import json
 import os
 import sys
-import tempfile
-import threading
 import time
-from datetime import datetime, timedelta
+from functools import partial
 
 try:
-    import boto3
+    import boto3  # noqa
+    from botocore.exceptions import WaiterError
 except ImportError:
     sys.exit("Please pip install kubescaler[aws]")
 
-from kubernetes import client as k8s
 from kubernetes import utils as k8sutils
 from kubernetes import watch
+from kubernetes.client.rest import ApiException
 
+import kubescaler.deadline as deadlines
+import kubescaler.schemas as schemas
 import kubescaler.utils as utils
 from kubescaler.cluster import Cluster
+from kubescaler.dag import ResourceGraph
 from kubescaler.decorators import retry, timed
 from kubescaler.logger import logger
+from kubescaler.ratelimit import limiter
+from kubescaler.retry import RetryPolicy
+from kubescaler.scaling import ScaleEvent, stream_events
 
+from . import clients
 from .ami import get_latest_ami
+from .cache import DescribeCache
+from .catalog import get_machine_catalog
+from .events import StackEvents, check_nodegroup, get_issues
+from .quotas import get_quota_code, get_vcpu_quota
 from .template import auth_config_data, vpc_template, workers_template
-from .token import get_bearer_token
+from .token import token_cache
 
 stack_failure_options = ["DELETE", "DO_NOTHING", "ROLLBACK"]
 
@@ -39,6 +48,15 @@ class EKSCluster(Cluster):
     """
 
     default_region = "us-east-2"
+    provider = "eks"
+    retry_policy = RetryPolicy([clients.classify_error])
+    spec_schema = schemas.eks_cluster_schema
+    shared_defaults = {
+        "kube_config_file": "kubeconfig-aws.yaml",
+        "keypair_name": "workers-pem",
+        "keypair_file": "aws-worker-secret.pem",
+        "auth_config_file": "aws-auth-config.yaml",
+    }
 
     def __init__(
         self,
@@ -54,6 +72,7 @@ class EKSCluster(Cluster):
         enable_cluster_autoscaler=False,
         ami_type="AL2_x86_64",
         capacity_type="ON_DEMAND",
+        token_plugin=False,
         **kwargs,
     ):
         """
@@ -65,9 +84,11 @@ class EKSCluster(Cluster):
         self.admin_role_name = admin_role_name or "EKSServiceAdmin"
 
         # Secrets files
-        self.keypair_name = keypair_name or "workers-pem"
-        self.keypair_file = keypair_file or "aws-worker-secret.pem"
-        self.auth_config_file = auth_config_file or "aws-auth-config.yaml"
+        self.keypair_name = keypair_name or self.shared_defaults["keypair_name"]
+        self.keypair_file = keypair_file or self.shared_defaults["keypair_file"]
+        self.auth_config_file = (
+            auth_config_file or self.shared_defaults["auth_config_file"]
+        )
 
         # You might want to update this to better debug (so not deleted)
         # DO_NOTHING | ROLLBACK | DELETE
@@ -82,18 +103,19 @@ class EKSCluster(Cluster):
             raise ValueError("Tags must be key value pairs (dict)")
 
         # kube config file (this is no longer used)
-        self.kube_config_file = kube_config_file or "kubeconfig-aws.yaml"
-        self.image_ami = get_latest_ami(self.region, self.kubernetes_version)
+        self.kube_config_file = (
+            kube_config_file or self.shared_defaults["kube_config_file"]
+        )
+
+        # Use kubescaler-eks-token (cached) in the kube config instead of aws
+        self.token_plugin = token_plugin
+
         self.machine_type = self.machine_type or "hpc6a.48xlarge"
         self.ami_type = ami_type or "AL2_x86_64"
         self.capacity_type = capacity_type or "ON_DEMAND"
-        self.configuration = None
-        self._kubectl = None
-        self._kubectl_token_expiration = None
-        self._stack_update_complete = True
 
-        # Client connections
-        self.new_clients()
+        # Short lived cache for describe_stacks, describe_cluster, etc.
+        self.describe_cache = DescribeCache()
 
         # Will be set later!
         self.workers_stack = None
@@ -102,15 +124,19 @@ class EKSCluster(Cluster):
         self.vpc_subnet_private = None
         self.vpc_subnet_public = None
         self.vpc_id = None
-        self.set_roles()
+        self.node_instance_role = None
+        self.node_autoscaling_group_name = None
+
+        # These are looked up (or created) on first use, or restored from state
+        self._image_ami = None
+        self._role_arn = None
+        self._instance_role_arn = None
 
         # switch for eks managed nodegroup (True) or cloudformation (False)
         self.eks_nodegroup = eks_nodegroup
 
         if self.eks_nodegroup:
             self.instance_role_name = "AmazonEKSNodeRole"
-            self.instance_role_arn = ""
-            self.set_node_role()
 
         # Specifics for setting up cluster autoscaler. we need oidc provider and a cluster autoscaler role
         self.enable_cluster_autoscaler = enable_cluster_autoscaler
@@ -126,11 +152,65 @@ class EKSCluster(Cluster):
             )
 
     def new_clients(self):
-        self.session = boto3.Session(region_name=self.region)
-        self.ec2 = self.session.client("ec2")
-        self.cf = self.session.client("cloudformation")
-        self.iam = self.session.client("iam")
-        self.eks = self.session.client("eks")
+        """
+        Drop the clients and sessions of the cluster region, e.g., to pick up
+        new credentials.
+
+        Clients are shared in the registry, so other clusters in the region
+        get the new ones too (and keep using the old ones until then).
+        """
+        clients.registry.clear(self.region)
+
+    @property
+    def session(self):
+        return clients.get_session(self.region)
+
+    @property
+    def ec2(self):
+        return clients.get_client("ec2", self.region)
+
+    @property
+    def cf(self):
+        return self.describe_cache.wrap(
+            clients.get_client("cloudformation", self.region)
+        )
+
+    @property
+    def iam(self):
+        return clients.get_client("iam", self.region)
+
+    @property
+    def eks(self):
+        return self.describe_cache.wrap(clients.get_client("eks", self.region))
+
+    @property
+    def machine_catalog(self):
+        """
+        The (cached) catalog of EC2 instance types for the region.
+        """
+        return get_machine_catalog(self.region)
+
+    def get_spec(self):
+        spec = super().get_spec()
+        spec.update(
+            {
+                "capacity_type": self.capacity_type,
+                "ami_type": self.ami_type,
+                "stack_timeout_minutes": self.stack_timeout_minutes,
+                "on_stack_failure": self.on_stack_failure,
+            }
+        )
+        return spec
+
+    def get_vcpu_quota(self, machine_type):
+        """
+        Get the running vCPU limit (Service Quotas only has the limit).
+        """
+        spot = self.capacity_type == "SPOT"
+        return get_vcpu_quota(self.region, machine_type, spot), None
+
+    def get_vcpu_quota_name(self, machine_type):
+        return get_quota_code(machine_type, self.capacity_type == "SPOT")
 
     def set_stack_failure(self, on_stack_failure):
         """
@@ -161,11 +241,52 @@ class EKSCluster(Cluster):
         machine_types is exposed to allow for custom instances request for spot!
         But you can also use create_cluster_nodes and set create_nodes to False.
         If you set create_nodes to false, it will not create the node group/nodes.
+
+        Independent steps (IAM roles, keypair, AMI lookup) run concurrently
+        with the VPC stack and control plane, and every step is a get-or-create,
+        so running this again after a failure resumes where it left off.
+        """
+        # Reject a spec that would fail before creating anything
+        self.preflight(machine_types=machine_types)
+        graph = ResourceGraph()
+
+        # If we already have (valid) state for the cluster, no need to discover it
+        if not self.restore_state():
+            graph.add("vpc", self.create_vpc)
+            graph.add("admin-role", self.set_roles)
+            graph.add("keypair", self.get_keypair)
+            graph.add("control-plane", self.create_control_plane, ["vpc", "admin-role"])
+
+        # Resources only the nodes need can be prepared at the same time
+        if self.eks_nodegroup:
+            graph.add("node-role", self.set_node_role)
+        else:
+            graph.add("ami", lambda: self.image_ami)
+        graph.add("kube-config", self.ensure_kube_config, ["control-plane"])
+        graph.run()
+        self.times.update({f"create-{k}": v for k, v in graph.times.items()})
+        self.save_state()
+
+        # Cut out early if we are not creating nodes
+        if not create_nodes:
+            print(
+                "Not creating nodes! Ensure to call create_cluster_nodes to do so and generate kubectl config."
+            )
+            return self.cluster
+        return self.create_cluster_nodes(machine_types)
+
+    def create_vpc(self):
+        """
+        Get or create the VPC stack and subnets.
         """
         print("🥞️ Creating VPC stack and subnets...")
         self.set_vpc_stack()
         self.set_subnets()
 
+    def create_control_plane(self):
+        """
+        Get or create the cluster (control plane), which must become ACTIVE.
+        """
         # Save cluster metadata so we can get the k8s client later
         try:
             self.cluster = self.eks.describe_cluster(name=self.cluster_name)
@@ -183,54 +304,59 @@ class EKSCluster(Cluster):
         # Get cluster endpoint and security info so we can make kubectl config
         self.certificate = self.cluster["cluster"]["certificateAuthority"]["data"]
         self.endpoint = self.cluster["cluster"]["endpoint"]
+        self.save_state()
 
-        # Ensure we have a config to interact with, and write the keypair file
-        self.ensure_kube_config()
-        self.get_keypair()
-
-        # Cut out early if we are not creating nodes
-        if not create_nodes:
-            print(
-                "Not creating nodes! Ensure to call create_cluster_nodes to do so and generate kubectl config."
-            )
-            return self.cluster
-        return self.create_cluster_nodes(machine_types)
-
-    @timed
     @timed
     def create_cluster_nodes(self, machine_types=None):
         """
         Create cluster nodes! This is done separately in case you are doing experiments.
         """
+        graph = ResourceGraph()
+
         # The cluster is actually created with no nodes - just the control plane!
         # Here is where we create the workers, via a stack. Because apparently
         # AWS really likes their pancakes. 🥞️
         if self.eks_nodegroup:
-            self.set_or_create_nodegroup(machine_types=machine_types)
+            graph.add(
+                "workers",
+                lambda: self.set_or_create_nodegroup(machine_types=machine_types),
+            )
         else:
             # This uses the node group / workers stack associated
-            self.set_workers_stack()
+            graph.add("workers", self.set_workers_stack)
 
-        # enabling cluster autoscaler. we will create an oidc provider and a cluster autoscaler role to be used by serviceaccount
+        # enabling cluster autoscaler. we will create an oidc provider and a cluster autoscaler
+        # role to be used by serviceaccount. This does not need to wait for the workers.
         if self.enable_cluster_autoscaler:
-            self.set_oidc_provider()
-            self.create_autoscaler_role()
-        self.create_auth_config()
+            graph.add("oidc-provider", self.set_oidc_provider)
+            graph.add("autoscaler-role", self.create_autoscaler_role, ["oidc-provider"])
+        graph.add("auth-config", self.create_auth_config, ["workers"])
 
         # We can only wait for the node group after we set the auth config!
         # I was surprised this is expecting the workers name and not the node
         # group name.
-        self.wait_for_nodes()
+        graph.add("nodes", self.wait_for_nodes, ["auth-config"])
+        graph.run()
+        self.times.update({f"create-{k}": v for k, v in graph.times.items()})
+        self.save_state()
         print(f"🦊️ Writing config file to {self.kube_config_file}")
         print(f"   Usage: kubectl --kubeconfig={self.kube_config_file} get nodes")
         return self.cluster
 
-    def load_cluster_info(self):
+    def load_cluster_info(self, create_nodes=True):
         """
         Load information for a cluster with eks describe cluster.
+
+        If we have a (valid) local state file, it is used instead. Missing
+        nodes (the workers stack or nodegroup) and keypair are created, unless
+        create_nodes is False, and then we only find them if they exist.
         """
-        self.set_vpc_stack()
-        self.set_subnets()
+        if self.restore_state():
+            self.ensure_kube_config()
+            if not self.eks_nodegroup and not self.node_instance_role:
+                self.set_workers_stack(create=create_nodes)
+                self.save_state()
+            return self.cluster
 
         try:
             self.cluster = self.eks.describe_cluster(name=self.cluster_name)
@@ -238,73 +364,168 @@ class EKSCluster(Cluster):
             print(f"Cluster - {self.cluster_name} does not exist")
             return None
 
+        self.set_vpc_stack()
+        self.set_subnets()
+
         # Get cluster endpoint and security info so we can make kubectl config
         self.certificate = self.cluster["cluster"]["certificateAuthority"]["data"]
         self.endpoint = self.cluster["cluster"]["endpoint"]
 
         # Ensure we have a config to interact with, and write the keypair file
         self.ensure_kube_config()
-        self.get_keypair()
+        if create_nodes:
+            self.get_keypair()
 
         if self.eks_nodegroup:
-            self.set_or_create_nodegroup()
+            if create_nodes:
+                self.set_or_create_nodegroup()
         else:
-            self.set_workers_stack()
+            self.set_workers_stack(create=create_nodes)
 
+        self.save_state()
         return self.cluster
 
-    def get_k8s_client(self):
+    def is_active(self):
+        """
+        Determine if the cluster exists and is ACTIVE.
+        """
+        try:
+            cluster = self.eks.describe_cluster(name=self.cluster_name)
+        except self.eks.exceptions.ResourceNotFoundException:
+            return False
+        return cluster["cluster"]["status"] == "ACTIVE"
+
+    def restore_state(self):
         """
-        Get a client to use to interact with the cluster, either corev1.api
-        or the kubernetes api client.
+        Restore discovered infrastructure from the local state file.
 
-        https://github.com/googleapis/python-container/issues/6
+        The state is validated with a single describe_cluster (the cluster
+        must be ACTIVE with the same endpoint). Returns False if the state is
+        missing, stale, or does not match, and we need to discover it again.
         """
-        # check if the kubernetes token is expired. to be on the safe side, keep a 1 minute safety cushion.
-        if self._kubectl_token_expiration:
-            if datetime.utcnow() > self._kubectl_token_expiration - timedelta(
-                minutes=1
-            ):
-                self._kubectl = None
-                self.configuration = None
+        state = self.state
+        if state.is_stale or not state.get("endpoint"):
+            return False
+        try:
+            cluster = self.eks.describe_cluster(name=self.cluster_name)
+        except Exception:
+            return False
+        info = cluster["cluster"]
+        if info["status"] != "ACTIVE" or info["endpoint"] != state.get("endpoint"):
+            logger.info(f"State for {self.cluster_name} is outdated, refreshing.")
+            return False
+
+        self.cluster = cluster
+        self.endpoint = info["endpoint"]
+        self.certificate = info["certificateAuthority"]["data"]
+        self.vpc_id = state.get("vpc_id")
+        self.vpc_security_group = state.get("vpc_security_group")
+        self.vpc_subnet_private = state.get("vpc_subnet_private")
+        self.vpc_subnet_public = state.get("vpc_subnet_public")
+        self.node_instance_role = state.get("node_instance_role")
+        self.node_autoscaling_group_name = state.get("node_autoscaling_group_name")
+        self._role_arn = state.get("role_arn") or self._role_arn
+        self._instance_role_arn = (
+            state.get("instance_role_arn") or self._instance_role_arn
+        )
+        self._image_ami = state.get("image_ami") or self._image_ami
+        return True
+
+    def save_state(self):
+        """
+        Save discovered infrastructure to the local state file.
+        """
+        self.state.save(
+            cluster_name=self.cluster_name,
+            region=self.region,
+            endpoint=self.endpoint,
+            vpc_id=self.vpc_id,
+            vpc_security_group=self.vpc_security_group,
+            vpc_subnet_private=self.vpc_subnet_private,
+            vpc_subnet_public=self.vpc_subnet_public,
+            node_instance_role=self.node_instance_role,
+            node_autoscaling_group_name=self.node_autoscaling_group_name,
+            role_arn=self._role_arn,
+            instance_role_arn=self._instance_role_arn,
+            image_ami=self._image_ami,
+            keypair_name=self.keypair_name,
+        )
 
-        if self._kubectl:
-            return self._kubectl
+    @property
+    def image_ami(self):
+        """
+        The latest EKS optimized AMI, looked up on first use.
+        """
+        if self._image_ami is None:
+            self._image_ami = get_latest_ami(self.region, self.kubernetes_version)
+        return self._image_ami
 
-        # Save the configuration for advanced users to user later
-        if not self.configuration:
-            # This is separate in case we need to manually call it (expires, etc.)
-            self._generate_configuration()
+    @property
+    def role_arn(self):
+        """
+        The EKS admin role arn, created on first use if it does not exist.
+        """
+        if self._role_arn is None:
+            self.set_roles()
+        return self._role_arn
 
-        # This has .api_client for just the api client
-        self._kubectl = k8s.CoreV1Api(k8s.ApiClient(self.configuration))
-        return self._kubectl
+    @property
+    def instance_role_arn(self):
+        """
+        The node instance role arn (eks nodegroup), created on first use.
+        """
+        if self._instance_role_arn is None:
+            self.set_node_role()
+        return self._instance_role_arn
 
     def _generate_configuration(self):
         """
         Generate the kubectl configuration, no matter what.
 
-        This is separate from the get_k8s_client function as we might want
-        to call it to regenerate the self.configuration and self._kubectl.
-        """
-        # Get a token from the aws client, which must be installed
-        # aws eks get-token --cluster-name example
-        token = get_bearer_token(self.cluster_name, self.token_expires)
-        configuration = k8s.Configuration()
-        configuration.host = self.cluster["cluster"]["endpoint"]
-        with tempfile.NamedTemporaryFile(delete=False) as ca_cert:
-            ca_cert.write(
-                base64.b64decode(
-                    self.cluster["cluster"]["certificateAuthority"]["data"]
-                )
-            )
-            configuration.ssl_ca_cert = ca_cert.name
-        configuration.api_key_prefix["authorization"] = "Bearer"
-        configuration.api_key["authorization"] = token["status"]["token"]
-        self.configuration = configuration
-        self._kubectl_token_expiration = datetime.strptime(
-            token["status"]["expirationTimestamp"], "%Y-%m-%dT%H:%M:%SZ"
+        This is separate from get_api_client as we might want to call
+        it to regenerate self.configuration (then call close() first).
+        """
+        ca_cert_file = self.get_ca_cert_file(
+            self.cluster["cluster"]["certificateAuthority"]["data"]
+        )
+        configuration = self.new_configuration(
+            self.cluster["cluster"]["endpoint"], ca_cert_file
+        )
+
+        # The shared cache generates the token (aws eks get-token --cluster-name)
+        # and swaps in a new one before it expires, so the api client (and any
+        # long running watch) can be reused for the cluster lifetime.
+        token_cache.register(
+            configuration, self.cluster_name, self.token_expires, region=self.region
         )
+        self.configuration = configuration
+
+    def close(self):
+        """
+        Close the kubernetes api client, and stop refreshing its token.
+        """
+        token_cache.forget(self.cluster_name)
+        super().close()
+
+    def wait_for(self, client, waiter_name, delay=10, max_attempts=120, **kwargs):
+        """
+        Use a boto3 waiter, one attempt at a time.
+
+        Sleeping between attempts ourselves means the wait honours the current
+        deadline (and cancellation) instead of blocking for all attempts.
+        """
+        waiter = client.get_waiter(waiter_name)
+        for attempt in range(max_attempts):
+            try:
+                return waiter.wait(
+                    WaiterConfig={"Delay": delay, "MaxAttempts": 1}, **kwargs
+                )
+            except WaiterError as e:
+                if e.kwargs.get("reason") != "Max attempts exceeded":
+                    raise
+                if attempt == max_attempts - 1:
+                    raise
+            deadlines.sleep(delay)
 
     def waiter_wait_for_nodes(self, nodegroup_name):
         """
@@ -316,37 +537,40 @@ class EKSCluster(Cluster):
         """
         try:
             print(f"Waiting for {nodegroup_name} nodegroup...")
-            waiter = self.eks.get_waiter("nodegroup_active")
             # MaxAttempts defaults to 120, and Delay 30 seconds
-            waiter.wait(clusterName=self.cluster_name, nodegroupName=nodegroup_name)
-        except Exception as e:
+            self.wait_for(
+                self.eks,
+                "nodegroup_active",
+                delay=30,
+                clusterName=self.cluster_name,
+                nodegroupName=nodegroup_name,
+            )
+        except WaiterError as e:
             # Allow waiting 3 more minutes
             print(f"Waiting for nodegroup creation exceeded wait time: {e}")
-            time.sleep(180)
+            deadlines.sleep(180)
 
     @timed
-    def wait_for_nodes(self):
+    def wait_for_nodes(self, count=None, label_selector=None, check=None):
         """
-        Wait for the nodes to be ready.
+        Wait for the nodes (node_count, or count with a label) to be ready.
+
+        If provided, check is called each time (and raises to stop waiting).
 
         We do this separately to allow timing. This function
         can't get a perfectly accurate timing given the sleep, but the
         waiter doesn't work. But I suspect the waiter has a sleep too, so
         maybe not so bad.
         """
+        count = self.node_count if count is None else count
         start = time.time()
-        kubectl = self.get_k8s_client()
         while True:
-            print(f"⏱️  Waiting for {self.node_count} nodes to be Ready...")
-            time.sleep(5)
-            nodes = kubectl.list_node()
-            ready_count = 0
-            for node in nodes.items:
-                for condition in node.status.conditions:
-                    # Don't add to node ready count if not ready
-                    if condition.type == "Ready" and condition.status == "True":
-                        ready_count += 1
-            if ready_count >= self.node_count:
+            print(f"⏱️  Waiting for {count} nodes to be Ready...")
+            deadlines.sleep(5)
+            if check is not None:
+                check()
+            ready_count = len(self.get_ready_nodes(label_selector))
+            if ready_count >= count:
                 break
         print(f"Time for kubernetes to get nodes - {time.time()-start}")
         # The waiter doesn't seem to work - so we call kubectl until it's ready
@@ -354,51 +578,102 @@ class EKSCluster(Cluster):
         return ready_count
 
     @timed
-    def watch_for_nodes_in_k8s(self, count):
-        kubectl = self.get_k8s_client()
-        watcher = watch.Watch()
-        kubernetes_nodes = {}
-        for event in watcher.stream(kubectl.list_node):
-            print(f"⏱️ Waiting for {count} nodes to be Ready...")
-            raw_object = event["raw_object"]  # raw_object is a dict
-
-            name = raw_object["metadata"]["name"]
+    def watch_for_nodes_in_k8s(self, count, progress=None, label_selector=None):
+        """
+        Watch for count nodes to be Ready, calling progress with the count.
 
-            conditions = raw_object["status"]["conditions"]
-            for condition in conditions:
-                if condition["type"] == "Ready" and condition["status"] == "True":
-                    if name not in kubernetes_nodes.keys():
-                        kubernetes_nodes[name] = {}
+        We start from a listing of the nodes (so nodes that already exist
+        count, and scaling down waits for nodes to leave) and then apply
+        watch events from its resource version. For zero, we wait for every
+        node (Ready or not) to be gone.
+        """
+        kubectl = self.get_k8s_client()
+        kwargs = {"label_selector": label_selector} if label_selector else {}
+        while True:
+            deadlines.check()
+            listing = kubectl.list_node(**kwargs)
+            kubernetes_nodes = {
+                node.metadata.name
+                for node in listing.items
+                if count == 0
+                or any(
+                    condition.type == "Ready" and condition.status == "True"
+                    for condition in node.status.conditions or []
+                )
+            }
+            if progress is not None:
+                progress(len(kubernetes_nodes))
+            if len(kubernetes_nodes) == count:
+                return count
+            self._watch_for_nodes_in_k8s(
+                kubectl,
+                count,
+                kubernetes_nodes,
+                listing.metadata.resource_version,
+                progress,
+                kwargs,
+            )
+            if len(kubernetes_nodes) == count:
+                return count
 
-                    kubernetes_nodes[name]["status"] = True
+    def _watch_for_nodes_in_k8s(
+        self, kubectl, count, kubernetes_nodes, resource_version, progress, kwargs
+    ):
+        """
+        Watch node events after a listing, ending (server side) within a
+        minute so the deadline is checked even when no nodes change.
 
-            if len(kubernetes_nodes.keys()) == count:
-                watcher.stop()
-            if not self._stack_update_complete:
-                watcher.stop()
-        return len(kubernetes_nodes.keys())
+        If the resource version is too old, we return to list again.
+        """
+        watcher = watch.Watch()
+        try:
+            for event in watcher.stream(
+                kubectl.list_node,
+                resource_version=resource_version,
+                timeout_seconds=60,
+                **kwargs,
+            ):
+                print(f"⏱️ Waiting for {count} nodes to be Ready...")
+                raw_object = event["raw_object"]  # raw_object is a dict
+                name = raw_object["metadata"]["name"]
+                conditions = raw_object["status"].get("conditions") or []
+
+                # Nodes that go away (or are no longer Ready) don't count
+                if event["type"] == "DELETED":
+                    kubernetes_nodes.discard(name)
+                elif count == 0 or any(
+                    condition["type"] == "Ready" and condition["status"] == "True"
+                    for condition in conditions
+                ):
+                    kubernetes_nodes.add(name)
+                else:
+                    kubernetes_nodes.discard(name)
+
+                if progress is not None:
+                    progress(len(kubernetes_nodes))
+                if len(kubernetes_nodes) == count:
+                    watcher.stop()
+                    return
+                deadlines.check()
+        except ApiException as e:
+            if e.status != 410:
+                raise
+            logger.debug(f"Node watch expired, listing nodes again: {e.reason}")
 
     @timed
-    def watch_for_nodes_in_aws(self, count):
+    def watch_for_nodes_in_aws(self, count, progress=None, node_group_name=None):
+        """
+        Poll for count running instances, calling progress with the count.
+        """
         while True:
             print(f"⏱️ Waiting for {count} EC2 Instances to be Ready in AWS...")
-            response = self.ec2.describe_instances(
-                Filters=[
-                    {"Name": "instance-state-name", "Values": ["running"]},
-                    {"Name": "instance-type", "Values": [self.machine_type]},
-                ],
-            )
-            instance_count = 0
-            for r in response["Reservations"]:
-                for instance in r["Instances"]:
-                    status = instance["State"]["Name"]
-                    if status == "running":
-                        instance_count += 1
-
-            if instance_count == count or (not self._stack_update_complete):
+            instance_count = self.count_running_instances(node_group_name)
+            if progress is not None:
+                progress(instance_count)
+            if instance_count == count:
                 break
             else:
-                time.sleep(5)
+                deadlines.sleep(5)
         return instance_count
 
     def create_auth_config(self):
@@ -424,14 +699,34 @@ class EKSCluster(Cluster):
                 pass
             print(f"😭️ Kubectl create from yaml returns in error: {e}")
 
-    def ensure_kube_config(self):
+    def ensure_kube_config(self, token_plugin=None):
         """
         Ensure the kubernetes kubectl config file exists
 
         Since this might change, let's always just write it again.
-        We require the user to install awscli so the aws executable
-        should be available.
-        """
+        By default the config calls the aws executable, so kubectl requires
+        the user to install awscli (pip install kubescaler[awscli]). With
+        token_plugin, it instead calls kubescaler-eks-token, which serves
+        tokens from an on-disk cache shared across kubectl invocations.
+        """
+        if token_plugin is None:
+            token_plugin = self.token_plugin
+        if token_plugin:
+            command = "kubescaler-eks-token"
+            args = ["--region", self.region, "--cluster-name", self.cluster_name]
+            if self.token_expires:
+                args += ["--expire-minutes", str(self.token_expires)]
+        else:
+            command = "aws"
+            args = [
+                "--region",
+                self.region,
+                "eks",
+                "get-token",
+                "--cluster-name",
+                self.cluster_name,
+            ]
+
         cluster_config = {
             "apiVersion": "v1",
             "kind": "Config",
@@ -455,15 +750,8 @@ class EKSCluster(Cluster):
                     "user": {
                         "exec": {
                             "apiVersion": "client.authentication.k8s.io/v1beta1",
-                            "command": "aws",
-                            "args": [
-                                "--region",
-                                self.region,
-                                "eks",
-                                "get-token",
-                                "--cluster-name",
-                                self.cluster_name,
-                            ],
+                            "command": command,
+                            "args": args,
                         }
                     },
                 }
@@ -481,6 +769,13 @@ class EKSCluster(Cluster):
         except Exception:
             return self.create_keypair()
 
+    def delete_keypair(self):
+        """
+        Delete the keypair (the local keypair file is kept)
+        """
+        print(f"🔑️ Deleting keypair {self.keypair_name}...")
+        return self.ec2.delete_key_pair(KeyName=self.keypair_name)
+
     def create_keypair(self):
         """
         Create the keypair secret and associated file.
@@ -494,13 +789,17 @@ class EKSCluster(Cluster):
         os.chmod(self.keypair_file, 400)
         return key
 
-    def set_workers_stack(self):
+    def set_workers_stack(self, create=True):
         """
         Get or create the workers stack, or the nodes for the cluster.
+
+        With create False, a missing stack is left missing.
         """
         try:
             self.workers_stack = self.cf.describe_stacks(StackName=self.workers_name)
         except Exception:
+            if not create:
+                return
             self.workers_stack = self.create_workers_stack()
 
         # We need this role to later associate master with workers
@@ -685,13 +984,14 @@ class EKSCluster(Cluster):
         node_group_name = node_group_name or self.node_group_name
         min_nodes = min_nodes or self.min_nodes
         max_nodes = max_nodes or self.max_nodes
-        node_count = node_count or self.node_count
+        node_count = self.node_count if node_count is None else node_count
         capacity_type = capacity_type or self.capacity_type
 
         # Allow a custom set of 'on the fly' machine types for spot experiments
         machine_types = machine_types or []
         if not machine_types:
             machine_types = [self.machine_type]
+        self.preflight(max_nodes, machine_types)
 
         node_group = self.eks.create_nodegroup(
             clusterName=self.cluster_name,
@@ -716,7 +1016,7 @@ class EKSCluster(Cluster):
             capacityType=capacity_type,
         )
         print(f"The status of nodegroup {node_group['nodegroup']['status']}")
-        return self._create_nodegroup(node_group, node_group_name)
+        return self._create_nodegroup(node_group, node_group_name, node_count)
 
     @timed
     def new_cluster(self):
@@ -736,8 +1036,9 @@ class EKSCluster(Cluster):
             },
         )
         logger.info("⭐️ Cluster creation started! Waiting...")
-        waiter = self.eks.get_waiter("cluster_active")
-        waiter.wait(name=self.cluster_name)
+        self.wait_for(
+            self.eks, "cluster_active", max_attempts=180, name=self.cluster_name
+        )
 
         # When it's ready, save the cluster
         return self.eks.describe_cluster(name=self.cluster_name)
@@ -780,26 +1081,32 @@ class EKSCluster(Cluster):
         if "StackId" not in stack:
             raise ValueError("Could not create VPC stack")
 
-        try:
-            logger.info(f"Waiting for {stack_name} stack...")
-            waiter = self.cf.get_waiter("stack_create_complete")
-            # MaxAttempts defaults to 120, and Delay 30 seconds
-            waiter.wait(StackName=stack_name)
-        except Exception as e:
-            # Allow waiting 3 more minutes
-            print(f"Waiting for stack creation exceeded wait time: {e}")
-            time.sleep(180)
+        # Watch the stack events, so a failed resource (or rollback) stops
+        # the wait right away with the reason. The stack has its own timeout.
+        logger.info(f"Waiting for {stack_name} stack...")
+        StackEvents(self.cf, stack_name).wait(["CREATE_COMPLETE"])
 
         # Retrieve the same metadata if we had retrieved it
         return self.cf.describe_stacks(StackName=stack_name)
 
-    def _create_nodegroup(self, node_group, nodegroup_name):
+    def _create_nodegroup(self, node_group, nodegroup_name, node_count=None):
         if node_group is None:
             raise ValueError("Could not create nodegroup")
 
         # DO NOT USE THE WAITER, it is buggy and does not work.
         # self.waiter_wait_for_nodes(nodegroup_name)
-        self.wait_for_nodes()
+        # While waiting, a failed create or new fatal health issue (e.g., a
+        # missing IAM role) stops the wait with the reason.
+        known = get_issues(self.get_nodegroup(nodegroup_name))
+
+        def check():
+            check_nodegroup(self.get_nodegroup(nodegroup_name), known)
+
+        # A one off group waits for its own nodes (by label)
+        selector = None
+        if nodegroup_name != self.node_group_name:
+            selector = self.get_pool_selector(nodegroup_name)
+        self.wait_for_nodes(node_count, selector, check)
 
         # Retrieve the same metadata if we had retrieved it
         return self.eks.describe_nodegroup(
@@ -818,9 +1125,10 @@ class EKSCluster(Cluster):
             return
         try:
             logger.info(f"Waiting for {stack_name} to be deleted..")
-            waiter = self.cf.get_waiter("stack_delete_complete")
-            waiter.wait(StackName=stack_name)
-        except Exception:
+            self.wait_for(
+                self.cf, "stack_delete_complete", max_attempts=360, StackName=stack_name
+            )
+        except WaiterError:
             raise ValueError("Waiting for stack deletion exceeded wait time.")
 
     def set_roles(self):
@@ -831,8 +1139,13 @@ class EKSCluster(Cluster):
             # See if role exists.
             self.role = self.iam.get_role(RoleName=self.admin_role_name)
         except Exception:
-            self.role = self.create_role()
-        self.role_arn = self.role["Role"]["Arn"]
+            try:
+                self.role = self.create_role()
+
+            # Another cluster (e.g., in a fleet) created it first
+            except self.iam.exceptions.EntityAlreadyExistsException:
+                self.role = self.iam.get_role(RoleName=self.admin_role_name)
+        self._role_arn = self.role["Role"]["Arn"]
 
     def create_role(self):
         """
@@ -887,8 +1200,11 @@ class EKSCluster(Cluster):
             # See if role exists.
             self.instance_role = self.iam.get_role(RoleName=self.instance_role_name)
         except Exception:
-            self.instance_role = self.create_instance_role()
-        self.instance_role_arn = self.instance_role["Role"]["Arn"]
+            try:
+                self.instance_role = self.create_instance_role()
+            except self.iam.exceptions.EntityAlreadyExistsException:
+                self.instance_role = self.iam.get_role(RoleName=self.instance_role_name)
+        self._instance_role_arn = self.instance_role["Role"]["Arn"]
 
     def create_instance_role(self):
         """
@@ -1024,36 +1340,38 @@ class EKSCluster(Cluster):
                 self.vpc_subnet_private = output["OutputValue"].split(",")
 
     @timed
-    def wait_for_stack_updates(self):
+    def wait_for_stack_updates(self, events=None):
+        """
+        Wait for the workers stack update, with its events if provided.
+
+        The events (StackEvents) fail fast with the failing resource.
+        """
+        if events is not None:
+            return events.wait(["UPDATE_COMPLETE"])
         while True:
-            stack_update = self.cf.describe_stacks(StackName=self.workers_name)
-            current_status = stack_update["Stacks"][0]["StackStatus"]
-            if "PROGRESS" in current_status:
-                print(f"The stack-{self.workers_name} is {current_status}")
-            elif "FAILED" in current_status:
-                self._stack_update_complete = False
-            else:
-                print(f"The stack-{self.workers_name} is {current_status}")
+            current_status = self.get_stack_status()
+            if "FAILED" in current_status or "ROLLBACK" in current_status:
+                raise ValueError(
+                    f"Stack {self.workers_name} update failed: {current_status}"
+                )
+            print(f"The stack-{self.workers_name} is {current_status}")
+            if "PROGRESS" not in current_status:
                 break
-            time.sleep(5)
+            deadlines.sleep(5)
 
     @timed
-    def wait_for_nodegroup_update(self, update_id):
+    def wait_for_nodegroup_update(self, update_id, node_group_name=None):
+        node_group_name = node_group_name or self.node_group_name
         while True:
-            response = self.eks.describe_update(
-                name=self.cluster_name,
-                updateId=update_id,
-                nodegroupName=self.node_group_name,
+            current_status = self.get_nodegroup_update_status(
+                update_id, node_group_name
             )
-            current_status = response["update"]["status"]
-            if current_status == "InProgress":
-                print(f"The {self.node_group_name} is {current_status}")
-            elif current_status == "Failed" or current_status == "Cancelled":
-                self._stack_update_complete = False
-            else:
-                print(f"The {self.node_group_name} is {current_status}")
+            if current_status == "Failed" or current_status == "Cancelled":
+                raise ValueError(f"Nodegroup {node_group_name} update {current_status}")
+            print(f"The {node_group_name} is {current_status}")
+            if current_status != "InProgress":
                 break
-            time.sleep(5)
+            deadlines.sleep(5)
 
     @property
     def vpc_subnet_ids(self):
@@ -1096,62 +1414,103 @@ class EKSCluster(Cluster):
 
         try:
             logger.info(f"Waiting for {node_group_name} to be deleted..")
-            waiter = self.eks.get_waiter("nodegroup_deleted")
-            waiter.wait(clusterName=self.cluster_name, nodegroupName=node_group_name)
-        except Exception:
+            self.wait_for(
+                self.eks,
+                "nodegroup_deleted",
+                clusterName=self.cluster_name,
+                nodegroupName=node_group_name,
+            )
+        except WaiterError:
             raise ValueError("Waiting for nodegroup deletion exceeded wait time.")
         else:
             print(f"Node group {node_group_name} is deleted successfully")
 
+    def list_nodegroups(self):
+        """
+        List the names of all nodegroups on the cluster (including one-offs)
+        """
+        names = []
+        try:
+            paginator = self.eks.get_paginator("list_nodegroups")
+            for page in paginator.paginate(clusterName=self.cluster_name):
+                names += page["nodegroups"]
+        except self.eks.exceptions.ResourceNotFoundException:
+            pass
+        return names
+
     @timed
     def _delete_cluster(self):
         while True:
             try:
                 self.eks.delete_cluster(name=self.cluster_name)
             except self.eks.exceptions.ResourceInUseException as e:
-                print(f"The cluster resources are busy, retry in a few seconds: {e}")
-                time.sleep(60)
+                # Usually nodegroups still deleting, or an update in progress
+                print(f"The cluster resources are busy, waiting for them: {e}")
+                self.wait_for_nodegroups_deleted()
                 continue
             except self.eks.exceptions.ResourceNotFoundException as e:
                 print(f"⏳️ Cluster likely already deleted: {e}")
                 return
             break
         print("⏳️ Cluster deletion started! Waiting...")
-        waiter = self.eks.get_waiter("cluster_deleted")
-        waiter.wait(name=self.cluster_name)
+        self.wait_for(self.eks, "cluster_deleted", name=self.cluster_name)
+
+    def wait_for_nodegroups_deleted(self):
+        """
+        Wait for any remaining nodegroups to be deleted, or a short poll if none.
+        """
+        nodegroups = self.list_nodegroups()
+        if not nodegroups:
+            deadlines.sleep(5)
+        for nodegroup in nodegroups:
+            self.wait_for(
+                self.eks,
+                "nodegroup_deleted",
+                clusterName=self.cluster_name,
+                nodegroupName=nodegroup,
+            )
 
     @timed
-    def delete_cluster(self):
+    def delete_cluster(self, delete_keypair=False):
         """
         Delete the cluster
 
         Let's be conservative and leave the kube config files, because if
         something goes wrong we want to be able to interact with them.
-        And let's go backwards - deleting first what we created last.
+        Deletion runs as a graph: all nodegroups on the cluster (including
+        one-off groups) are deleted at once, the cluster as soon as they are
+        gone, and then the VPC. The OIDC stack, autoscaler role and keypair
+        don't depend on anything, so they are deleted at the same time.
+
+        We keep the keypair by default, assuming it could be reused elsewhere
+        and a deletion might be unexpected to the user.
         """
         logger.info("🔨️ Deleting node workers...")
-        logger.info(
-            "    If you have one-off created nodegroups, you'll need to delete them yourself."
-        )
-        if self.eks_nodegroup:
-            self.delete_nodegroup(self.node_group_name)
-        else:
-            self.delete_workers_stack()
-        # We could delete keypair, but let's keep for now, assuming could be reused elsewhere
-        # and a deletion might be unexpected to the user
-
-        # An error occurred (ResourceInUseException) when calling the DeleteCluster operation: Cannot delete because cluster <name> currently has an update in progress
-        # TODO Make a good design for this portion
-        self._delete_cluster()
+        graph = ResourceGraph(max_workers=8)
+        nodegroups = []
+        for nodegroup in self.list_nodegroups():
+            nodegroups.append(f"nodegroup-{nodegroup}")
+            graph.add(nodegroups[-1], partial(self.delete_nodegroup, nodegroup))
+        if not self.eks_nodegroup:
+            graph.add("workers", self.delete_workers_stack)
+
+        # An error occurred (ResourceInUseException) when calling the DeleteCluster operation:
+        # Cannot delete because cluster <name> currently has an update in progress
+        graph.add("cluster", self._delete_cluster, nodegroups)
 
         # Delete the VPC stack and we are done!
-        print("🥅️ Deleting VPC and associated assets...")
-        self.delete_vpc_stack()
-
+        graph.add("vpc", self.delete_vpc_stack, ["cluster", "workers"])
         if self.enable_cluster_autoscaler:
-            self.delete_oidc_provider_stack()
-            self.delete_autoscaler_role()
-
+            graph.add("oidc-provider", self.delete_oidc_provider_stack)
+            graph.add("autoscaler-role", self.delete_autoscaler_role)
+        if delete_keypair:
+            graph.add("keypair", self.delete_keypair)
+        graph.run()
+        self.times.update({f"delete-{k}": v for k, v in graph.times.items()})
+
+        self.close()
+        self.delete_ca_cert_file()
+        self.state.delete()
         print("⭐️ Done!")
 
     @property
@@ -1167,126 +1526,279 @@ class EKSCluster(Cluster):
             "region": self.region,
             "tags": self.tags,
             "description": self.description,
+            "describe_cache": self.describe_cache.stats,
+            "rate_limits": limiter.stats,
         }
 
-    def scale(self, count):
-        if self.eks_nodegroup:
-            return self._scale_using_eks_nodegroup(count)
+    @retry
+    def update_workers_stack(self, count, min_nodes=None, max_nodes=None):
+        """
+        Request a new desired size (and bounds) for the workers stack.
 
-        return self._scale_using_cf(count)
+        This returns None if the stack already has them.
+        """
+        min_nodes = self.min_nodes if min_nodes is None else min_nodes
+        max_nodes = self.max_nodes if max_nodes is None else max_nodes
+        parameters = [
+            {
+                "ParameterKey": "NodeAutoScalingGroupDesiredCapacity",
+                "ParameterValue": str(count),
+            },
+            {"ParameterKey": "ClusterName", "UsePreviousValue": True},
+            {
+                "ParameterKey": "ClusterControlPlaneSecurityGroup",
+                "ParameterValue": self.vpc_security_group,
+            },
+            {
+                "ParameterKey": "NodeGroupName",
+                "ParameterValue": self.node_group_name,
+            },
+            {
+                "ParameterKey": "NodeAutoScalingGroupMinSize",
+                "ParameterValue": str(min_nodes),
+            },
+            {
+                "ParameterKey": "NodeAutoScalingGroupDesiredCapacity",
+                "ParameterValue": str(count),
+            },
+            {
+                "ParameterKey": "NodeAutoScalingGroupMaxSize",
+                "ParameterValue": str(max_nodes),
+            },
+            {
+                "ParameterKey": "NodeInstanceType",
+                "ParameterValue": self.machine_type,
+            },
+            {"ParameterKey": "KeyName", "ParameterValue": self.keypair_name},
+            {"ParameterKey": "VpcId", "ParameterValue": self.vpc_id},
+            {
+                "ParameterKey": "Subnets",
+                "ParameterValue": ",".join(self.vpc_subnet_ids),
+            },
+        ]
+        try:
+            return self.cf.update_stack(
+                StackName=self.workers_name,
+                UsePreviousTemplate=True,
+                Capabilities=["CAPABILITY_IAM"],
+                Parameters=parameters,
+            )
+        except Exception as e:
+            if not clients.is_no_update(e):
+                raise
+        print(f"🥞️ Stack {self.workers_name} is already at {count} nodes")
 
     @retry
-    def _scale_using_cf(self, count):
+    def update_nodegroup_size(
+        self, count, node_group_name=None, min_nodes=None, max_nodes=None
+    ):
         """
-        Make a request to scale the cluster.
+        Request a new desired size (and bounds) for a nodegroup (no waiting).
 
-        Note that this currently only supports the node group associated directly
-        with the cluster (not one that you manually create).
+        A one off nodegroup keeps its own min and max size, widened to count.
+        This returns None if the nodegroup already has them.
         """
-        response = self.cf.update_stack(
-            StackName=self.workers_name,
-            UsePreviousTemplate=True,
-            Capabilities=["CAPABILITY_IAM"],
-            Parameters=[
-                {
-                    "ParameterKey": "NodeAutoScalingGroupDesiredCapacity",
-                    "ParameterValue": str(count),
-                },
-                {"ParameterKey": "ClusterName", "UsePreviousValue": True},
-                {
-                    "ParameterKey": "ClusterControlPlaneSecurityGroup",
-                    "ParameterValue": self.vpc_security_group,
-                },
-                {
-                    "ParameterKey": "NodeGroupName",
-                    "ParameterValue": self.node_group_name,
-                },
-                {
-                    "ParameterKey": "NodeAutoScalingGroupMinSize",
-                    "ParameterValue": str(self.min_nodes),
-                },
-                {
-                    "ParameterKey": "NodeAutoScalingGroupDesiredCapacity",
-                    "ParameterValue": str(count),
-                },
-                {
-                    "ParameterKey": "NodeAutoScalingGroupMaxSize",
-                    "ParameterValue": str(self.max_nodes),
+        node_group_name = node_group_name or self.node_group_name
+        if min_nodes is None or max_nodes is None:
+            min_nodes, max_nodes = self.min_nodes, self.max_nodes
+            if node_group_name != self.node_group_name:
+                scaling = self.get_nodegroup_scaling(node_group_name)
+                min_nodes = min(scaling["minSize"], count)
+                max_nodes = max(scaling["maxSize"], count)
+        try:
+            return self.eks.update_nodegroup_config(
+                clusterName=self.cluster_name,
+                nodegroupName=node_group_name,
+                scalingConfig={
+                    "minSize": min_nodes,
+                    "maxSize": max_nodes,
+                    "desiredSize": count,
                 },
+            )
+        except Exception as e:
+            if not clients.is_no_update(e):
+                raise
+        print(f"🥞️ Nodegroup {node_group_name} is already at {count} nodes")
+
+    def get_nodegroup(self, node_group_name=None):
+        """
+        Describe a nodegroup (status, health, scaling config, etc.)
+        """
+        nodegroup = self.eks.describe_nodegroup(
+            clusterName=self.cluster_name,
+            nodegroupName=node_group_name or self.node_group_name,
+        )
+        return nodegroup["nodegroup"]
+
+    def get_nodegroup_scaling(self, node_group_name=None):
+        """
+        Get the scaling config (minSize, maxSize, desiredSize) of a nodegroup.
+        """
+        return self.get_nodegroup(node_group_name)["scalingConfig"]
+
+    def get_pool_sizes(self):
+        """
+        Get the size and bounds of the workers stack and every nodegroup.
+        """
+        pools = {}
+        if not self.eks_nodegroup:
+            stack = self.cf.describe_stacks(StackName=self.workers_name)
+            params = {
+                param["ParameterKey"]: param.get("ParameterValue")
+                for param in stack["Stacks"][0]["Parameters"]
+            }
+            pools[self.workers_name] = {
+                "count": int(params["NodeAutoScalingGroupDesiredCapacity"]),
+                "min": int(params["NodeAutoScalingGroupMinSize"]),
+                "max": int(params["NodeAutoScalingGroupMaxSize"]),
+            }
+        for name in self.list_nodegroups():
+            scaling = self.get_nodegroup_scaling(name)
+            pools[name] = {
+                "count": scaling["desiredSize"],
+                "min": scaling["minSize"],
+                "max": scaling["maxSize"],
+            }
+        return pools
+
+    def get_stack_status(self, stack_name=None):
+        """
+        Get the status of a stack (the workers stack by default)
+        """
+        stack = self.cf.describe_stacks(StackName=stack_name or self.workers_name)
+        return stack["Stacks"][0]["StackStatus"]
+
+    def get_nodegroup_update_status(self, update_id, node_group_name=None):
+        """
+        Get the status of a nodegroup update (InProgress, Failed, Successful...)
+        """
+        response = self.eks.describe_update(
+            name=self.cluster_name,
+            updateId=update_id,
+            nodegroupName=node_group_name or self.node_group_name,
+        )
+        return response["update"]["status"]
+
+    def count_running_instances(self, node_group_name=None):
+        """
+        Count running EC2 instances of the workers stack (or a nodegroup).
+
+        With a node_group_name, count the instances EKS tagged for that group.
+        Otherwise we count the instances of the workers autoscaling group, or
+        (if we don't know it) the cluster instances of the machine type.
+        """
+        filters = [{"Name": "instance-state-name", "Values": ["running"]}]
+        if node_group_name:
+            filters += [
+                {"Name": "tag:eks:cluster-name", "Values": [self.cluster_name]},
+                {"Name": "tag:eks:nodegroup-name", "Values": [node_group_name]},
+            ]
+        elif self.node_autoscaling_group_name:
+            filters.append(
                 {
-                    "ParameterKey": "NodeInstanceType",
-                    "ParameterValue": self.machine_type,
-                },
-                {"ParameterKey": "KeyName", "ParameterValue": self.keypair_name},
-                {"ParameterKey": "VpcId", "ParameterValue": self.vpc_id},
+                    "Name": "tag:aws:autoscaling:groupName",
+                    "Values": [self.node_autoscaling_group_name],
+                }
+            )
+        else:
+            filters += [
                 {
-                    "ParameterKey": "Subnets",
-                    "ParameterValue": ",".join(self.vpc_subnet_ids),
+                    "Name": "tag-key",
+                    "Values": [f"kubernetes.io/cluster/{self.cluster_name}"],
                 },
-            ],
-        )
-        # Wait for stack update to be complete. Note this does not seem
-        # to work. Instead we update the node count and then wait for the nodes.
-        # waiter = self.cf.get_waiter('stack_update_complete')
-        # waiter.wait(StackName=self.workers_name)
-        self._stack_update_complete = True
-        stack_update_thread = threading.Thread(target=self.wait_for_stack_updates)
-        wait_for_k8s_thread = threading.Thread(
-            target=self.watch_for_nodes_in_k8s, args=(count,)
-        )
-        wait_for_instance_thread = threading.Thread(
-            target=self.watch_for_nodes_in_aws, args=(count,)
-        )
+                {"Name": "instance-type", "Values": [self.machine_type]},
+            ]
+        response = self.ec2.describe_instances(Filters=filters)
+        instance_count = 0
+        for r in response["Reservations"]:
+            for instance in r["Instances"]:
+                status = instance["State"]["Name"]
+                if status == "running":
+                    instance_count += 1
+        return instance_count
 
-        stack_update_thread.start()
-        wait_for_k8s_thread.start()
-        wait_for_instance_thread.start()
-
-        stack_update_thread.join()
-        wait_for_k8s_thread.join()
-        wait_for_instance_thread.join()
-        # self.wait_for_stack_updates()
-        # If successful, save new node count
-        self.node_count = count
-        # self.wait_for_nodes()
-        return response
+    @property
+    def default_pool_name(self):
+        return self.node_group_name if self.eks_nodegroup else self.workers_name
 
-    def _scale_using_eks_nodegroup(self, count):
+    def uses_workers_stack(self, pool_name=None):
         """
-        Make a request to scale the cluster
+        Determine if a pool is the workers stack (and not a nodegroup).
+        """
+        pool_name = pool_name or self.default_pool_name
+        return not self.eks_nodegroup and pool_name == self.workers_name
 
-        Note that this currently only supports the node group associated directly
-        with the cluster (not one that you manually create).
+    def get_pool_selector(self, pool_name=None):
         """
-        response = self.eks.update_nodegroup_config(
-            clusterName=self.cluster_name,
-            nodegroupName=self.node_group_name,
-            scalingConfig={
-                "minSize": self.min_nodes,
-                "maxSize": self.max_nodes,
-                "desiredSize": count,
-            },
-        )
-        # update_id = response["update"]["id"]
-        # self.wait_for_nodegroup_update(update_id)
-        # wait for worker state update and kubernetes getting the nodes in parallel.
-        self._stack_update_complete = True
-        stack_update_thread = threading.Thread(target=self.wait_for_stack_updates)
-        wait_for_k8s_thread = threading.Thread(
-            target=self.watch_for_nodes_in_k8s, args=(count,)
-        )
-        wait_for_instance_thread = threading.Thread(
-            target=self.watch_for_nodes_in_aws, args=(count,)
-        )
+        Get the label selector for nodes in a pool.
 
-        stack_update_thread.start()
-        wait_for_k8s_thread.start()
-        wait_for_instance_thread.start()
+        Nodes of managed nodegroups have the nodegroup label, so the workers
+        stack has the nodes without it.
+        """
+        if self.uses_workers_stack(pool_name):
+            return "!eks.amazonaws.com/nodegroup"
+        return f"eks.amazonaws.com/nodegroup={pool_name or self.node_group_name}"
 
-        stack_update_thread.join()
-        wait_for_k8s_thread.join()
-        wait_for_instance_thread.join()
-        # If successful, save new node count
-        self.node_count = count
-        # self.wait_for_nodes()
-        return response
+    def scale(self, count, deadline=None, min_ready=None):
+        """
+        Make a request to scale the cluster, and wait for it.
+
+        This returns a ScaleResult when count nodes are Ready, or earlier
+        if min_ready nodes are Ready or at the deadline (in seconds, or a
+        Deadline that can be cancelled), with what is ready and pending.
+
+        This scales the node group (or workers stack) of the cluster, use
+        scale_pool or scale_pools for a nodegroup that you manually create.
+        """
+        return self.scale_pool(count, deadline=deadline, min_ready=min_ready)
+
+    def scale_progress(self, count, pool_name=None, min_count=None, max_count=None):
+        """
+        Scale a pool, yielding progress (ScaleEvent) as it happens.
+
+        The pool is the workers stack or a nodegroup, optionally with new min
+        and max sizes. The provider update, EC2 instances and kubernetes nodes
+        are watched in parallel, so nodes can be used as soon as they are Ready.
+        """
+        pool_name = pool_name or self.default_pool_name
+        node_group_name = None
+        if self.uses_workers_stack(pool_name):
+            # Note the stack_update_complete waiter does not seem to work, so
+            # we watch the stack events instead.
+            events = StackEvents(self.cf, self.workers_name).skip_existing()
+            response = self.update_workers_stack(count, min_count, max_count)
+            wait_for_update = partial(self.wait_for_stack_updates, events)
+        else:
+            node_group_name = pool_name
+            response = self.update_nodegroup_size(
+                count, node_group_name, min_count, max_count
+            )
+            if response is not None:
+                wait_for_update = partial(
+                    self.wait_for_nodegroup_update,
+                    response["update"]["id"],
+                    node_group_name,
+                )
+        yield ScaleEvent("accepted", data=response)
+
+        # There is no update to wait for if the pool was already at the size
+        def update(emit):
+            if response is not None:
+                wait_for_update()
+            emit(ScaleEvent("updated"))
+
+        def instances(emit):
+            self.watch_for_nodes_in_aws(
+                count,
+                lambda n: emit(ScaleEvent("instances", n, count)),
+                node_group_name,
+            )
+
+        def nodes(emit):
+            self.watch_for_nodes_in_k8s(
+                count,
+                lambda n: emit(ScaleEvent("nodes", n, count)),
+                self.get_pool_selector(pool_name),
+            )
+
+        yield from stream_events([update, instances, nodes])
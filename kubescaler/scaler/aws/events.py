@@ -0,0 +1,157 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+import kubescaler.deadline as deadlines
+from kubescaler.logger import logger
+
+# A resource failed because another one did, so it isn't the reason
+cancelled_reasons = ["Resource creation cancelled", "Resource update cancelled"]
+
+# Nodegroup statuses that mean it won't become ACTIVE
+nodegroup_failed_statuses = ["CREATE_FAILED", "DELETING", "DELETE_FAILED"]
+
+# Nodegroup health issues that waiting won't fix (configuration, IAM, AMI,
+# subnets, security groups). Others (e.g., AsgInstanceLaunchFailures from a
+# brief spot shortage) can clear up, so we only warn about them.
+fatal_issue_codes = [
+    "AccessDenied",
+    "AmiIdNotFound",
+    "AutoScalingGroupInvalidConfiguration",
+    "AutoScalingGroupNotFound",
+    "Ec2InstanceTypeDoesNotExist",
+    "Ec2LaunchTemplateNotFound",
+    "Ec2LaunchTemplateVersionMismatch",
+    "Ec2SecurityGroupNotFound",
+    "Ec2SubnetInvalidConfiguration",
+    "Ec2SubnetNotFound",
+    "IamInstanceProfileNotFound",
+    "IamNodeRoleNotFound",
+]
+
+
+class ProvisioningError(ValueError):
+    """
+    A stack or nodegroup failed, with the failing resource and the reason.
+    """
+
+    def __init__(self, name, resource, reason):
+        self.name = name
+        self.resource = resource
+        self.reason = reason
+        super().__init__(f"{name} failed at {resource}: {reason}")
+
+
+class StackEvents:
+    """
+    Read the events of a CloudFormation stack as they happen.
+
+    Each call to new_events only returns (oldest first) the events we
+    haven't seen, reading pages (newest first) until the last one we saw.
+    """
+
+    def __init__(self, cf, stack_name):
+        self.cf = cf
+        self.stack_name = stack_name
+        self.last = None
+
+    def skip_existing(self):
+        """
+        Only report events after now (e.g., before updating a stack).
+        """
+        response = self.cf.describe_stack_events(StackName=self.stack_name)
+        if response["StackEvents"]:
+            self.last = response["StackEvents"][0]["EventId"]
+        return self
+
+    def new_events(self):
+        events = []
+        kwargs = {"StackName": self.stack_name}
+        while True:
+            response = self.cf.describe_stack_events(**kwargs)
+            for event in response["StackEvents"]:
+                if event["EventId"] == self.last:
+                    break
+                events.append(event)
+            else:
+                if "NextToken" in response:
+                    kwargs["NextToken"] = response["NextToken"]
+                    continue
+            break
+        if events:
+            self.last = events[0]["EventId"]
+        return list(reversed(events))
+
+    def wait(self, statuses, delay=5):
+        """
+        Wait for the stack to reach one of statuses, failing fast.
+
+        We raise a ProvisioningError as soon as a resource fails (with its
+        reason) or the stack starts to roll back or delete.
+        """
+        while True:
+            status = self.check(statuses)
+            if status is not None:
+                return status
+            deadlines.sleep(delay)
+
+    def check(self, statuses):
+        """
+        Read new events, returning the status if the stack reached one of statuses.
+
+        This raises like wait, and async waits call it between their sleeps.
+        """
+        for event in self.new_events():
+            status = event["ResourceStatus"]
+            resource = event["LogicalResourceId"]
+            reason = event.get("ResourceStatusReason", "")
+            logger.debug(f"{self.stack_name} {resource} {status} {reason}")
+            if status.endswith("_FAILED") and reason not in cancelled_reasons:
+                raise ProvisioningError(
+                    f"Stack {self.stack_name}", resource, reason or status
+                )
+            if resource != self.stack_name:
+                continue
+            if status in statuses:
+                print(f"🥞️ Stack {self.stack_name} is {status}")
+                return status
+            if "ROLLBACK" in status or status.startswith("DELETE"):
+                raise ProvisioningError(
+                    f"Stack {self.stack_name}", resource, reason or status
+                )
+
+
+def get_issues(nodegroup):
+    """
+    Get the health issues of a nodegroup, as a set of (code, resources).
+    """
+    return {
+        (issue["code"], tuple(issue.get("resourceIds", [])))
+        for issue in nodegroup.get("health", {}).get("issues", [])
+    }
+
+
+def check_nodegroup(nodegroup, known=None):
+    """
+    Raise a ProvisioningError if a nodegroup failed or has a fatal issue.
+
+    Issues in known (e.g., from get_issues before an operation started) are
+    left over and ignored. Other issues are logged once, and added to known.
+    """
+    name = nodegroup["nodegroupName"]
+    known = set() if known is None else known
+    for issue in nodegroup.get("health", {}).get("issues", []):
+        resources = issue.get("resourceIds", [])
+        key = (issue["code"], tuple(resources))
+        if key in known:
+            continue
+        reason = f"{issue['code']}: {issue.get('message', '')}"
+        if issue["code"] in fatal_issue_codes:
+            raise ProvisioningError(
+                f"Nodegroup {name}", ", ".join(resources) or name, reason
+            )
+        logger.warning(f"Nodegroup {name} has a health issue: {reason}")
+        known.add(key)
+    if nodegroup["status"] in nodegroup_failed_statuses:
+        raise ProvisioningError(f"Nodegroup {name}", name, nodegroup["status"])
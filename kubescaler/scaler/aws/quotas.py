@@ -0,0 +1,66 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+from kubescaler.preflight import quotas
+
+from .clients import get_client
+
+# EC2 vCPU quota codes by instance family prefix (others are standard)
+on_demand_quota_codes = {
+    "hpc": "L-F7808C92",
+    "inf": "L-1945791B",
+    "dl": "L-6E869C2A",
+    "trn": "L-2C3B7624",
+    "vt": "L-DB2E81BA",
+    "f": "L-74FC7D96",
+    "g": "L-DB2E81BA",
+    "p": "L-417A185B",
+    "x": "L-7295265B",
+}
+on_demand_standard_code = "L-1216C47A"
+
+spot_quota_codes = {
+    "inf": "L-B5D1601B",
+    "vt": "L-3819A6DF",
+    "f": "L-88CF9481",
+    "g": "L-3819A6DF",
+    "p": "L-7212CCBC",
+    "x": "L-E3A00192",
+}
+spot_standard_code = "L-34B43A08"
+
+
+def get_quota_code(machine_type, spot=False):
+    """
+    Get the EC2 vCPU quota code for an instance type.
+    """
+    family = machine_type.split(".")[0]
+    codes = spot_quota_codes if spot else on_demand_quota_codes
+    for prefix in sorted(codes, key=len, reverse=True):
+        if family.startswith(prefix):
+            return codes[prefix]
+    return spot_standard_code if spot else on_demand_standard_code
+
+
+def fetch_quota(region, code):
+    """
+    Get the value of an EC2 quota, or the AWS default if it was never changed.
+    """
+    client = get_client("service-quotas", region)
+    try:
+        response = client.get_service_quota(ServiceCode="ec2", QuotaCode=code)
+    except client.exceptions.NoSuchResourceException:
+        response = client.get_aws_default_service_quota(
+            ServiceCode="ec2", QuotaCode=code
+        )
+    return response["Quota"]["Value"]
+
+
+def get_vcpu_quota(region, machine_type, spot=False):
+    """
+    Get the (cached) running vCPU limit for an instance type in a region.
+    """
+    code = get_quota_code(machine_type, spot)
+    return quotas.get(("ec2", region, code), lambda: fetch_quota(region, code))
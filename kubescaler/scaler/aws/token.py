@@ -4,14 +4,25 @@
 # SPDX-License-Identifier: (MIT)
 
 
+import base64
+import threading
+import time
+import weakref
 from datetime import datetime, timedelta
 
-from awscli.customizations.eks.get_token import (
-    TOKEN_EXPIRATION_MINS,
-    STSClientFactory,
-    TokenGenerator,
-)
 from botocore import session
+from botocore.auth import SigV4QueryAuth
+from botocore.awsrequest import AWSRequest
+from botocore.credentials import ReadOnlyCredentials
+
+from kubescaler.logger import logger
+from kubescaler.ratelimit import limiter
+
+# These match the values used by aws eks get-token
+TOKEN_EXPIRATION_MINS = 14
+TOKEN_PREFIX = "k8s-aws-v1."
+K8S_AWS_ID_HEADER = "x-k8s-aws-id"
+URL_TIMEOUT = 60
 
 
 def get_expiration_time(expires_minutes=TOKEN_EXPIRATION_MINS):
@@ -19,17 +30,124 @@ def get_expiration_time(expires_minutes=TOKEN_EXPIRATION_MINS):
     return token_expires.strftime("%Y-%m-%dT%H:%M:%SZ")
 
 
+class TokenGenerator:
+    """
+    Generate EKS tokens by presigning an STS GetCallerIdentity request.
+
+    This is the same token that awscli generates, but it only uses the
+    botocore request signer. No STS client is created (unless we need to
+    assume a role) and credentials are resolved once and reused.
+    """
+
+    def __init__(self, region=None):
+        self._session = session.get_session()
+        self._region = region or self._session.get_config_variable("region")
+        self._role_credentials = {}
+        self._lock = threading.Lock()
+
+    @property
+    def sts_host(self):
+        """
+        Regional STS endpoint, or the global endpoint without a region.
+        """
+        if not self._region:
+            return "sts.amazonaws.com"
+        suffix = (
+            "amazonaws.com.cn" if self._region.startswith("cn-") else "amazonaws.com"
+        )
+        return f"sts.{self._region}.{suffix}"
+
+    def get_credentials(self, role_arn=None):
+        """
+        Get frozen credentials, assuming a role if one is provided.
+        """
+        with self._lock:
+            if role_arn is None:
+                credentials = self._session.get_credentials()
+                if credentials is None:
+                    raise ValueError("Cannot find AWS credentials to generate a token.")
+                return credentials.get_frozen_credentials()
+            return self._assume_role(role_arn)
+
+    def _assume_role(self, role_arn):
+        """
+        Assume a role, caching the credentials until close to expiration.
+
+        The caller must hold the lock.
+        """
+        cached = self._role_credentials.get(role_arn)
+        if cached is not None and time.time() < cached[1]:
+            return cached[0]
+
+        sts = self._session.create_client(
+            "sts", region_name=self._region, endpoint_url=f"https://{self.sts_host}"
+        )
+        limiter.acquire("sts", self._region)
+        response = sts.assume_role(RoleArn=role_arn, RoleSessionName="EKSGetTokenAuth")[
+            "Credentials"
+        ]
+        credentials = ReadOnlyCredentials(
+            response["AccessKeyId"],
+            response["SecretAccessKey"],
+            response["SessionToken"],
+        )
+        expires = response["Expiration"].timestamp() - TOKEN_EXPIRATION_MINS * 60
+        self._role_credentials[role_arn] = (credentials, expires)
+        return credentials
+
+    def get_presigned_url(self, cluster_name, role_arn=None):
+        """
+        Presign GetCallerIdentity with the cluster name as a signed header.
+        """
+        request = AWSRequest(
+            method="GET",
+            url=f"https://{self.sts_host}/?Action=GetCallerIdentity&Version=2011-06-15",
+            headers={K8S_AWS_ID_HEADER: cluster_name},
+        )
+        signer = SigV4QueryAuth(
+            self.get_credentials(role_arn),
+            "sts",
+            self._region or "us-east-1",
+            expires=URL_TIMEOUT,
+        )
+        signer.add_auth(request)
+        return request.url
+
+    def get_token(self, cluster_name, role_arn=None):
+        """
+        Generate a presigned url token to pass to kubectl.
+        """
+        url = self.get_presigned_url(cluster_name, role_arn)
+        encoded = base64.urlsafe_b64encode(url.encode("utf-8")).decode("utf-8")
+        return TOKEN_PREFIX + encoded.rstrip("=")
+
+
+# Generators are kept per region so credentials are only resolved once
+generators = {}
+generators_lock = threading.Lock()
+
+
+def get_token_generator(region=None):
+    """
+    Get (or create) the token generator for a region.
+    """
+    with generators_lock:
+        if region not in generators:
+            generators[region] = TokenGenerator(region)
+        return generators[region]
+
+
 def get_bearer_token(
-    cluster_name: str, token_expire_minutes: int = None, role_arn: str = None
+    cluster_name: str,
+    token_expire_minutes: int = None,
+    role_arn: str = None,
+    region: str = None,
 ) -> dict:
     """
-    Create an STS session to generate a token for EKS
+    Generate a token for EKS, optionally assuming role_arn
     """
     token_expire_minutes = token_expire_minutes or TOKEN_EXPIRATION_MINS
-    work_session = session.get_session()
-    client_factory = STSClientFactory(work_session)
-    sts_client = client_factory.get_sts_client(role_arn=role_arn)
-    token = TokenGenerator(sts_client).get_token(cluster_name)
+    token = get_token_generator(region).get_token(cluster_name, role_arn=role_arn)
     return {
         "kind": "ExecCredential",
         "apiVersion": "client.authentication.k8s.io/v1alpha1",
@@ -39,3 +157,167 @@ def get_bearer_token(
             "token": token,
         },
     }
+
+
+class TokenCache:
+    """
+    A process-wide cache of EKS bearer tokens, keyed by cluster and role.
+
+    A background thread refreshes each token once refresh_fraction of its
+    lifetime has passed, so callers (and the scale watcher threads) get a
+    valid token from a plain dictionary read. Entries are replaced whole,
+    so readers never need the lock. Registered kubernetes configurations
+    have the new token swapped in place, so live ApiClients keep working.
+    Tokens not read for idle_seconds are dropped instead of refreshed (and
+    generated again if they are needed).
+    """
+
+    def __init__(self, refresh_fraction=0.5, idle_seconds=30 * 60):
+        self.refresh_fraction = refresh_fraction
+        self.idle_seconds = idle_seconds
+        self._tokens = {}
+        self._last_read = {}
+        self._configurations = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def get(self, cluster_name, token_expire_minutes=None, role_arn=None, region=None):
+        """
+        Get a bearer token (ExecCredential dict) for a cluster.
+
+        Only the first request (or one after an unexpected expiry) generates
+        a token in the calling thread, all others are served from the cache.
+        """
+        key = (cluster_name, token_expire_minutes, role_arn, region)
+        now = time.time()
+        self._last_read[key] = now
+        entry = self._tokens.get(key)
+        if entry is not None and now < entry[1]:
+            return entry[0]
+
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is None or time.time() >= entry[1]:
+                entry = self._store(key, self._generate(key))
+            self._ensure_thread()
+        return entry[0]
+
+    def get_token(
+        self, cluster_name, token_expire_minutes=None, role_arn=None, region=None
+    ):
+        """
+        Get just the token string for a cluster.
+        """
+        token = self.get(cluster_name, token_expire_minutes, role_arn, region)
+        return token["status"]["token"]
+
+    def register(
+        self,
+        configuration,
+        cluster_name,
+        token_expire_minutes=None,
+        role_arn=None,
+        region=None,
+    ):
+        """
+        Keep the token of a kubernetes Configuration current.
+
+        The refresh hook is called by the kubernetes client before each
+        request, and the refresh thread also updates the api_key directly.
+        """
+        key = (cluster_name, token_expire_minutes, role_arn, region)
+        self._configurations[configuration] = key
+
+        def refresh_api_key(config):
+            config.api_key["authorization"] = self.get_token(*key)
+
+        configuration.refresh_api_key_hook = refresh_api_key
+        configuration.api_key_prefix["authorization"] = "Bearer"
+        configuration.api_key["authorization"] = self.get_token(*key)
+
+    def forget(self, cluster_name):
+        """
+        Remove all cached tokens for a cluster (e.g., when it is closed)
+        """
+        with self._lock:
+            for key in list(self._tokens):
+                if key[0] == cluster_name:
+                    del self._tokens[key]
+                    self._last_read.pop(key, None)
+
+    def _generate(self, key):
+        """
+        Generate a new token entry for a key (this signs, so no lock needed).
+        """
+        cluster_name, token_expire_minutes, role_arn, region = key
+        lifetime = (token_expire_minutes or TOKEN_EXPIRATION_MINS) * 60
+        now = time.time()
+        token = get_bearer_token(cluster_name, token_expire_minutes, role_arn, region)
+
+        # The token is handed out until expiry minus a minute of safety cushion,
+        # but the refresh thread renews it well before then.
+        return (token, now + lifetime - 60, now + lifetime * self.refresh_fraction)
+
+    def _store(self, key, entry):
+        """
+        Save a token entry, and swap it into configurations. The caller holds the lock.
+        """
+        token = entry[0]
+        self._tokens[key] = entry
+        for configuration, config_key in list(self._configurations.items()):
+            if config_key == key:
+                configuration.api_key["authorization"] = token["status"]["token"]
+        return entry
+
+    def _ensure_thread(self):
+        """
+        Start the refresh thread if it is not running. The caller holds the lock.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            self._wakeup.set()
+            return
+        self._thread = threading.Thread(
+            target=self._refresh_loop, name="kubescaler-token-refresh", daemon=True
+        )
+        self._thread.start()
+
+    def _refresh_loop(self):
+        """
+        Refresh tokens when they pass their refresh time, sleeping in between.
+
+        Tokens are signed without the lock, so readers never wait for it.
+        """
+        while True:
+            self._wakeup.clear()
+            now = time.time()
+            with self._lock:
+                due = []
+                for key, entry in list(self._tokens.items()):
+                    if now - self._last_read.get(key, 0) > self.idle_seconds:
+                        del self._tokens[key]
+                        self._last_read.pop(key, None)
+                    elif now >= entry[2]:
+                        due.append(key)
+
+            for key in due:
+                try:
+                    entry = self._generate(key)
+                except Exception as e:
+                    logger.warning(f"Could not refresh token for {key[0]}: {e}")
+                    continue
+                with self._lock:
+                    # Forgotten while we were signing
+                    if key in self._tokens:
+                        self._store(key, entry)
+
+            with self._lock:
+                refresh_times = [entry[2] for entry in self._tokens.values()]
+
+            # Wake up at the next refresh time, or when a new token is added
+            wait = min(refresh_times) - time.time() if refresh_times else None
+            self._wakeup.wait(max(wait, 5) if wait is not None else None)
+
+
+# A single cache shared by all clusters in the process
+token_cache = TokenCache()
@@ -3,31 +3,251 @@
 #
 # SPDX-License-Identifier: (MIT)
 
-import base64
+import asyncio
+import inspect
+import math
 import sys
-import tempfile
-import time
-
-from kubernetes import client as kubernetes_client
-
+import threading
+
+import kubescaler.aio as aio
+import kubescaler.deadline as deadlines
+import kubescaler.retry as retries
+import kubescaler.schemas as schemas
+from kubescaler.aio import AsyncCluster
+from kubescaler.catalog import MachineCatalog
 from kubescaler.cluster import Cluster
 from kubescaler.decorators import retry, timed
+from kubescaler.logger import logger
+from kubescaler.preflight import quotas
+from kubescaler.ratelimit import limiter
+from kubescaler.scaling import ScaleEvent, stream_events
 
 try:
     import google.auth
     import google.auth.transport.requests
-    from google.api_core.exceptions import NotFound
+    from google.api_core.exceptions import (
+        Conflict,
+        FailedPrecondition,
+        GoogleAPICallError,
+        NotFound,
+        ServerError,
+        TooManyRequests,
+    )
     from google.cloud import container_v1
+    from googleapiclient import discovery
 except ImportError:
     sys.exit("Please pip install kubescaler[google]")
 
 
+def classify_error(error):
+    """
+    Classify a Google API error for the retry policy.
+    """
+    # Includes ResourceExhausted (429)
+    if isinstance(error, TooManyRequests):
+        return retries.THROTTLING
+
+    # Includes Aborted, and an operation is already running on the cluster
+    if isinstance(error, (Conflict, FailedPrecondition)):
+        return retries.CONFLICT
+    if isinstance(error, ServerError):
+        return retries.TRANSIENT
+    if isinstance(error, GoogleAPICallError):
+        return retries.PERMANENT
+
+
+# Prefixes of client methods that are API calls (and not e.g., path helpers)
+api_prefixes = (
+    "get_",
+    "list_",
+    "create_",
+    "delete_",
+    "set_",
+    "update_",
+    "cancel_",
+    "rollback_",
+    "complete_",
+    "start_",
+)
+
+
+class RateLimitedClient:
+    """
+    A thin proxy for a (sync or async) Google client that paces API calls.
+
+    Calls wait for a token from the shared bucket for the service and
+    project, and throttling errors (429) decrease its rate.
+    """
+
+    def __init__(self, client, service, project):
+        self._client = client
+        self._bucket = limiter.get(service, project)
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not name.startswith(api_prefixes) or not callable(attr):
+            return attr
+        if inspect.iscoroutinefunction(attr):
+            return self._async_call(attr)
+        return self._call(attr)
+
+    def _call(self, func):
+        def call(*args, **kwargs):
+            self._bucket.acquire()
+            try:
+                response = func(*args, **kwargs)
+            except TooManyRequests:
+                self._bucket.throttled()
+                raise
+            self._bucket.succeeded()
+            return response
+
+        return call
+
+    def _async_call(self, func):
+        async def call(*args, **kwargs):
+            await self._bucket.acquire_async()
+            try:
+                response = await func(*args, **kwargs)
+            except TooManyRequests:
+                self._bucket.throttled()
+                raise
+            self._bucket.succeeded()
+            return response
+
+        return call
+
+
+# Cluster manager clients (and their gRPC channel) are shared per project
+cluster_manager_clients = {}
+cluster_manager_lock = threading.Lock()
+
+
+def get_cluster_manager_client(project):
+    """
+    Get the shared (thread-safe) cluster manager client for a project.
+    """
+    with cluster_manager_lock:
+        if project not in cluster_manager_clients:
+            # https://github.com/googleapis/python-container/blob/main/google/cloud/container_v1/services/cluster_manager/client.py#L96
+            print("⭐️ Creating global cluster manager client...")
+            cluster_manager_clients[project] = RateLimitedClient(
+                container_v1.ClusterManagerClient(), "container", project
+            )
+        return cluster_manager_clients[project]
+
+
+# Machine type catalogs are shared per project and zone
+catalogs = {}
+catalogs_lock = threading.Lock()
+
+# Machine families that support Tier 1 networking (with 30 or more vCPU)
+# https://cloud.google.com/compute/docs/networking/configure-vm-with-high-bandwidth-configuration
+tier_1_families = ["n2", "n2d", "c2", "c2d", "c3", "c3d", "m3", "h3", "z3"]
+
+# https://cloud.google.com/compute/docs/instances/spot#limitations
+spot_unsupported_families = ["m2", "m3"]
+
+
+def fetch_machine_types(project, zone):
+    """
+    Get vCPU, memory, network and spot support for machine types in a zone.
+    """
+    compute = discovery.build("compute", "v1", cache_discovery=False)
+    request = compute.machineTypes().list(project=project, zone=zone)
+    types = {}
+    while request is not None:
+        limiter.acquire("compute", project)
+        response = request.execute()
+        for machine in response.get("items", []):
+            family = machine["name"].split("-")[0]
+            tier_1 = family in tier_1_families and machine["guestCpus"] >= 30
+            types[machine["name"]] = {
+                "vcpu": machine["guestCpus"],
+                "memory_mb": machine["memoryMb"],
+                "network": "tier_1" if tier_1 else "default",
+                "spot": family not in spot_unsupported_families,
+                "gpus": sum(
+                    accelerator.get("guestAcceleratorCount", 0)
+                    for accelerator in machine.get("accelerators", [])
+                ),
+            }
+        request = compute.machineTypes().list_next(request, response)
+    return types
+
+
+def fetch_region_quotas(project, region):
+    """
+    Get the Compute quotas for a region, {metric: (limit, usage)}
+    """
+    compute = discovery.build("compute", "v1", cache_discovery=False)
+    limiter.acquire("compute", project)
+    response = compute.regions().get(project=project, region=region).execute()
+    return {
+        quota["metric"]: (quota["limit"], quota["usage"])
+        for quota in response.get("quotas", [])
+    }
+
+
+def get_vcpu_quota(project, region, machine_type, spot=False):
+    """
+    Get the (cached) vCPU (limit, usage) for a machine type in a region.
+
+    Families with their own quota (e.g., C2_CPUS) use it, and others count
+    toward CPUS. Spot uses PREEMPTIBLE_CPUS, unless it is zero (then spot
+    also counts toward the regular quota).
+    """
+    region_quotas = get_region_quotas(project, region)
+    return region_quotas.get(get_vcpu_quota_name(project, region, machine_type, spot))
+
+
+def get_region_quotas(project, region):
+    """
+    Get the (cached) Compute quotas for a region.
+    """
+    return quotas.get(
+        ("compute", project, region), lambda: fetch_region_quotas(project, region)
+    )
+
+
+def get_vcpu_quota_name(project, region, machine_type, spot=False):
+    """
+    Get the name of the vCPU quota (metric) a machine type counts toward.
+    """
+    region_quotas = get_region_quotas(project, region)
+    family = machine_type.split("-")[0].upper()
+    if spot and region_quotas.get("PREEMPTIBLE_CPUS", (0, 0))[0] > 0:
+        return "PREEMPTIBLE_CPUS"
+    if f"{family}_CPUS" in region_quotas:
+        return f"{family}_CPUS"
+    return "CPUS"
+
+
+def get_machine_catalog(project, zone):
+    """
+    Get the (cached) machine type catalog for a project and zone.
+    """
+    key = (project, zone)
+    with catalogs_lock:
+        if key not in catalogs:
+            catalogs[key] = MachineCatalog(
+                "gce", f"{project}-{zone}", lambda: fetch_machine_types(project, zone)
+            )
+        return catalogs[key]
+
+
 class GKECluster(Cluster):
     """
     A scaler for a Google Kubernetes Engine (GKE) cluster
     """
 
     default_region = "us-central1"
+    provider = "gke"
+    retry_policy = retries.RetryPolicy([classify_error])
+    spec_schema = schemas.gke_cluster_schema
+
+    # GKE runs one operation on a cluster at a time (others fail to start)
+    max_pool_updates = 1
 
     def __init__(
         self,
@@ -49,20 +269,17 @@ class GKECluster(Cluster):
         super().__init__(**kwargs)
 
         # This client we can use to interact with Google Cloud GKE
-        # https://github.com/googleapis/python-container/blob/main/google/cloud/container_v1/services/cluster_manager/client.py#L96
-        print("⭐️ Creating global cluster manager client...")
-        self.client = container_v1.ClusterManagerClient()
+        self.client = get_cluster_manager_client(project)
         self.project = project
         self.machine_type = self.machine_type or "c2-standard-8"
         self.tags = self.tags or ["kubescaler-cluster"]
         self.default_pool = default_pool_name
-        self.configuration = None
         self.scaling_profile = scaling_profile
         self.labels = labels
         self.zone = zone
         self.max_vcpu = max_vcpu
         self.max_memory = max_memory
-        self.spot = False
+        self.spot = spot
 
     @timed
     def delete_cluster(self):
@@ -72,7 +289,9 @@ class GKECluster(Cluster):
         request = container_v1.DeleteClusterRequest(name=self.cluster_name)
         # Make the request, and check until deleted!
         self.client.delete_cluster(request=request)
-        self.configuration = None
+        self.close()
+        self.delete_ca_cert_file()
+        self.state.delete()
         self.wait_for_delete()
 
     @property
@@ -89,6 +308,7 @@ class GKECluster(Cluster):
             "zone": self.zone,
             "tags": self.tags,
             "description": self.description,
+            "rate_limits": limiter.stats,
         }
 
     def scale_up(self, count, pool_name=None):
@@ -105,13 +325,112 @@ class GKECluster(Cluster):
             count, max(count - 1, self.min_nodes), count, pool_name=pool_name
         )
 
-    def scale(self, count, min_count, max_count, pool_name=None):
+    def get_scale_bounds(self, count, pool=None):
         """
-        Make a request to scale the cluster
+        Get the autoscaling bounds to scale a pool up (or down) to count.
+
+        We only know the size of the default pool, others are scaled up.
+        """
+        pool = pool or self.default_pool
+        if pool == self.default_pool and count < self.node_count:
+            return max(count - 1, self.min_nodes), count
+        return count, count + 1
+
+    def scale_progress(self, count, min_count=None, max_count=None, pool_name=None):
+        """
+        Scale a node pool, yielding progress (ScaleEvent) as it happens.
+
+        Nodes of the pool are found by label. Registered nodes are reported
+        as instances, and the update is complete when the cluster is running.
+        The count is per zone, so a regional pool waits for nodes in each.
         """
         pool_name = pool_name or self.default_pool
-        node_pool_name = f"{self.cluster_name}/nodePools/{pool_name}"
+        if min_count is None or max_count is None:
+            min_count, max_count = self.get_scale_bounds(count, pool_name)
+        node_pool_name = self.get_node_pool_name(pool_name)
+        request = self.get_autoscaling_request(min_count, max_count, node_pool_name)
+        self.client.set_node_pool_autoscaling(request=request)
+        response = self.resize_cluster(count, node_pool_name)
+        yield ScaleEvent("accepted", data=response)
+
+        def update(emit):
+            self.wait_for_status(2)
+            emit(ScaleEvent("updated"))
+
+        def nodes(emit):
+            self.watch_nodes(
+                count * self.nodes_per_count, self.get_pool_selector(pool_name), emit
+            )
+
+        yield from stream_events([update, nodes])
+
+    def get_pool_sizes(self):
+        """
+        Get the size (Ready or not) and autoscaling bounds of every node pool.
+
+        Sizes are per zone of the pool, as set_node_pool_size takes them.
+        """
+        pools = {}
+        response = self.client.list_node_pools(request={"parent": self.cluster_name})
+        for pool in response.node_pools:
+            autoscaling = pool.autoscaling
+            zones = len(pool.locations) or 1
+            nodes = len(self.get_nodes(self.get_pool_selector(pool.name)))
+            count = math.ceil(nodes / zones)
+            min_count = autoscaling.min_node_count or (
+                autoscaling.total_min_node_count // zones
+            )
+            max_count = autoscaling.max_node_count or math.ceil(
+                autoscaling.total_max_node_count / zones
+            )
+            pools[pool.name] = {
+                "count": count,
+                "min": min_count,
+                "max": max(max_count, count, 1),
+            }
+        return pools
+
+    def get_pool_selector(self, pool_name=None):
+        """
+        Get the label selector for nodes in a pool.
+        """
+        return f"cloud.google.com/gke-nodepool={pool_name or self.default_pool}"
+
+    @property
+    def default_pool_name(self):
+        return self.default_pool
+
+    def scale(
+        self,
+        count,
+        min_count=None,
+        max_count=None,
+        pool_name=None,
+        deadline=None,
+        min_ready=None,
+    ):
+        """
+        Make a request to scale the cluster
 
+        The autoscaling bounds default to those for scaling up (or down) to
+        count. We wait for the cluster to be running again and the nodes to be
+        Ready, and return a ScaleResult. This is earlier if min_ready nodes are
+        Ready or at the deadline (in seconds, or a Deadline to cancel).
+        """
+        return self.scale_pool(
+            count, pool_name, deadline, min_ready, min_count, max_count
+        )
+
+    def get_node_pool_name(self, pool_name=None):
+        """
+        Get the full name of a node pool (the default pool if not provided)
+        """
+        return f"{self.cluster_name}/nodePools/{pool_name or self.default_pool}"
+
+    def get_autoscaling_request(self, min_count, max_count, node_pool_name):
+        """
+        Get the request to set the autoscaling bounds of a node pool.
+        """
         # Always make the max node count one more than we want
         # I'm not sure if we need to change the policy with the size
         autoscaling = container_v1.NodePoolAutoscaling(
@@ -121,17 +440,10 @@ class GKECluster(Cluster):
         )
 
         # https://github.com/googleapis/python-container/blob/main/google/cloud/container_v1/types/cluster_service.py#L3884
-        request = container_v1.SetNodePoolAutoscalingRequest(
+        return container_v1.SetNodePoolAutoscalingRequest(
             autoscaling=autoscaling,
             name=node_pool_name,
         )
-        self.client.set_node_pool_autoscaling(request=request)
-
-        # This is wrapped in a retry
-        self.resize_cluster(count, node_pool_name)
-
-        # wait for it to be running again, will go from reconciling -> running
-        return self.wait_for_status(2)
 
     @retry
     def resize_cluster(self, count, node_pool_name):
@@ -158,39 +470,77 @@ class GKECluster(Cluster):
         print(node_config)
         return node_config
 
-    def get_k8s_client(self):
+    def _generate_configuration(self):
         """
-        Get a client to use to interact with the cluster, either corev1.api
-        or the kubernetes api client.
+        Generate the kubernetes configuration for the cluster.
 
         https://github.com/googleapis/python-container/issues/6
+
+        The endpoint and certificate come from one get_cluster (so a cluster
+        deleted and created again with the same name isn't reached with old
+        ones), and the Google credentials are refreshed in place (only when
+        expired) before requests. The local state only keeps the cluster
+        locations (see nodes_per_count) and hibernated pools.
         """
-        request = {"name": self.cluster_name}
-        response = self.client.get_cluster(request=request)
+        cluster = self.client.get_cluster(request={"name": self.cluster_name})
+        endpoint = cluster.endpoint
+        certificate = cluster.master_auth.cluster_ca_certificate
+        if self.state.is_stale or self.state.get("locations") != list(
+            cluster.locations
+        ):
+            logger.info(f"State for {self.cluster_name} is outdated, refreshing.")
+            self.save_state(cluster)
+
         creds, projects = google.auth.default(
             scopes=["https://www.googleapis.com/auth/cloud-platform"]
         )
-        auth_req = google.auth.transport.requests.Request()
-        creds.refresh(auth_req)
-
-        # Save the configuration for advanced users to user later
-        if not self.configuration:
-            configuration = kubernetes_client.Configuration()
-            configuration.host = f"https://{response.endpoint}"
-            with tempfile.NamedTemporaryFile(delete=False) as ca_cert:
-                ca_cert.write(
-                    base64.b64decode(response.master_auth.cluster_ca_certificate)
-                )
-                configuration.ssl_ca_cert = ca_cert.name
-            configuration.api_key_prefix["authorization"] = "Bearer"
-            configuration.api_key["authorization"] = creds.token
-            self.configuration = configuration
+        creds_lock = threading.Lock()
+
+        def refresh_api_key(config):
+            if not creds.valid:
+                with creds_lock:
+                    if not creds.valid:
+                        creds.refresh(google.auth.transport.requests.Request())
+            config.api_key["authorization"] = creds.token
+
+        ca_cert_file = self.get_ca_cert_file(certificate)
+        configuration = self.new_configuration(f"https://{endpoint}", ca_cert_file)
+        configuration.refresh_api_key_hook = refresh_api_key
+        refresh_api_key(configuration)
+        self.configuration = configuration
+
+    def save_state(self, cluster):
+        """
+        Save the cluster locations (zones) to the local state file.
+        """
+        self.state.save(
+            cluster_name=self.cluster_name,
+            locations=list(cluster.locations),
+        )
+
+    @property
+    def state_name(self):
+        return f"{self.project}-{self.location}-{self.name}"
+
+    def load_cluster_info(self, create_nodes=True):
+        """
+        Load an existing cluster (and save its locations), or None if missing.
 
-        # This has .api_client for just the api client
-        return kubernetes_client.CoreV1Api(self.get_api_client())
+        This only reads, so create_nodes (see EKSCluster) changes nothing.
+        """
+        cluster = self.get_existing_cluster()
+        if cluster is None:
+            print(f"Cluster - {self.cluster_name} does not exist")
+            return None
+        self.save_state(cluster)
+        return cluster
 
-    def get_api_client(self):
-        return kubernetes_client.ApiClient(self.configuration)
+    def is_active(self):
+        """
+        Determine if the cluster exists and is running (status 2).
+        """
+        cluster = self.get_existing_cluster()
+        return cluster is not None and cluster.status.value == 2
 
     def get_existing_cluster(self, cluster_name=None):
         """
@@ -223,6 +573,7 @@ class GKECluster(Cluster):
         services/cluster_manager/client.py#L3131
         """
         machine_type = machine_type or self.machine_type
+        self.preflight(node_count, [machine_type])
         node_config = self.get_node_config(machine_type, spot=spot, labels=labels)
 
         # The min/max node counts are provided with the NodePoolAutoscaling
@@ -290,6 +641,45 @@ class GKECluster(Cluster):
         print(f"⏱️   Waiting for node pool {name} to be ready...")
         return self.wait_for_status(2)
 
+    @property
+    def machine_catalog(self):
+        """
+        The (cached) catalog of machine types for the cluster zone.
+
+        For a regional cluster, we use the first zone of the region.
+        """
+        return get_machine_catalog(self.project, self.zone or f"{self.region}-a")
+
+    def get_spec(self):
+        spec = super().get_spec()
+        spec.update(
+            {
+                "project": self.project,
+                "zone": self.zone,
+                "scaling_profile": self.scaling_profile,
+                "default_pool_name": self.default_pool,
+            }
+        )
+        return spec
+
+    def get_vcpu_quota(self, machine_type):
+        return get_vcpu_quota(self.project, self.region, machine_type, self.spot)
+
+    def get_vcpu_quota_name(self, machine_type):
+        return get_vcpu_quota_name(self.project, self.region, machine_type, self.spot)
+
+    @property
+    def nodes_per_count(self):
+        """
+        A regional cluster runs node_count nodes in each of its zones.
+
+        We use the zones of the cluster (if we saved them), or three, the
+        default for a regional cluster.
+        """
+        if self.zone:
+            return 1
+        return len(self.state.get("locations") or []) or 3
+
     @property
     def location(self):
         """
@@ -408,10 +798,34 @@ class GKECluster(Cluster):
         return self.wait_for_status(2)
 
     @timed
-    def create_cluster(self):
+    def create_cluster(self, create_nodes=True):
         """
         Create a cluster, with hard coded variables for now.
 
+        GKE needs a node pool to create a cluster, so with create_nodes False
+        the default pool starts at its smallest size (min_nodes, at least one).
+        """
+        if not create_nodes:
+            self.node_count = max(self.min_nodes, 1)
+
+        # Reject a spec that would fail before creating anything
+        self.preflight()
+        request = self.get_create_cluster_request()
+
+        # Make the request
+        response = self.client.create_cluster(request=request)
+        print(response)
+
+        # Status 2 is running (1 is provisioning)
+        print(f"⏱️   Waiting for {self.cluster_name} to be ready...")
+        cluster = self.wait_for_status(2)
+        self.save_state(cluster)
+        return cluster
+
+    def get_create_cluster_request(self):
+        """
+        Get the request to create the cluster.
+
         Since we can't create an empty cluster, and the API doesn't allow you
         to create one from scratch setting a min/max count, what we are going
         to do is create the NodePool (with our preferences) first, and then
@@ -447,14 +861,7 @@ class GKECluster(Cluster):
         )
         print("\n🥣️ cluster creation request")
         print(request)
-
-        # Make the request
-        response = self.client.create_cluster(request=request)
-        print(response)
-
-        # Status 2 is running (1 is provisioning)
-        print(f"⏱️   Waiting for {self.cluster_name} to be ready...")
-        return self.wait_for_status(2)
+        return request
 
     @property
     def cluster_name(self):
@@ -466,7 +873,7 @@ class GKECluster(Cluster):
         """
         sleep = self.sleep_time
         while True:
-            time.sleep(sleep)
+            deadlines.sleep(sleep)
 
             # https://github.com/googleapis/python-container/blob/main/google/cloud/container_v1/types/cluster_service.py#L3569
             request = container_v1.GetClusterRequest(name=self.cluster_name)
@@ -502,7 +909,7 @@ class GKECluster(Cluster):
                 print(
                     f"Cluster {self.cluster_name} does not have status {status}, found {response.status}. Sleeping {sleep}"
                 )
-            time.sleep(sleep)
+            deadlines.sleep(sleep)
 
             # Make the request
             response = self.client.get_cluster(request=request)
@@ -510,3 +917,144 @@ class GKECluster(Cluster):
 
         # Get it once more before returning (has complete size, etc)
         return self.client.get_cluster(request=request)
+
+
+class AsyncGKECluster(AsyncCluster):
+    """
+    An asyncio interface to a Google Kubernetes Engine (GKE) cluster.
+
+    Cluster manager calls use the (gRPC asyncio) async client, which is
+    bound to the event loop it is created in.
+    """
+
+    cluster_class = GKECluster
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._async_client = None
+        self._async_client_loop = None
+
+    @property
+    def async_client(self):
+        """
+        Get the async cluster manager client for the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = RateLimitedClient(
+                container_v1.ClusterManagerAsyncClient(), "container", self.project
+            )
+            self._async_client_loop = loop
+        return self._async_client
+
+    @timed
+    async def create_cluster(self, create_nodes=True):
+        if not create_nodes:
+            self.cluster.node_count = max(self.min_nodes, 1)
+        await self.run(self.cluster.preflight)
+        request = self.cluster.get_create_cluster_request()
+        response = await self.async_client.create_cluster(request=request)
+        print(response)
+
+        # Status 2 is running (1 is provisioning)
+        print(f"⏱️   Waiting for {self.cluster_name} to be ready...")
+        cluster = await self.wait_for_status(2)
+        self.cluster.save_state(cluster)
+        return cluster
+
+    @timed
+    async def delete_cluster(self):
+        request = container_v1.DeleteClusterRequest(name=self.cluster_name)
+        await self.async_client.delete_cluster(request=request)
+        await self.close()
+        self.cluster.delete_ca_cert_file()
+        self.cluster.state.delete()
+        await self.wait_for_delete()
+
+    async def scale_up(self, count, pool_name=None):
+        return await self.scale(count, count, count + 1, pool_name=pool_name)
+
+    async def scale_down(self, count, pool_name=None):
+        return await self.scale(
+            count, max(count - 1, self.min_nodes), count, pool_name=pool_name
+        )
+
+    async def scale(
+        self,
+        count,
+        min_count=None,
+        max_count=None,
+        pool_name=None,
+        deadline=None,
+        min_ready=None,
+    ):
+        """
+        Make a request to scale the cluster, returning a ScaleResult.
+
+        GKE runs one operation on a cluster at a time, so the update waits
+        for others (sync or async) to be done, see Cluster.serialize_updates.
+        """
+        return await self.scale_pool(
+            count, pool_name, deadline, min_ready, min_count, max_count
+        )
+
+    async def scale_progress(
+        self, count, min_count=None, max_count=None, pool_name=None
+    ):
+        """
+        Scale a node pool, yielding progress (ScaleEvent) as it happens.
+        """
+        pool_name = pool_name or self.default_pool
+        if min_count is None or max_count is None:
+            min_count, max_count = self.cluster.get_scale_bounds(count, pool_name)
+        node_pool_name = self.cluster.get_node_pool_name(pool_name)
+        request = self.cluster.get_autoscaling_request(
+            min_count, max_count, node_pool_name
+        )
+        await self.async_client.set_node_pool_autoscaling(request=request)
+        response = await self.resize_cluster(count, node_pool_name)
+        yield ScaleEvent("accepted", data=response)
+
+        async def update(emit):
+            await self.wait_for_status(2)
+            emit(ScaleEvent("updated"))
+
+        async def nodes(emit):
+            selector = self.cluster.get_pool_selector(pool_name)
+            await self.watch_nodes(count * self.nodes_per_count, selector, emit)
+
+        async for event in aio.stream_events([update, nodes]):
+            yield event
+
+    @retry
+    async def resize_cluster(self, count, node_pool_name):
+        request = container_v1.SetNodePoolSizeRequest(
+            node_count=count,
+            name=node_pool_name,
+        )
+        return await self.async_client.set_node_pool_size(request=request)
+
+    async def wait_for_status(self, status=2):
+        """
+        Wait until the cluster has a status (2 is running)
+        """
+        sleep = self.sleep_time
+        request = container_v1.GetClusterRequest(name=self.cluster_name)
+        while True:
+            sleep = await self.sleep(sleep)
+            response = await self.async_client.get_cluster(request=request)
+            if response.status.value == status:
+                return response
+            print(
+                f"Cluster {self.cluster_name} does not have status {status}, found {response.status}."
+            )
+
+    async def wait_for_delete(self):
+        sleep = self.sleep_time
+        request = container_v1.GetClusterRequest(name=self.cluster_name)
+        while True:
+            sleep = await self.sleep(sleep)
+            try:
+                await self.async_client.get_cluster(request=request)
+            except NotFound:
+                return
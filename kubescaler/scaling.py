@@ -0,0 +1,357 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import kubescaler.deadline as deadlines
+from kubescaler.deadline import Deadline
+from kubescaler.logger import logger
+
+# Scale results that mean the pool is at the requested size
+reached_statuses = ["complete", "min_ready"]
+
+
+class ScaleRequest:
+    """
+    A request to scale a pool, and (when done) how it ended.
+
+    The future resolves to the request itself, with status "reached" (and
+    the result of the scale), "unchanged" (the pool was already at count),
+    or "superseded" (a newer request replaced it before it started). A
+    scale that stopped early resolves with the status of its result (e.g.,
+    deadline or cancelled), and the pool size is not recorded.
+    """
+
+    def __init__(self, count, pool=None, deadline=None):
+        self.count = count
+        self.pool = pool
+        self.deadline = deadline
+        self.future = Future()
+        self.requested = time.time()
+        self.status = "pending"
+        self.superseded_by = None
+        self.result = None
+
+    def resolve(self, status, result=None):
+        self.status = status
+        self.result = result
+        self.future.set_result(self)
+
+
+class ScaleQueue:
+    """
+    Coalesce and debounce scale requests, per pool.
+
+    Each pool has at most one scale running. Requests that arrive while it
+    runs (or within debounce seconds of the first) are collapsed into the
+    latest desired size, which is applied as soon as the pool can accept a
+    change. Superseded requests resolve immediately.
+    """
+
+    def __init__(self, scale, debounce=1):
+        # Called as scale(count, pool, deadline=deadline)
+        self.scale = scale
+        self.debounce = debounce
+
+        # The last size we scaled each pool to
+        self.sizes = {}
+        self._pending = {}
+        self._workers = set()
+        self._lock = threading.Lock()
+
+    def submit(self, count, pool=None, deadline=None):
+        """
+        Request a pool to be scaled to count nodes, returning a future.
+
+        The deadline (seconds, or None for no limit) bounds the scale once
+        it starts, so a stuck scale doesn't hold up the pool forever.
+        """
+        request = ScaleRequest(count, pool, deadline)
+        with self._lock:
+            superseded = self._pending.get(pool)
+            self._pending[pool] = request
+            start = pool not in self._workers
+            if start:
+                self._workers.add(pool)
+
+        if superseded is not None:
+            superseded.superseded_by = count
+            superseded.resolve("superseded")
+        if start:
+            threading.Thread(target=self._run, args=(pool,), daemon=True).start()
+        return request.future
+
+    def _run(self, pool):
+        """
+        Apply the latest request for a pool until there are none left.
+        """
+        while True:
+            if self.debounce:
+                time.sleep(self.debounce)
+            with self._lock:
+                request = self._pending.pop(pool, None)
+                if request is None:
+                    self._workers.discard(pool)
+                    return
+
+            if self.sizes.get(pool) == request.count:
+                request.resolve("unchanged")
+                continue
+            try:
+                result = self.scale(request.count, pool, deadline=request.deadline)
+            except Exception as e:
+                logger.error(f"Scaling pool {pool} to {request.count} failed: {e}")
+                request.status = "failed"
+                request.future.set_exception(e)
+                continue
+            if result.status not in reached_statuses:
+                request.resolve(result.status, result)
+                continue
+            self.sizes[pool] = request.count
+            request.resolve("reached", result)
+
+
+class ScaleEvent:
+    """
+    A scale progress event.
+
+    Kinds are accepted (the provider accepted the change, data has the
+    response), instances (launched, count of total), nodes (Ready in
+    kubernetes, count of total) and updated (the provider update is done).
+    """
+
+    def __init__(self, kind, count=None, total=None, data=None):
+        self.kind = kind
+        self.count = count
+        self.total = total
+        self.data = data
+        self.timestamp = time.time()
+
+    def __str__(self):
+        if self.kind == "nodes":
+            return f"nodes Ready {self.count}/{self.total}"
+        if self.kind == "instances":
+            return f"instances launched {self.count}/{self.total}"
+        if self.kind == "accepted":
+            return "scale accepted"
+        return "provider update complete"
+
+    def __repr__(self):
+        return f"ScaleEvent({self})"
+
+    def to_dict(self):
+        return {
+            "kind": self.kind,
+            "count": self.count,
+            "total": self.total,
+            "timestamp": self.timestamp,
+        }
+
+
+def stream_events(waits):
+    """
+    Run waits in threads and yield the events they emit, as they happen.
+
+    Each wait is called with an emit function (that takes a ScaleEvent),
+    and repeated counts of the same kind are only yielded once. The waits
+    run inside a deadline (under the current one): if one fails the others
+    are cancelled and the error is raised once they stop. If the caller
+    stops iterating, the waits are cancelled.
+    """
+    events = queue.Queue()
+    deadline = Deadline(name="scale")
+    done = object()
+
+    def run(wait):
+        try:
+            with deadline:
+                wait(events.put)
+        except Exception as e:
+            events.put(e)
+        finally:
+            events.put(done)
+
+    for wait in waits:
+        thread = threading.Thread(target=deadlines.propagate(run), args=(wait,))
+        thread.daemon = True
+        thread.start()
+
+    errors = []
+    last = {}
+    running = len(waits)
+    try:
+        while running:
+            event = events.get()
+            if event is done:
+                running -= 1
+            elif isinstance(event, Exception):
+                if not errors:
+                    deadline.cancel(str(event))
+                errors.append(event)
+            elif last.get(event.kind) != (event.count, event.total):
+                last[event.kind] = (event.count, event.total)
+                yield event
+    finally:
+        if running:
+            deadline.cancel("stopped watching scale progress")
+    if errors:
+        raise errors[0]
+
+
+class ScaleResult:
+    """
+    The result of a scale: how far it got, and the time for each phase.
+
+    The status is complete, min_ready (enough nodes were Ready), deadline
+    or cancelled (the waits stopped early, and the provider may still be
+    scaling), or failed (with the error, see Cluster.scale_pools). Times
+    are seconds from the start of the scale until the change was accepted,
+    the update finished, and all instances and nodes were there.
+    """
+
+    def __init__(self, count):
+        self.count = count
+        self.status = "running"
+        self.ready = None
+        self.instances = None
+
+        # Nodes to wait for (more than count for a regional GKE pool)
+        self.total = None
+        self.response = None
+        self.events = []
+        self.times = {}
+        self.error = None
+        self.start = time.time()
+
+    def add(self, event):
+        """
+        Update the result with a progress event.
+        """
+        self.events.append(event)
+        seconds = round(event.timestamp - self.start, 3)
+        if event.kind == "accepted":
+            self.response = event.data
+            self.times["accepted"] = seconds
+        elif event.kind == "updated":
+            self.times["updated"] = seconds
+        elif event.kind == "instances":
+            self.instances = event.count
+            if event.count == event.total:
+                self.times["instances"] = seconds
+        elif event.kind == "nodes":
+            self.ready = event.count
+            self.total = event.total
+            if event.count == event.total:
+                self.times["nodes"] = seconds
+
+    def finish(self, status):
+        self.status = status
+        self.times["total"] = round(time.time() - self.start, 3)
+        return self
+
+    @property
+    def accepted(self):
+        return "accepted" in self.times
+
+    @property
+    def complete(self):
+        return self.status == "complete"
+
+    @property
+    def pending(self):
+        """
+        Requested nodes that are not Ready (yet)
+        """
+        total = self.count if self.total is None else self.total
+        return max(0, total - (self.ready or 0))
+
+    @property
+    def data(self):
+        data = {
+            "count": self.count,
+            "status": self.status,
+            "ready": self.ready,
+            "pending": self.pending,
+            "instances": self.instances,
+            "times": self.times,
+            "events": [event.to_dict() for event in self.events],
+        }
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+
+
+def hold_until_updated(events, semaphore):
+    """
+    Hold the semaphore from before a scale starts until its update is done.
+
+    This serializes pool updates for providers that only run one (or a few)
+    at a time, while the waits for nodes that follow still overlap.
+    """
+    while not semaphore.acquire(timeout=1):
+        deadlines.check()
+    held = True
+    try:
+        for event in events:
+            if event.kind == "updated" and held:
+                semaphore.release()
+                held = False
+            yield event
+    finally:
+        if held:
+            semaphore.release()
+        events.close()
+
+
+def get_scale_deadline(deadline=None):
+    """
+    Get the Deadline for a scale, from seconds or a Deadline (or None)
+    """
+    if isinstance(deadline, Deadline):
+        return deadline
+    return Deadline(deadline, name="scale")
+
+
+def get_stopped_status(deadline):
+    """
+    Get the status if a scale deadline (not an outer one) stopped the waits.
+    """
+    parent = deadline.parent
+    if deadline.cancelled and not (parent is not None and parent.cancelled):
+        return "cancelled"
+    if deadline.expires is not None and deadline.expires <= time.monotonic():
+        return "deadline"
+
+
+def run_scale(events, count, deadline=None, min_ready=None):
+    """
+    Consume scale progress events, returning a ScaleResult.
+
+    The deadline is in seconds, or a Deadline that the caller can cancel
+    (from any thread). When it passes (or is cancelled), or min_ready nodes
+    are Ready, the waits are stopped and the partial result is returned.
+    Other errors (including an outer deadline) are raised.
+    """
+    result = ScaleResult(count)
+    deadline = get_scale_deadline(deadline)
+    try:
+        with deadline:
+            for event in events:
+                result.add(event)
+                if min_ready is not None and (result.ready or 0) >= min_ready:
+                    return result.finish(
+                        "complete" if not result.pending else "min_ready"
+                    )
+    except (deadlines.Cancelled, deadlines.DeadlineExceeded):
+        status = get_stopped_status(deadline)
+        if status is None:
+            raise
+        return result.finish(status)
+    finally:
+        events.close()
+    return result.finish("complete")
@@ -0,0 +1,66 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+# Settings shared by all clusters (see Cluster.get_spec)
+cluster_properties = {
+    "name": {"type": "string", "minLength": 1},
+    "region": {"type": "string", "minLength": 1},
+    "machine_type": {"type": "string", "minLength": 1},
+    "kubernetes_version": {"type": ["string", "number"]},
+    "node_count": {"type": "integer", "minimum": 0},
+    "min_nodes": {"type": "integer", "minimum": 0},
+    "max_nodes": {"type": "integer", "minimum": 1},
+    "sleep_seconds": {"type": "number", "minimum": 0},
+    "sleep_multiplier": {"type": "number", "minimum": 1},
+}
+
+cluster_schema = {
+    "$schema": "http://json-schema.org/draft-07/schema#",
+    "title": "Kubescaler Cluster Spec",
+    "type": "object",
+    "properties": cluster_properties,
+    "required": ["name", "region", "machine_type", "node_count", "max_nodes"],
+}
+
+# The cluster name is also used for CloudFormation stacks (no underscores)
+# and the nodegroup (<name>-worker-group), which is at most 63 characters
+eks_cluster_schema = {
+    **cluster_schema,
+    "title": "Kubescaler EKS Cluster Spec",
+    "properties": {
+        **cluster_properties,
+        "name": {
+            "type": "string",
+            "pattern": "^[a-zA-Z][-a-zA-Z0-9]*$",
+            "maxLength": 50,
+        },
+        "capacity_type": {"enum": ["ON_DEMAND", "SPOT"]},
+        "ami_type": {"type": "string", "minLength": 1},
+        "stack_timeout_minutes": {"type": "integer", "minimum": 1},
+        "on_stack_failure": {"enum": ["DO_NOTHING", "ROLLBACK", "DELETE"]},
+    },
+}
+
+# GKE names are lowercase letters, numbers and hyphens, up to 40 characters
+gke_cluster_schema = {
+    **cluster_schema,
+    "title": "Kubescaler GKE Cluster Spec",
+    "properties": {
+        **cluster_properties,
+        "name": {
+            "type": "string",
+            "pattern": "^[a-z]([-a-z0-9]*[a-z0-9])?$",
+            "maxLength": 40,
+        },
+        "project": {"type": "string", "minLength": 1},
+        "zone": {"type": ["string", "null"]},
+        "scaling_profile": {"enum": [0, 1, 2]},
+        "default_pool_name": {
+            "type": "string",
+            "pattern": "^[a-z]([-a-z0-9]*[a-z0-9])?$",
+        },
+    },
+    "required": cluster_schema["required"] + ["project"],
+}
@@ -0,0 +1,87 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+import json
+import os
+import threading
+import time
+
+import kubescaler.defaults as defaults
+from kubescaler.utils import mkdir_p, print_json
+
+
+class ClusterState:
+    """
+    A versioned local state file for a cluster.
+
+    This records what we discovered about the cluster infrastructure (stack
+    outputs, subnets, roles, endpoint, etc.) so a new process can attach to
+    an existing cluster without re-deriving everything from the cloud APIs.
+    A state file written by a different version is ignored.
+    """
+
+    version = 1
+
+    def __init__(self, name, ttl=None, state_dir=None):
+        self.name = name
+        self.ttl = defaults.state_ttl_seconds if ttl is None else ttl
+        self.state_dir = state_dir or os.path.join(defaults.userhome, "state")
+        self.filename = os.path.join(self.state_dir, f"{name}.json")
+        self._lock = threading.Lock()
+        self.data = None
+
+    def load(self):
+        """
+        Load the state file, returning an empty dict if missing or invalid.
+        """
+        with self._lock:
+            if self.data is None:
+                self.data = self._read()
+            return self.data
+
+    def _read(self):
+        try:
+            with open(self.filename, "r") as fd:
+                data = json.loads(fd.read())
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != self.version:
+            return {}
+        return data
+
+    @property
+    def is_stale(self):
+        """
+        Determine if the state is missing or older than the ttl (seconds)
+        """
+        updated = self.load().get("updated")
+        return updated is None or time.time() - updated > self.ttl
+
+    def get(self, key, default=None):
+        return self.load().get(key, default)
+
+    def save(self, **values):
+        """
+        Update the state with new values and write it (atomically).
+        """
+        self.load()
+        with self._lock:
+            self.data.update(values)
+            self.data["version"] = self.version
+            self.data["updated"] = time.time()
+            mkdir_p(self.state_dir)
+            tmpfile = f"{self.filename}.{os.getpid()}.{threading.get_ident()}"
+            with open(tmpfile, "w") as fd:
+                fd.write(print_json(self.data))
+            os.replace(tmpfile, self.filename)
+
+    def delete(self):
+        """
+        Delete the state, e.g., after the cluster is deleted.
+        """
+        with self._lock:
+            self.data = {}
+            if os.path.exists(self.filename):
+                os.remove(self.filename)
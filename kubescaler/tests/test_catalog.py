@@ -0,0 +1,107 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+import json
+import os
+import time
+
+import pytest
+
+from kubescaler.catalog import MachineCatalog, fields
+
+types = {
+    "small": {"vcpu": 2, "memory_mb": 4096, "network": "low", "spot": True, "gpus": 0},
+    "large": {
+        "vcpu": 8,
+        "memory_mb": 32768,
+        "network": "high",
+        "spot": False,
+        "gpus": 0,
+    },
+    "gpu": {"vcpu": 8, "memory_mb": 65536, "network": "high", "spot": True, "gpus": 1},
+}
+
+
+class Fetch:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {name: dict(machine) for name, machine in types.items()}
+
+
+@pytest.fixture
+def fetch():
+    return Fetch()
+
+
+def get_catalog(tmp_path, fetch, ttl=None):
+    return MachineCatalog("test", "zone-a", fetch, ttl=ttl, cache_dir=str(tmp_path))
+
+
+def test_catalog_is_fetched_once(tmp_path, fetch):
+    catalog = get_catalog(tmp_path, fetch)
+    assert catalog.get("small")["vcpu"] == 2
+    assert "large" in catalog
+    assert catalog.get("missing") is None
+    assert fetch.calls == 1
+
+
+def test_catalog_is_read_from_disk(tmp_path, fetch):
+    get_catalog(tmp_path, fetch).types
+    catalog = get_catalog(tmp_path, fetch)
+    assert catalog.types == types
+    assert fetch.calls == 1
+
+
+def test_on_disk_format(tmp_path, fetch):
+    catalog = get_catalog(tmp_path, fetch)
+    catalog.types
+    assert catalog.filename == os.path.join(str(tmp_path), "test-zone-a.json")
+    with open(catalog.filename) as fd:
+        data = json.load(fd)
+    assert data["version"] == MachineCatalog.version
+    assert data["fields"] == fields
+    assert data["types"]["small"] == [2, 4096, "low", True, 0]
+
+
+def test_stale_catalog_is_fetched_again(tmp_path, fetch):
+    get_catalog(tmp_path, fetch).types
+    catalog = get_catalog(tmp_path, fetch, ttl=60)
+    with open(catalog.filename) as fd:
+        data = json.load(fd)
+    data["updated"] = time.time() - 120
+    with open(catalog.filename, "w") as fd:
+        json.dump(data, fd)
+    catalog.types
+    assert fetch.calls == 2
+
+
+def test_changed_format_is_fetched_again(tmp_path, fetch):
+    catalog = get_catalog(tmp_path, fetch)
+    catalog.types
+    with open(catalog.filename) as fd:
+        data = json.load(fd)
+    data["fields"] = fields[:-1]
+    with open(catalog.filename, "w") as fd:
+        json.dump(data, fd)
+    get_catalog(tmp_path, fetch).types
+    assert fetch.calls == 2
+
+
+def test_refresh(tmp_path, fetch):
+    catalog = get_catalog(tmp_path, fetch)
+    catalog.types
+    catalog.refresh()
+    assert fetch.calls == 2
+
+
+def test_find(tmp_path, fetch):
+    catalog = get_catalog(tmp_path, fetch)
+    assert catalog.find(min_vcpu=4) == ["large", "gpu"]
+    assert catalog.find(min_memory_mb=40000) == ["gpu"]
+    assert catalog.find(spot=True) == ["small", "gpu"]
+    assert catalog.find(min_vcpu=64) == []
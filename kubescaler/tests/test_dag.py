@@ -0,0 +1,81 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+import threading
+
+import pytest
+
+from kubescaler.dag import ResourceGraph
+
+
+def record(order, name):
+    def step():
+        order.append(name)
+
+    return step
+
+
+def test_steps_run_after_requirements():
+    order = []
+    graph = ResourceGraph()
+    graph.add("cluster", record(order, "cluster"), ["vpc", "role"])
+    graph.add("vpc", record(order, "vpc"))
+    graph.add("role", record(order, "role"))
+    graph.add("nodes", record(order, "nodes"), ["cluster"])
+    times = graph.run()
+
+    assert order.index("cluster") > order.index("vpc")
+    assert order.index("cluster") > order.index("role")
+    assert order[-1] == "nodes"
+    assert set(times) == {"cluster", "vpc", "role", "nodes"}
+
+
+def test_independent_steps_run_concurrently():
+    # Each step waits for the other, so this only finishes if they overlap
+    barrier = threading.Barrier(2, timeout=5)
+    graph = ResourceGraph(max_workers=2)
+    graph.add("a", barrier.wait)
+    graph.add("b", barrier.wait)
+    graph.run()
+
+
+def test_missing_requirements_are_ignored():
+    order = []
+    graph = ResourceGraph()
+    graph.add("nodes", record(order, "nodes"), ["optional-step"])
+    graph.run()
+    assert order == ["nodes"]
+
+
+def test_failure_stops_dependents():
+    order = []
+
+    def fail():
+        raise ValueError("stack failed")
+
+    graph = ResourceGraph()
+    graph.add("vpc", fail)
+    graph.add("role", record(order, "role"))
+    graph.add("cluster", record(order, "cluster"), ["vpc", "role"])
+    with pytest.raises(ValueError, match="stack failed"):
+        graph.run()
+
+    assert "cluster" not in order
+    assert "vpc" in graph.times
+
+
+def test_circular_requirements():
+    graph = ResourceGraph()
+    graph.add("a", lambda: None, ["b"])
+    graph.add("b", lambda: None, ["a"])
+    with pytest.raises(ValueError, match="circular"):
+        graph.run()
+
+
+def test_step_times():
+    graph = ResourceGraph()
+    graph.add("vpc", lambda: None)
+    graph.add("cluster", lambda: None, ["vpc"])
+    assert set(graph.run()) == {"vpc", "cluster"}
@@ -0,0 +1,106 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+import threading
+import time
+
+import pytest
+
+import kubescaler.deadline as deadlines
+from kubescaler.deadline import Cancelled, Deadline, DeadlineExceeded
+
+
+def test_no_deadline():
+    assert deadlines.current() is None
+    assert deadlines.remaining() is None
+    deadlines.check()
+
+
+def test_current_deadline():
+    with Deadline(60, name="outer") as outer:
+        assert deadlines.current() is outer
+        with Deadline(30, name="inner") as inner:
+            assert deadlines.current() is inner
+            assert inner.parent is outer
+        assert deadlines.current() is outer
+    assert deadlines.current() is None
+
+
+def test_child_expires_with_parent():
+    with Deadline(0.05, name="outer"):
+        with Deadline(600, name="inner") as inner:
+            assert inner.remaining() <= 0.05
+            time.sleep(0.1)
+            assert inner.expired
+            with pytest.raises(DeadlineExceeded, match="outer deadline"):
+                inner.check()
+
+
+def test_innermost_expired_deadline_is_reported():
+    with Deadline(600, name="outer"):
+        with Deadline(0.01, name="inner") as inner:
+            time.sleep(0.05)
+            with pytest.raises(DeadlineExceeded, match="inner deadline"):
+                inner.check()
+
+
+def test_cancel_cancels_children():
+    with Deadline(name="outer") as outer:
+        with Deadline(name="inner") as inner:
+            outer.cancel("stop")
+            assert inner.cancelled
+            with pytest.raises(Cancelled, match="stop"):
+                deadlines.check()
+
+
+def test_children_of_cancelled_deadline_are_cancelled():
+    outer = Deadline(name="outer")
+    outer.cancel()
+    assert Deadline(parent=outer).cancelled
+
+
+def test_cancelling_child_leaves_parent():
+    with Deadline(name="outer") as outer:
+        with Deadline(name="inner") as inner:
+            inner.cancel()
+        assert not outer.cancelled
+
+
+def test_detached_deadline_ignores_current():
+    with Deadline(name="outer") as outer:
+        outer.cancel()
+        with Deadline(60, name="cleanup", detach=True) as cleanup:
+            assert cleanup.parent is None
+            deadlines.check()
+
+
+def test_sleep_wakes_up_when_cancelled():
+    deadline = Deadline(name="scale")
+    threading.Timer(0.1, deadline.cancel).start()
+    start = time.monotonic()
+    with pytest.raises(Cancelled):
+        deadline.sleep(10)
+    assert time.monotonic() - start < 5
+
+
+def test_sleep_stops_at_deadline():
+    start = time.monotonic()
+    with Deadline(0.1):
+        with pytest.raises(DeadlineExceeded):
+            deadlines.sleep(10)
+    assert time.monotonic() - start < 5
+
+
+def test_propagate_to_thread():
+    found = []
+    with Deadline(60) as deadline:
+        func = deadlines.propagate(lambda: found.append(deadlines.current()))
+        thread = threading.Thread(target=func)
+        thread.start()
+        thread.join()
+        plain = threading.Thread(target=lambda: found.append(deadlines.current()))
+        plain.start()
+        plain.join()
+    assert found == [deadline, None]
@@ -0,0 +1,158 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+import pytest
+
+import kubescaler.schemas as schemas
+from kubescaler.cluster import Cluster
+from kubescaler.preflight import PreflightError, QuotaCache, validate_spec
+
+
+def get_spec(**kwargs):
+    spec = {
+        "name": "test-cluster",
+        "region": "us-east-1",
+        "machine_type": "m5.large",
+        "kubernetes_version": "1.27",
+        "node_count": 2,
+        "min_nodes": 0,
+        "max_nodes": 3,
+        "sleep_seconds": 3,
+        "sleep_multiplier": 1,
+    }
+    spec.update(kwargs)
+    return spec
+
+
+def test_valid_specs():
+    assert validate_spec(get_spec(), schemas.cluster_schema) == []
+    assert (
+        validate_spec(get_spec(capacity_type="SPOT"), schemas.eks_cluster_schema) == []
+    )
+    gke = get_spec(project="my-project", zone="us-central1-a", scaling_profile=1)
+    assert validate_spec(gke, schemas.gke_cluster_schema) == []
+
+
+def test_invalid_specs():
+    errors = validate_spec(get_spec(node_count=-1, max_nodes=0), schemas.cluster_schema)
+    assert len(errors) == 2
+    assert any(error.startswith("node_count:") for error in errors)
+
+    errors = validate_spec(get_spec(name="my_cluster"), schemas.eks_cluster_schema)
+    assert len(errors) == 1 and errors[0].startswith("name:")
+    errors = validate_spec(get_spec(capacity_type="spot"), schemas.eks_cluster_schema)
+    assert errors[0].startswith("capacity_type:")
+
+    errors = validate_spec(get_spec(name="Test"), schemas.gke_cluster_schema)
+    assert any("project" in error for error in errors)
+    assert any(error.startswith("name:") for error in errors)
+
+
+def test_preflight_error_lists_every_problem():
+    error = PreflightError("test", ["first problem", "second problem"])
+    assert error.errors == ["first problem", "second problem"]
+    assert "  - first problem" in str(error)
+    assert "  - second problem" in str(error)
+
+
+def test_quota_cache():
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return 64
+
+    cache = QuotaCache(ttl=600)
+    assert cache.get("key", fetch) == 64
+    assert cache.get("key", fetch) == 64
+    assert len(calls) == 1
+    cache.clear()
+    cache.get("key", fetch)
+    assert len(calls) == 2
+
+    expired = QuotaCache(ttl=0)
+    expired.get("key", fetch)
+    expired.get("key", fetch)
+    assert len(calls) == 4
+
+
+@pytest.mark.parametrize(
+    "machine_type,spot,code",
+    [
+        ("m5.large", False, "L-1216C47A"),
+        ("c5.xlarge", False, "L-1216C47A"),
+        ("p4d.24xlarge", False, "L-417A185B"),
+        ("g5.xlarge", False, "L-DB2E81BA"),
+        ("inf2.xlarge", False, "L-1945791B"),
+        ("hpc6a.48xlarge", False, "L-F7808C92"),
+        ("dl1.24xlarge", False, "L-6E869C2A"),
+        ("trn1.2xlarge", False, "L-2C3B7624"),
+        ("x2idn.16xlarge", False, "L-7295265B"),
+        ("m5.large", True, "L-34B43A08"),
+        ("g5.xlarge", True, "L-3819A6DF"),
+        ("p3.2xlarge", True, "L-7212CCBC"),
+    ],
+)
+def test_get_quota_code(machine_type, spot, code):
+    quotas = pytest.importorskip("kubescaler.scaler.aws.quotas")
+    assert quotas.get_quota_code(machine_type, spot) == code
+
+
+class FakeCatalog:
+    location = "us-east-1"
+    types = {
+        "m5.large": {"vcpu": 2},
+        "m5.xlarge": {"vcpu": 4},
+        "g5.xlarge": {"vcpu": 4},
+    }
+
+    def get(self, machine_type):
+        return self.types.get(machine_type)
+
+
+class QuotaCluster(Cluster):
+    """
+    A cluster with a catalog and a quota (limit, usage) per family.
+    """
+
+    default_region = "us-east-1"
+    machine_catalog = FakeCatalog()
+
+    def __init__(self, quotas, **kwargs):
+        super().__init__(name="test-cluster", machine_type="m5.large", **kwargs)
+        self.quotas = quotas
+
+    def get_vcpu_quota_name(self, machine_type):
+        return machine_type[0]
+
+    def get_vcpu_quota(self, machine_type):
+        return self.quotas.get(machine_type[0])
+
+
+def test_check_capacity_uses_largest_type_per_quota():
+    cluster = QuotaCluster({"m": (40, None), "g": (16, None)})
+
+    # 10 nodes spread across m5.large and m5.xlarge need at most 40 vCPUs
+    assert cluster.check_capacity(10, ["m5.large", "m5.xlarge"]) == []
+    errors = cluster.check_capacity(11, ["m5.large", "m5.xlarge"])
+    assert errors == ["11 nodes of m5.xlarge need 44 vCPUs, but the quota allows 40"]
+
+    errors = cluster.check_capacity(10, ["m5.large", "g5.xlarge", "z1.large"])
+    assert len(errors) == 2
+    assert "z1.large is not offered" in errors[0]
+    assert "g5.xlarge need 40 vCPUs" in errors[1]
+
+
+def test_check_capacity_with_usage():
+    cluster = QuotaCluster({"m": (10, 6)})
+    assert cluster.check_capacity(4, ["m5.large"], current=2) == []
+    assert cluster.check_capacity(5, ["m5.large"], current=2) != []
+
+
+def test_preflight_raises_all_errors():
+    cluster = QuotaCluster({"m": (2, None)}, node_count=5, max_nodes=3)
+    with pytest.raises(PreflightError) as error:
+        cluster.preflight()
+    assert len(error.value.errors) == 2
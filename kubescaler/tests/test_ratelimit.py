@@ -0,0 +1,71 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+import pytest
+
+from kubescaler.ratelimit import RateLimiter, TokenBucket, default_rate
+
+
+def test_burst_is_not_delayed():
+    bucket = TokenBucket(10, burst=5)
+    delays = [bucket.reserve() for _ in range(5)]
+    assert delays == [0] * 5
+    assert bucket.stats["delayed"] == 0
+
+
+def test_calls_past_the_burst_are_paced():
+    bucket = TokenBucket(10, burst=1)
+    assert bucket.reserve() == 0
+    first = bucket.reserve()
+    second = bucket.reserve()
+    assert first == pytest.approx(0.1, abs=0.02)
+    assert second == pytest.approx(0.2, abs=0.02)
+    assert bucket.stats["delayed"] == 2
+
+
+def test_throttling_decreases_rate_once_per_cooldown():
+    bucket = TokenBucket(10, cooldown=60)
+    bucket.throttled()
+    assert bucket.rate == 5
+
+    # The rest of the burst was throttled together
+    bucket.throttled()
+    bucket.throttled()
+    assert bucket.rate == 5
+    assert bucket.throttles == 3
+
+
+def test_rate_has_a_floor():
+    bucket = TokenBucket(1, min_rate=0.5, cooldown=0)
+    for _ in range(10):
+        bucket.throttled()
+    assert bucket.rate == 0.5
+
+
+def test_success_increases_rate_up_to_max():
+    bucket = TokenBucket(10, max_rate=12, increase=5)
+    bucket.succeeded()
+    assert bucket.rate == pytest.approx(10.5)
+    for _ in range(100):
+        bucket.succeeded()
+    assert bucket.rate == 12
+
+
+def test_recovery_after_throttling():
+    bucket = TokenBucket(10, cooldown=0)
+    bucket.throttled()
+    rate = bucket.rate
+    bucket.succeeded()
+    assert rate < bucket.rate < 10
+
+
+def test_limiter_has_one_bucket_per_service_and_region():
+    limiter = RateLimiter({"eks": 3})
+    bucket = limiter.get("eks", "us-east-1")
+    assert limiter.get("eks", "us-east-1") is bucket
+    assert limiter.get("eks", "us-west-2") is not bucket
+    assert bucket.rate == 3
+    assert limiter.get("unknown").rate == default_rate
+    assert "eks/us-east-1" in limiter.stats
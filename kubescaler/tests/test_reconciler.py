@@ -0,0 +1,267 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+import pytest
+
+from kubescaler.reconciler import (
+    PoolPolicy,
+    PoolStatus,
+    Reconciler,
+    get_pod_requests,
+    matches_selector,
+    parse_selector,
+)
+
+label = "cloud.google.com/gke-nodepool"
+gib = 1024**3
+
+
+class FakeCluster:
+    name = "test-cluster"
+    default_pool_name = "default-pool"
+    machine_type = "n1-standard-4"
+    machine_catalog = None
+    min_nodes = 1
+    max_nodes = 10
+
+    def __init__(self):
+        self.requests = []
+
+    def get_pool_selector(self, pool_name=None):
+        return f"{label}={pool_name or self.default_pool_name}"
+
+    def request_scale(self, count, pool=None, deadline=None):
+        future = Future()
+        self.requests.append((count, pool, deadline, future))
+        return future
+
+
+def get_reconciler(**kwargs):
+    policy = {
+        "min_nodes": 1,
+        "max_nodes": 10,
+        "scale_up_cooldown": 0,
+        "scale_down_cooldown": 0,
+        "scale_down_delay": 0,
+    }
+    policy.update(kwargs)
+    pools = {"default-pool": PoolPolicy(**policy), "gpu": PoolPolicy(0, 2)}
+    return Reconciler(FakeCluster(), pools, watch=False)
+
+
+def get_status(
+    nodes=2,
+    ready=None,
+    pending=None,
+    requested=(0, 0),
+    pods=1,
+    node_cpu=4,
+    max_pods=110,
+):
+    status = PoolStatus("default-pool")
+    status.nodes = nodes
+    status.ready = nodes if ready is None else ready
+    status.pending = list(pending or [])
+    status.requested = [*requested, pods]
+    status.node_capacity = (node_cpu, 16 * gib, max_pods)
+    status.allocatable = [status.ready * value for value in status.node_capacity]
+    return status
+
+
+def container(**requests):
+    return SimpleNamespace(resources=SimpleNamespace(requests=requests or None))
+
+
+def test_parse_selector():
+    assert parse_selector(f"{label}=pool") == [(label, "pool")]
+    assert parse_selector("!eks.amazonaws.com/nodegroup") == [
+        ("eks.amazonaws.com/nodegroup", None)
+    ]
+    assert parse_selector("a=1, b==2") == [("a", "1"), ("b", "2")]
+    assert parse_selector(None) == []
+
+
+def test_matches_selector():
+    terms = parse_selector("a=1,!b")
+    assert matches_selector(terms, {"a": "1"})
+    assert not matches_selector(terms, {"a": "1", "b": "x"})
+    assert not matches_selector(terms, {"a": "2"})
+    assert not matches_selector(terms, None)
+    assert matches_selector([], {"a": "1"})
+
+
+def test_get_pod_pool():
+    reconciler = get_reconciler()
+    assert reconciler.get_pod_pool(None) == "default-pool"
+    assert reconciler.get_pod_pool({"disk": "ssd"}) == "default-pool"
+    assert reconciler.get_pod_pool({label: "gpu"}) == "gpu"
+    assert reconciler.get_pod_pool({label: "default-pool"}) == "default-pool"
+
+    # Pinned to a pool we don't manage
+    assert reconciler.get_pod_pool({label: "other"}) is None
+
+
+def test_get_pod_pool_without_value():
+    cluster = FakeCluster()
+    cluster.default_pool_name = "workers"
+    cluster.get_pool_selector = lambda pool=None: (
+        "!eks.amazonaws.com/nodegroup"
+        if pool == "workers"
+        else f"eks.amazonaws.com/nodegroup={pool}"
+    )
+    pools = {"workers": PoolPolicy(0, 3), "group": PoolPolicy(0, 3)}
+    reconciler = Reconciler(cluster, pools, watch=False)
+    assert reconciler.get_pod_pool(None) == "workers"
+    assert reconciler.get_pod_pool({"eks.amazonaws.com/nodegroup": "group"}) == "group"
+
+
+def test_get_pod_requests():
+    pod = SimpleNamespace(
+        spec=SimpleNamespace(
+            containers=[container(cpu="500m", memory="1Gi"), container()],
+            init_containers=[container(cpu="2", memory="512Mi")],
+        )
+    )
+    cpu, memory = get_pod_requests(pod)
+
+    # Containers without requests count as zero, and init containers run alone
+    assert cpu == 2
+    assert memory == gib
+
+
+def test_count_nodes_needed():
+    reconciler = get_reconciler()
+    capacity = (4, 16 * gib, 110)
+    assert reconciler.count_nodes_needed([], capacity) == 0
+    assert reconciler.count_nodes_needed([(2, gib)] * 5, capacity) == 3
+    assert reconciler.count_nodes_needed([(3, gib), (1, gib), (3, gib)], capacity) == 2
+    assert reconciler.count_nodes_needed([(1, 10 * gib)] * 3, capacity) == 3
+
+    # Pods that can't fit on any node don't add nodes
+    assert reconciler.count_nodes_needed([(8, gib), (1, gib)], capacity) == 1
+
+    # Pods without requests are limited by pods per node
+    assert reconciler.count_nodes_needed([(0, 0)] * 25, (4, 16 * gib, 10)) == 3
+
+    # Without a capacity, every pod gets a node
+    assert reconciler.count_nodes_needed([(1, gib)] * 3, None) == 3
+
+
+def test_decide_scale_up():
+    reconciler = get_reconciler()
+    status = get_status(nodes=2, pending=[(2, gib)] * 5)
+    assert reconciler.decide("default-pool", status, 1000) == (
+        5,
+        "5 unschedulable pods",
+    )
+
+
+def test_decide_scale_up_is_bounded():
+    reconciler = get_reconciler(max_nodes=4)
+    status = get_status(nodes=2, pending=[(4, gib)] * 10)
+    assert reconciler.decide("default-pool", status, 1000)[0] == 4
+
+    reconciler = get_reconciler(max_step=1)
+    assert reconciler.decide("default-pool", status, 1000)[0] == 3
+
+
+def test_decide_scale_up_cooldown():
+    reconciler = get_reconciler(scale_up_cooldown=30)
+    reconciler.last_scaled["default-pool"] = 1000
+    status = get_status(nodes=2, pending=[(2, gib)])
+    assert reconciler.decide("default-pool", status, 1010) is None
+    assert reconciler.decide("default-pool", status, 1031)[0] == 3
+
+
+def test_decide_counts_nodes_coming():
+    reconciler = get_reconciler()
+    future = Future()
+    reconciler.inflight["default-pool"] = future
+    reconciler.targets["default-pool"] = 4
+
+    # Four nodes are coming, and the pending pods fit on the two new ones
+    status = get_status(nodes=2, pending=[(2, gib)] * 4)
+    assert reconciler.decide("default-pool", status, 1000) is None
+
+    status = get_status(nodes=2, pending=[(2, gib)] * 6)
+    assert reconciler.decide("default-pool", status, 1000)[0] == 5
+
+
+def test_decide_bounds():
+    reconciler = get_reconciler(min_nodes=3)
+    assert reconciler.decide("default-pool", get_status(nodes=1), 1000) == (3, "bounds")
+
+
+def test_decide_scale_down_waits_for_delay():
+    reconciler = get_reconciler(scale_down_delay=60)
+    status = get_status(nodes=4, requested=(2, gib))
+    assert reconciler.decide("default-pool", status, 1000) is None
+    assert reconciler.decide("default-pool", status, 1030) is None
+    count, reason = reconciler.decide("default-pool", status, 1061)
+    assert count == 1
+    assert reason.startswith("utilization")
+
+
+def test_decide_scale_down_hysteresis():
+    reconciler = get_reconciler(scale_down_delay=60)
+
+    # Utilization goes back up, and the delay starts over
+    low = get_status(nodes=4, requested=(2, gib))
+    high = get_status(nodes=4, requested=(12, gib))
+    assert reconciler.decide("default-pool", low, 1000) is None
+    assert reconciler.decide("default-pool", high, 1030) is None
+    assert reconciler.decide("default-pool", low, 1061) is None
+    assert reconciler.decide("default-pool", low, 1122)[0] < 4
+
+
+def test_decide_scale_down_to_target_utilization():
+    reconciler = get_reconciler(target_utilization=0.5, scale_down_utilization=0.4)
+
+    # 6 cpus requested at 50% of 4 cpu nodes is 3 nodes
+    status = get_status(nodes=10, requested=(6, gib))
+    assert reconciler.decide("default-pool", status, 1000)[0] == 3
+
+
+def test_decide_scale_down_keeps_pods_without_requests():
+    reconciler = get_reconciler(min_nodes=0)
+
+    # 12 pods at 70% of 10 pods per node need 2 nodes, not 0
+    status = get_status(nodes=4, requested=(0, 0), pods=12, max_pods=10)
+    assert status.utilization == 0.3
+    assert reconciler.decide("default-pool", status, 1000)[0] == 2
+
+    # Pods without requests that fill the nodes keep them
+    status = get_status(nodes=4, requested=(0, 0), pods=30, max_pods=10)
+    assert reconciler.decide("default-pool", status, 1000) is None
+
+
+def test_decide_no_scale_down():
+    reconciler = get_reconciler(scale_down=False)
+    status = get_status(nodes=4, requested=(0, 0))
+    assert reconciler.decide("default-pool", status, 1000) is None
+
+
+def test_policy_validation():
+    with pytest.raises(ValueError):
+        PoolPolicy(5, 3)
+    with pytest.raises(ValueError):
+        PoolPolicy(0, 3, scale_down_utilization=0.8, target_utilization=0.7)
+
+
+def test_request_records_scale():
+    reconciler = get_reconciler()
+    status = get_status(nodes=2, pending=[(2, gib)])
+    reconciler.request("default-pool", 3, "1 unschedulable pods", status, 1000)
+    count, pool, deadline, future = reconciler.cluster.requests[0]
+    assert (count, pool, deadline) == (3, "default-pool", 900)
+    assert reconciler.scales[0]["status"] == "pending"
+
+    future.set_result(SimpleNamespace(status="deadline"))
+    assert reconciler.scales[0]["status"] == "deadline"
+    assert "seconds" in reconciler.scales[0]
+    assert "default-pool" in reconciler.last_scaled
@@ -0,0 +1,117 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+import time
+
+import pytest
+
+import kubescaler.retry as retry
+from kubescaler.deadline import Cancelled, Deadline, DeadlineExceeded
+from kubescaler.retry import RetryPolicy
+
+
+class Conflict(Exception):
+    pass
+
+
+def classify_conflict(error):
+    if isinstance(error, Conflict):
+        return retry.CONFLICT
+
+
+def test_classify():
+    policy = RetryPolicy([classify_conflict])
+    assert policy.classify(Conflict()) == retry.CONFLICT
+    assert policy.classify(ConnectionError()) == retry.TRANSIENT
+    assert policy.classify(TimeoutError()) == retry.TRANSIENT
+    assert policy.classify(ValueError()) == retry.PERMANENT
+
+
+def test_deadlines_are_never_retried():
+    policy = RetryPolicy([lambda error: retry.TRANSIENT])
+    assert policy.classify(Cancelled()) == retry.PERMANENT
+    assert policy.classify(DeadlineExceeded()) == retry.PERMANENT
+
+
+def test_permanent_errors_are_raised():
+    policy = RetryPolicy()
+    assert policy.get_sleep(ValueError(), 0, time.monotonic()) is None
+
+
+def test_sleep_is_jittered_backoff():
+    policy = RetryPolicy([classify_conflict], cap=60)
+    start = time.monotonic()
+    for attempt in range(4):
+        for _ in range(20):
+            sleep = policy.get_sleep(Conflict(), attempt, start)
+            assert 0 <= sleep <= 5 * 2**attempt
+
+
+def test_sleep_is_capped():
+    policy = RetryPolicy(cap=2, attempts=20)
+    for _ in range(20):
+        assert policy.get_sleep(ConnectionError(), 10, time.monotonic()) <= 2
+
+
+def test_attempts_are_limited():
+    policy = RetryPolicy(attempts=2)
+    start = time.monotonic()
+    assert policy.get_sleep(ConnectionError(), 1, start) is not None
+    assert policy.get_sleep(ConnectionError(), 2, start) is None
+
+
+def test_policy_deadline():
+    policy = RetryPolicy([classify_conflict], deadline=1)
+    assert policy.get_sleep(Conflict(), 0, time.monotonic() - 10) is None
+
+
+def test_current_deadline_is_honoured():
+    policy = RetryPolicy([classify_conflict], bases={retry.CONFLICT: 1000})
+    with Deadline(0.5):
+        sleeps = [policy.get_sleep(Conflict(), 5, time.monotonic()) for _ in range(5)]
+    assert all(sleep is None or sleep < 0.5 for sleep in sleeps)
+
+
+def test_replace_keeps_classifiers():
+    policy = RetryPolicy([classify_conflict], attempts=5)
+    other = policy.replace(attempts=1)
+    assert other.attempts == 1
+    assert other.classify(Conflict()) == retry.CONFLICT
+    assert other.classifiers.count(retry.classify_error) == 1
+
+
+def test_aws_classify_error():
+    clients = pytest.importorskip("kubescaler.scaler.aws.clients")
+    from botocore.exceptions import ClientError
+
+    def error(code, message="", status=400):
+        response = {
+            "Error": {"Code": code, "Message": message},
+            "ResponseMetadata": {"HTTPStatusCode": status},
+        }
+        return ClientError(response, "Operation")
+
+    assert clients.classify_error(error("Throttling")) == retry.THROTTLING
+    assert clients.classify_error(error("ResourceInUseException")) == retry.CONFLICT
+    stack_busy = error(
+        "ValidationError", "Stack is in UPDATE_IN_PROGRESS state and can not be updated"
+    )
+    assert clients.classify_error(stack_busy) == retry.CONFLICT
+    assert clients.classify_error(error("ValidationError")) == retry.PERMANENT
+    assert clients.classify_error(error("InternalError", status=500)) == retry.TRANSIENT
+    assert clients.classify_error(ValueError()) is None
+
+
+def test_aws_no_update():
+    clients = pytest.importorskip("kubescaler.scaler.aws.clients")
+    from botocore.exceptions import ClientError
+
+    def error(message):
+        response = {"Error": {"Code": "ValidationError", "Message": message}}
+        return ClientError(response, "UpdateStack")
+
+    assert clients.is_no_update(error("No updates are to be performed."))
+    assert not clients.is_no_update(error("Stack does not exist"))
+    assert not clients.is_no_update(ValueError("No updates are to be performed"))
@@ -0,0 +1,115 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+import threading
+
+import pytest
+
+from kubescaler.scaling import ScaleEvent, ScaleQueue, ScaleResult
+
+
+class FakeScale:
+    """
+    A scale function that records calls, and can block the first one.
+    """
+
+    def __init__(self, status="complete", block=False):
+        self.calls = []
+        self.status = status
+        self.started = threading.Event()
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+
+    def __call__(self, count, pool, deadline=None):
+        self.calls.append((count, pool))
+        self.deadline = deadline
+        self.started.set()
+        assert self.release.wait(5)
+        result = ScaleResult(count)
+        result.status = self.status
+        return result
+
+
+def test_scale_queue_reaches_count():
+    scale = FakeScale()
+    queue = ScaleQueue(scale, debounce=0)
+    request = queue.submit(3, "pool").result(5)
+    assert request.status == "reached"
+    assert request.result.count == 3
+    assert queue.sizes == {"pool": 3}
+    assert scale.calls == [(3, "pool")]
+
+
+def test_scale_queue_coalesces_requests():
+    scale = FakeScale(block=True)
+    queue = ScaleQueue(scale, debounce=0)
+    first = queue.submit(2, "pool")
+    assert scale.started.wait(5)
+
+    # These arrive while the first scale runs, and only the last one is applied
+    waiting = [queue.submit(count, "pool") for count in (3, 4, 5)]
+    scale.release.set()
+
+    assert first.result(5).status == "reached"
+    statuses = [future.result(5).status for future in waiting]
+    assert statuses == ["superseded", "superseded", "reached"]
+    assert waiting[0].result().superseded_by == 4
+    assert scale.calls == [(2, "pool"), (5, "pool")]
+    assert queue.sizes["pool"] == 5
+
+
+def test_scale_queue_pools_are_independent():
+    scale = FakeScale()
+    queue = ScaleQueue(scale, debounce=0)
+    futures = [queue.submit(1, "a"), queue.submit(2, "b")]
+    assert all(f.result(5).status == "reached" for f in futures)
+    assert queue.sizes == {"a": 1, "b": 2}
+
+
+def test_scale_queue_skips_unchanged():
+    scale = FakeScale()
+    queue = ScaleQueue(scale, debounce=0)
+    queue.submit(3, "pool").result(5)
+    assert queue.submit(3, "pool").result(5).status == "unchanged"
+    assert len(scale.calls) == 1
+
+
+@pytest.mark.parametrize("status", ["deadline", "cancelled"])
+def test_scale_queue_does_not_record_stopped_scales(status):
+    scale = FakeScale(status=status)
+    queue = ScaleQueue(scale, debounce=0)
+    assert queue.submit(3, "pool").result(5).status == status
+    assert "pool" not in queue.sizes
+
+    # The same count is tried again
+    assert queue.submit(3, "pool").result(5).status == status
+    assert len(scale.calls) == 2
+
+
+def test_scale_queue_failure_sets_exception():
+    def scale(count, pool, deadline=None):
+        raise ValueError("no quota")
+
+    queue = ScaleQueue(scale, debounce=0)
+    with pytest.raises(ValueError, match="no quota"):
+        queue.submit(3, "pool").result(5)
+    assert "pool" not in queue.sizes
+
+
+def test_scale_queue_passes_deadline():
+    scale = FakeScale()
+    queue = ScaleQueue(scale, debounce=0)
+    queue.submit(3, "pool", deadline=60).result(5)
+    assert scale.deadline == 60
+
+
+def test_scale_result_pending_uses_nodes_total():
+    result = ScaleResult(2)
+    assert result.pending == 2
+
+    # A regional pool of 2 nodes per zone, in 3 zones
+    result.add(ScaleEvent("nodes", 4, 6))
+    assert result.pending == 2
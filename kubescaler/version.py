@@ -3,7 +3,7 @@
 #
 # SPDX-License-Identifier: (MIT)
 
-__version__ = "0.0.2"
+__version__ = "0.0.45"
 AUTHOR = "Vanessa Sochat"
 EMAIL = "vsoch@users.noreply.github.com"
 NAME = "kubescaler"
@@ -23,10 +23,10 @@ INSTALL_REQUIRES = (
     ("kubernetes", {"min_version": None}),
 )
 
-AWS_REQUIRES = (
-    ("awscli", {"min_version": None}),
-    ("boto3", {"min_version": None}),
-)
+AWS_REQUIRES = (("boto3", {"min_version": None}),)
+
+# Only needed for a kubeconfig that uses "aws eks get-token"
+AWSCLI_REQUIRES = (("awscli", {"min_version": None}),)
 
 # Prefer discovery clients - more control
 GOOGLE_CLOUD_REQUIRES = (
@@ -0,0 +1,354 @@
+# Copyright 2023-2024 Lawrence Livermore National Security, LLC and other
+# HPCIC DevTools Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (MIT)
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import kubescaler.deadline as deadlines
+from kubescaler.deadline import Deadline
+from kubescaler.logger import logger
+
+
+class WarmCluster:
+    """
+    A cluster in a warm pool, and where it is in its life.
+
+    The status is creating, ready (idle, waiting for a lease), leased,
+    deleting, deleted, or failed.
+    """
+
+    def __init__(self, cluster):
+        self.cluster = cluster
+        self.name = cluster.name
+        self.status = "creating"
+        self.created = time.time()
+        self.idle_since = None
+        self.checked = None
+        self.error = None
+
+    @property
+    def data(self):
+        return {
+            "status": self.status,
+            "created": self.created,
+            "idle_since": self.idle_since,
+            "error": self.error,
+            "times": self.cluster.times,
+        }
+
+
+class WarmPool:
+    """
+    Keep clusters created (control planes, nodes at zero or minimal) to lease.
+
+    Creating a cluster takes many minutes before the first node, so the
+    pool creates size clusters ahead of time (create_cluster with
+    create_nodes=False), and lease() hands out one that is ready in seconds.
+    A background thread replaces leased clusters, deletes (and replaces)
+    ready clusters that fail a health check or were idle longer than ttl,
+    and deletes released clusters. After a failed create we wait backoff
+    seconds (doubled for each failure in a row) to create again, and stop
+    after max_failures in a row (e.g., a missing quota or permission).
+    Creates and deletes run in separate pools (of max_workers each), so
+    slow creates don't hold up deletes.
+
+    new_cluster is called with a (unique) name and returns a cluster that is
+    not yet created, e.g., lambda name: EKSCluster(name, eks_nodegroup=True).
+
+        pool = WarmPool(new_cluster, size=2, ttl=3600)
+        pool.start()
+        cluster = pool.lease(timeout=600)
+        cluster.create_cluster_nodes()
+        ...
+        pool.release(cluster)
+        pool.stop()
+    """
+
+    def __init__(
+        self,
+        new_cluster,
+        size=1,
+        ttl=None,
+        health_interval=60,
+        max_workers=2,
+        name="kubescaler-warm",
+        create_deadline=None,
+        backoff=60,
+        max_failures=5,
+    ):
+        self.new_cluster = new_cluster
+        self.size = size
+        self.ttl = ttl
+        self.health_interval = health_interval
+        self.name = name
+        self.create_deadline = create_deadline
+        self.backoff = backoff
+        self.max_failures = max_failures
+        self.failures = 0
+        self.retry_after = 0
+        self.clusters = {}
+        self.times = {}
+        self._creates = ThreadPoolExecutor(max_workers)
+        self._deletes = ThreadPoolExecutor(max_workers)
+        self._changed = threading.Condition()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Start filling (and maintaining) the pool in the background.
+        """
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, delete=True):
+        """
+        Stop maintaining the pool, deleting the clusters not leased.
+
+        Clusters still being created are deleted when they are done.
+        """
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._changed:
+            self._changed.notify_all()
+        if delete:
+            for member in self.members("ready"):
+                if self._claim(member):
+                    self._submit_delete(member)
+        self._creates.shutdown(wait=True)
+        self._deletes.shutdown(wait=True)
+
+    def adopt(self, cluster):
+        """
+        Add an existing cluster (e.g., from an earlier run) to the pool.
+
+        Adopting only reads: missing nodes are not created.
+        """
+        if cluster.load_cluster_info(create_nodes=False) is None:
+            raise ValueError(f"Cluster {cluster.name} does not exist.")
+        member = WarmCluster(cluster)
+        self._set_ready(member)
+        return member
+
+    def lease(self, timeout=None):
+        """
+        Get a ready cluster, waiting up to timeout seconds for one.
+
+        The cluster is checked once more before it is handed out, and a
+        new one is created to take its place. This raises a ValueError if
+        the pool is stopped, or gave up creating and has none coming.
+        """
+        with Deadline(timeout, name="lease"):
+            while True:
+                member = self._take()
+                if member is None:
+                    deadlines.check()
+                    self._check_can_lease()
+                    continue
+                if self._is_healthy(member):
+                    self._wakeup.set()
+                    print(f"🔥️ Leased warm cluster {member.name}")
+                    return member.cluster
+                self._retire(member, "failed a health check")
+
+    def _take(self):
+        """
+        Take a ready cluster, waiting (up to a second) for one.
+        """
+        with self._changed:
+            ready = self.members("ready")
+            if not ready:
+                self._wakeup.set()
+                self._changed.wait(1)
+                ready = self.members("ready")
+            if not ready:
+                return None
+            member = min(ready, key=lambda m: m.idle_since)
+            member.status = "leased"
+            return member
+
+    def _check_can_lease(self):
+        """
+        Raise if no cluster will become ready to lease.
+        """
+        if self._stopped.is_set():
+            raise ValueError(f"Warm pool {self.name} is stopped.")
+        if self.gave_up and not self.members("ready", "creating"):
+            raise ValueError(
+                f"Warm pool {self.name} stopped creating clusters after "
+                f"{self.failures} failed creates in a row."
+            )
+
+    @property
+    def gave_up(self):
+        """
+        Determine if we stopped creating clusters after failed creates.
+        """
+        return self.max_failures is not None and self.failures >= self.max_failures
+
+    def release(self, cluster, delete=True):
+        """
+        Give back a leased cluster, to delete it or to lease again.
+
+        A cluster that is kept should be back to the state it was leased in
+        (e.g., nodes scaled to zero).
+        """
+        member = self.clusters[cluster.name]
+        if delete:
+            self._retire(member, "released")
+        else:
+            self._set_ready(member)
+
+    def members(self, *statuses):
+        """
+        Get the clusters with one of the statuses.
+        """
+        return [m for m in self.clusters.values() if m.status in statuses]
+
+    def _run(self):
+        """
+        Replenish and check the pool until stopped.
+        """
+        while not self._stopped.is_set():
+            try:
+                self.check()
+                self.replenish()
+            except Exception as e:
+                logger.error(f"Maintaining warm pool {self.name} failed: {e}")
+            self._wakeup.wait(self.health_interval)
+            self._wakeup.clear()
+
+    def replenish(self):
+        """
+        Start creating clusters until the pool (ready or creating) is full.
+
+        Nothing is created while we back off from failed creates.
+        """
+        if self.gave_up or time.time() < self.retry_after:
+            return
+        missing = self.size - len(self.members("ready", "creating"))
+        for _ in range(max(0, missing)):
+            name = f"{self.name}-{uuid.uuid4().hex[:8]}"
+            member = WarmCluster(self.new_cluster(name))
+            self.clusters[member.name] = member
+            self._creates.submit(self._create, member)
+
+    def check(self):
+        """
+        Retire ready clusters that are idle past the ttl or unhealthy.
+        """
+        now = time.time()
+        for member in self.members("ready"):
+            if self.ttl is not None and now - member.idle_since > self.ttl:
+                if self._claim(member):
+                    self._retire(member, f"idle for more than {self.ttl} seconds")
+            elif member.checked is None or now - member.checked >= self.health_interval:
+                if not self._is_healthy(member) and self._claim(member):
+                    self._retire(member, "failed a health check")
+
+    def _claim(self, member):
+        """
+        Take a ready cluster out of the pool (unless it was just leased).
+        """
+        with self._changed:
+            if member.status != "ready":
+                return False
+            member.status = "deleting"
+            return True
+
+    def _is_healthy(self, member):
+        member.checked = time.time()
+        try:
+            return member.cluster.is_active()
+        except Exception as e:
+            logger.warning(f"Health check of warm cluster {member.name} failed: {e}")
+            return False
+
+    def _set_ready(self, member):
+        with self._changed:
+            member.status = "ready"
+            member.idle_since = time.time()
+            member.checked = member.idle_since
+            self.clusters[member.name] = member
+            self._changed.notify_all()
+
+    def _create(self, member):
+        start = time.time()
+        try:
+            with Deadline(self.create_deadline, name=f"create {member.name}"):
+                member.cluster.create_cluster(create_nodes=False)
+        except Exception as e:
+            logger.error(f"Creating warm cluster {member.name} failed: {e}")
+            member.error = str(e)
+            self._create_failed()
+            self._delete(member, "failed")
+            return
+        self.failures = 0
+        self.times[f"create_{member.name}"] = round(time.time() - start, 3)
+        if self._stopped.is_set():
+            self._delete(member)
+            return
+        print(f"🔥️ Warm cluster {member.name} is ready")
+        self._set_ready(member)
+
+    def _create_failed(self):
+        with self._changed:
+            self.failures += 1
+            delay = self.backoff * 2 ** (self.failures - 1)
+            self.retry_after = time.time() + delay
+        if self.gave_up:
+            logger.error(
+                f"Warm pool {self.name} stopped creating clusters after "
+                f"{self.failures} failed creates in a row"
+            )
+        else:
+            logger.warning(f"Warm pool {self.name} will create again in {delay}s")
+
+    def _retire(self, member, reason):
+        """
+        Delete a cluster in the background, and create one to replace it.
+        """
+        logger.info(f"Retiring warm cluster {member.name}: {reason}")
+        member.status = "deleting"
+        self._submit_delete(member)
+        self._wakeup.set()
+
+    def _submit_delete(self, member):
+        """
+        Delete a cluster in the background, or here if the pool is stopped.
+        """
+        try:
+            self._deletes.submit(self._delete, member)
+        except RuntimeError:
+            self._delete(member)
+
+    def _delete(self, member, status="deleted"):
+        member.status = "deleting"
+        try:
+            member.cluster.delete_cluster()
+        except Exception as e:
+            logger.error(f"Deleting warm cluster {member.name} failed: {e}")
+            member.error = member.error or str(e)
+            status = "failed"
+        member.status = status
+
+    @property
+    def data(self):
+        return {
+            "size": self.size,
+            "ttl": self.ttl,
+            "failures": self.failures,
+            "times": self.times,
+            "clusters": {name: m.data for name, m in self.clusters.items()},
+        }
@@ -73,6 +73,7 @@ if __name__ == "__main__":
     INSTALL_REQUIRES_ALL = get_reqs(lookup, "INSTALL_REQUIRES_ALL")
     INSTALL_REQUIRES_GOOGLE = get_reqs(lookup, "GOOGLE_CLOUD_REQUIRES")
     INSTALL_REQUIRES_AWS = get_reqs(lookup, "AWS_REQUIRES")
+    INSTALL_REQUIRES_AWSCLI = get_reqs(lookup, "AWSCLI_REQUIRES")
 
     setup(
         name=NAME,
@@ -92,10 +93,17 @@ if __name__ == "__main__":
         setup_requires=["pytest-runner"],
         install_requires=INSTALL_REQUIRES_ALL,
         tests_require=TESTS_REQUIRES,
+        entry_points={
+            "console_scripts": [
+                "kubescaler-eks-token=kubescaler.credential:main",
+                "kubescaler-reconcile=kubescaler.reconciler:main",
+            ]
+        },
         extras_require={
             "basic": [INSTALL_REQUIRES],
             "google": INSTALL_REQUIRES_GOOGLE,
             "aws": INSTALL_REQUIRES_AWS,
+            "awscli": INSTALL_REQUIRES_AWSCLI,
         },
         classifiers=[
             "Intended Audience :: Science/Research",